@@ -1,536 +1,1041 @@
 import eventlet
 eventlet.monkey_patch()
-from flask import Flask, render_template, request
+from flask import Flask, Response, render_template, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
+from contextlib import contextmanager
+from eventlet import tpool
+import atexit
+import compact
+import collections
+import functools
+import gc
+import os
 import random
+import secrets
+import socket
 import string
+import threading
 import time
+import journal as journaux
+import metriques
+import moteur
+from ordonnanceur import Ordonnanceur
+import stockage as stockages
+import tournoi as tournois
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'killer_secret_key'
-socketio = SocketIO(app, async_mode='threading', cors_allowed_origins='*')
+# Sans ça Flask ne laisse passer que les warnings : les graines des parties (voir demarrer) seraient perdues
+app.logger.setLevel(os.environ.get('KILLER_LOG_NIVEAU', 'INFO'))
+
+# --- METRIQUES (/metrics) ---
+HANDLER_TEMPS = metriques.Histogramme('killer_handler_secondes', "Durée des handlers Socket.IO", ('evt',))
+ENCODAGE_TEMPS = metriques.Histogramme('killer_emission_encodage_secondes', "Encodage JSON des paquets émis", ('evt',))
+ENCODAGE_OCTETS = metriques.Histogramme('killer_emission_octets', "Taille des paquets émis", ('evt',), metriques.SEAUX_OCTETS)
+BROADCAST_TEMPS = metriques.Histogramme('killer_broadcast_etat_secondes', "Calcul du patch d'un salon")
+LOT_MESSAGES = metriques.Histogramme('killer_lot_messages', "Messages regroupés dans l'envoi d'une action", seaux=metriques.SEAUX_NOMBRE)
+LOBBY_DIFFUSION = metriques.Histogramme('killer_lobby_diffusion_clients', "Clients du hall touchés par un maj_lobby", seaux=metriques.SEAUX_NOMBRE)
+SALON_CPU = metriques.Compteur('killer_salon_cpu_secondes_total', "CPU consommé sous le verrou de chaque salon", ('salon',))
+TACHES = metriques.Jauge('killer_taches_de_fond', "Tâches de fond en cours")
+TACHES_LANCEES = metriques.Compteur('killer_taches_de_fond_total', "Tâches de fond lancées")
+metriques.Jauge('killer_salons', "Salons par état", ('etat',),
+                lambda: {(e,): n for e, n in collections.Counter(g.etat for g in list(games.values())).items()})
+metriques.Jauge('killer_sids_connectes', "Clients connectés à ce worker", fonction=lambda: len(socketio.server.eio.sockets))
+metriques.Jauge('killer_bots_actifs', "Bots dans une partie en cours",
+                fonction=lambda: sum(j.is_bot for g in list(games.values()) if g.etat not in ("ATTENTE", "FIN") for j in g.joueurs))
+metriques.Jauge('killer_ordonnanceur_profondeur', "Actions de bots en attente", fonction=lambda: bots.stats()['profondeur'])
+metriques.Jauge('killer_ordonnanceur_retard_max_secondes', "Plus grand retard d'une action de bot", fonction=lambda: bots.stats()['retard_max'])
+metriques.Compteur('killer_ordonnanceur_actions_total', "Actions de bots exécutées", fonction=lambda: bots.stats()['executees'])
+metriques.Jauge('killer_spectateurs', "Spectateurs connectés à ce worker",
+                fonction=lambda: sum(len(m) for s, m in list(socketio.server.manager.rooms.get('/', {}).items()) if ':spectateurs/' in str(s)))
+metriques.Jauge('killer_file_attente', "Joueurs dans la file d'attente (partie rapide)", fonction=lambda: len(file_attente))
+metriques.Jauge('killer_places_reservees', "Joueurs déconnectés dont la place est gardée", fonction=lambda: departs.stats()['profondeur'])
+metriques.Jauge('killer_salons_memoire_octets', "Mémoire occupée par les salons (estimation)", fonction=lambda: memoire_salons()[0])
+SALONS_EXPIRES = metriques.Compteur('killer_salons_expires_total', "Salons fermés par le ménage", ('raison',))
+metriques.Jauge('killer_journal_en_attente', "Enregistrements du journal pas encore écrits", fonction=lambda: journal.stats()['en_attente'] if journal else 0)
+metriques.Compteur('killer_journal_octets_total', "Octets écrits dans le journal", fonction=lambda: journal.stats()['octets'] if journal else 0)
+metriques.Compteur('killer_journal_lots_total', "Lots écrits dans le journal", fonction=lambda: journal.stats()['lots'] if journal else 0)
+REPRISE_DUREE = metriques.Jauge('killer_reprise_journal_secondes', "Durée de la reprise des salons depuis le journal au démarrage")
+# Plusieurs workers : KILLER_MESSAGE_QUEUE (ex: redis://localhost:6379) relaie les emits entre eux,
+# KILLER_STOCKAGE (ex: fichier:/tmp/killer) partage les salons
+MESSAGE_QUEUE = os.environ.get('KILLER_MESSAGE_QUEUE')
+socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins='*', message_queue=MESSAGE_QUEUE,
+                    json=metriques.JSONMesure(ENCODAGE_TEMPS, ENCODAGE_OCTETS))
+stockage = stockages.depuis_config(os.environ.get('KILLER_STOCKAGE'))
+WORKER = f"{socket.gethostname()}-{os.getpid()}"
 
 # --- GLOBALS ---
+# Registre des salons : toujours prendre le verrou d'un salon AVANT `registre`, jamais l'inverse
+registre = threading.RLock()
 games = {}
 sid_to_room = {}
 admin_sids = set() 
 
+# Lobby incrémental : dernière info publiée par salon + salons à revérifier
+LOBBY_FENETRE = 0.5  # secondes, au plus un envoi au hall par fenêtre
+lobby_publie = {}
+lobby_a_verifier = set()
+lobby_flush_prevu = False
+verrou_lobby = threading.Lock()
+
+# Ménage des salons abandonnés : index LRU rid -> dernière activité humaine (plus ancien en tête)
+activite = collections.OrderedDict()
+MENAGE_PERIODE = 30
+SALON_VIDE_DELAI = int(os.environ.get('KILLER_SALON_VIDE_DELAI', 120))  # sans humain (vide ou que des bots)
+SALON_FIN_DELAI = int(os.environ.get('KILLER_SALON_FIN_DELAI', 600))  # partie terminée
+SALON_INACTIF_DELAI = int(os.environ.get('KILLER_SALON_INACTIF_DELAI', 3600))  # quel que soit l'état
+MAX_SALONS = int(os.environ.get('KILLER_MAX_SALONS', 1000))
+menage_demarre = False
+
+def tache_de_fond(fn, *args):
+    """socketio.start_background_task, comptée dans /metrics"""
+    def tache():
+        TACHES.inc(1)
+        try: fn(*args)
+        finally: TACHES.inc(-1)
+    TACHES_LANCEES.inc()
+    return socketio.start_background_task(tache)
+
+# Toutes les actions de bots en attente, tous salons confondus (une au plus par salon)
+BOT_DELAI = 1.5
+bots = Ordonnanceur(tache_de_fond)
+
+# Un joueur déconnecté garde sa place ce temps-là (reprise avec son jeton), une échéance par jeton
+RECONNEXION_DELAI = int(os.environ.get('KILLER_RECONNEXION_DELAI', 30))
+departs = Ordonnanceur(tache_de_fond)
+
+# Spectateurs (évènement 'regarder') : ils ne sont pas joueurs et suivent la salle <salon>:spectateurs, qui
+# reçoit l'état regroupé au plus SPECTATEURS_HZ fois par seconde (seul le dernier état compte)
+SPECTATEURS_HZ = float(os.environ.get('KILLER_SPECTATEURS_HZ', 2))
+vues = Ordonnanceur(tache_de_fond)
+
+# File d'attente (partie rapide) et tournois, voir tournoi.py : tenus par ce worker, en mémoire.
+# Un joueur attendu à une table qui n'est pas là après TABLE_DELAI est remplacé par un bot.
+TABLE_TAILLE = int(os.environ.get('KILLER_TABLE_TAILLE', 4))
+FILE_DELAI_BOTS = float(os.environ.get('KILLER_FILE_DELAI_BOTS', 20))
+TABLE_DELAI = float(os.environ.get('KILLER_TABLE_DELAI', 30))
+file_attente = tournois.FileAttente(TABLE_TAILLE, FILE_DELAI_BOTS)
+# sid -> cle secrète dans la file : le sid est publié dans l'état des salons, la cle seulement à son joueur
+cles_file = {}
+competitions = {}
+# Pris sous le verrou d'un salon (fin de table), jamais l'inverse
+verrou_tournois = threading.Lock()
+# Formation des tables de la file et rondes en attente : elles créent des salons (et font le ménage s'il le
+# faut), leur propre ordonnanceur ne retarde pas les actions de bots
+orchestration = Ordonnanceur(tache_de_fond)
+
+# Journal local (un seul worker, sans KILLER_STOCKAGE) : KILLER_JOURNAL=/var/lib/killer rejoue les salons
+# au démarrage. Un snapshot d'un salon toutes les JOURNAL_SNAPSHOT actions.
+JOURNAL_SNAPSHOT = int(os.environ.get('KILLER_JOURNAL_SNAPSHOT', 50))
+journal = None
+if os.environ.get('KILLER_JOURNAL'):
+    if stockage.partage: app.logger.warning("KILLER_JOURNAL ignoré : les salons sont déjà dans KILLER_STOCKAGE")
+    else: journal = journaux.Journal(os.environ['KILLER_JOURNAL'], tache_de_fond, fsync=os.environ.get('KILLER_JOURNAL_FSYNC') == '1',
+                                     executer=tpool.execute)
+
 # --- CLASSES ---
-class Joueur:
-    def __init__(self, sid, nom, is_bot=False):
-        self.sid = sid
-        self.nom = nom
-        self.pv = 0
-        self.des_pv = [] 
-        self.est_pret = False 
-        self.is_bot = is_bot 
-
-    def to_dict(self):
-        return {
-            'nom': self.nom, 
-            'pv': self.pv, 
-            'sid': self.sid, 
-            'is_bot': self.is_bot,
-            'est_pret': self.est_pret,
-            'des_pv': self.des_pv if self.des_pv else []
-        }
-
-class Partie:
-    def __init__(self, room_id, nom_salon):
-        self.id = room_id
-        self.nom_salon = nom_salon
-        self.joueurs = []
-        self.reset_jeu()
-
-    def reset_jeu(self):
-        self.etat = "ATTENTE" 
-        self.joueur_actuel_idx = 0
-        self.des_sur_table, self.des_gardes = [], []
-        self.message, self.vainqueur = "En attente...", None
-        self.createur_sid = self.joueurs[0].sid if self.joueurs else None
-        self.valeur_killer, self.liste_victimes = 0, []
-        self.victime_actuelle_idx, self.degats_accumules = -1, 0
-        
-        # MODIFICATION : Liste pour stocker qui était vivant au début du tour
-        self.ids_vivants_debut_tour = []
-
-    def verifier_proprietaire(self):
-        chef_actuel = next((p for p in self.joueurs if p.sid == self.createur_sid), None)
-        if not chef_actuel or chef_actuel.is_bot:
-            nouveau_chef = next((p for p in self.joueurs if not p.is_bot), None)
-            if nouveau_chef: self.createur_sid = nouveau_chef.sid
-
-    def broadcast_etat(self, msg=None):
-        if msg: self.message = msg
-        v_nom = self.joueurs[self.victime_actuelle_idx].nom if self.victime_actuelle_idx != -1 else ""
-        self.verifier_proprietaire()
-
-        socketio.emit('update_jeu', {
-            'joueurs': [j.to_dict() for j in self.joueurs],
-            'etat': self.etat,
-            'joueur_actuel': self.joueurs[self.joueur_actuel_idx].nom if self.joueurs else "",
-            'joueur_actuel_sid': self.joueurs[self.joueur_actuel_idx].sid if self.joueurs else "",
-            'des_table': self.des_sur_table, 'des_gardes': self.des_gardes,
-            'message': self.message, 'valeur_killer': self.valeur_killer,
-            'nom_victime': v_nom, 'degats_accumules': self.degats_accumules,
-            'vainqueur': self.vainqueur, 'createur_sid': self.createur_sid,
-            'room_id': self.id, 'nom_salon': self.nom_salon
-        }, to=self.id)
+class EvenementsSocketIO(moteur.Evenements):
+    """Branche le moteur sur Socket.IO"""
+
+    def notification(self, jeu, msg, son=None):
+        data = {'msg': msg}
+        if son: data['sound'] = son
+        jeu.emettre('notification', data)
+
+    def etat(self, jeu): jeu.broadcast_etat()
+
+    def attaques(self, jeu, resultats):
+        # Toute l'attaque en un message : le client anime les lancers
+        jeu.emettre('attaques', {'k': jeu.valeur_killer, 'r': resultats})
+
+    def action(self, jeu, nom, args, kwargs, des, variations):
+        journal.action(jeu.id, nom, args, kwargs, des, variations)
+        jeu.actions_journal += 1
+        if jeu.actions_journal >= JOURNAL_SNAPSHOT: journaliser(jeu)
+
+evenements_socketio = EvenementsSocketIO()
+evenements_socketio.journal = journal is not None
+
+ETAT_MODIFIE = object()  # Dans la sortie d'un salon : place du patch, calculé à l'envoi
+
+class Partie(moteur.Partie):
+    """Partie hébergée par le serveur : les règles viennent du moteur, on ajoute verrou, patchs et stockage"""
+    __slots__ = ('verrou', 'seq', 'dernier_etat', 'version_stockage', 'derniere_activite', 'actions_journal',
+                 'vue_spectateurs', 'seq_vue', 'derniere_vue', 'sortie', 'table')
+    CHAMPS_SNAPSHOT = moteur.Partie.CHAMPS_SNAPSHOT + ('seq', 'dernier_etat')
+
+    def __init__(self, room_id, nom_salon, attaque_groupee=False):
+        # Les actions d'un même salon sont exécutées une par une (handlers et bots)
+        self.verrou = threading.RLock()
+        # Protocole versionné : numéro de séquence + dernier état envoyé (pour les patchs)
+        self.seq = 0
+        self.dernier_etat = None
+        # Version du snapshot partagé correspondant à cette copie (plusieurs workers)
+        self.version_stockage = None
+        # Dernière action d'un humain (les bots ne comptent pas : un salon de bots seuls expire)
+        self.derniere_activite = time.monotonic()
+        # Actions journalisées depuis le dernier snapshot du salon dans le journal
+        self.actions_journal = 0
+        # Dernier état envoyé aux spectateurs (None : ils recevront l'état complet), son seq et sa date
+        self.vue_spectateurs = None
+        self.seq_vue = 0
+        self.derniere_vue = 0.0
+        # Pendant une action (salon_verrouille) : messages pour le salon, envoyés ensemble à la fin
+        self.sortie = None
+        # Table formée par le serveur (file d'attente, tournoi), voir creer_table ; None pour un salon ordinaire
+        self.table = None
+        super().__init__(room_id, nom_salon, evenements_socketio, attaque_groupee=attaque_groupee)
+
+    def emettre(self, evt, data):
+        if self.sortie is None: socketio.emit(evt, data, to=self.id)
+        else: self.sortie.append((evt, data))
+
+    def broadcast_etat(self):
+        # Pendant une action, un seul patch à la fin, à la place du dernier changement d'état
+        if self.sortie is not None:
+            if ETAT_MODIFIE in self.sortie: self.sortie.remove(ETAT_MODIFIE)
+            self.sortie.append(ETAT_MODIFIE)
+            return
+        patch, etat = self.calculer_patch()
+        if patch: emettre_etat('patch_jeu', patch, etat, self.id)
+
+    def ouvrir_sortie(self):
+        """Début d'une action : False si une sortie est déjà ouverte (elle sera vidée par qui l'a ouverte)"""
+        if self.sortie is not None: return False
+        self.sortie = []
+        return True
+
+    def vider_sortie(self):
+        """Fin d'une action (sous le verrou, pour garder l'ordre) : une seule trame par client, dans son format.
+        Un message seul part tel quel, plusieurs partent dans un 'lot' [[evt, data], ...]."""
+        sortie, self.sortie = self.sortie, None
+        if not sortie: return
+        messages, etat, position = [], None, None
+        for m in sortie:
+            if m is not ETAT_MODIFIE: messages.append(m); continue
+            patch, etat = self.calculer_patch()
+            if patch: position = len(messages); messages.append(('patch_jeu', patch))
+        if not messages: return
+        LOT_MESSAGES.observer(len(messages))
+        emettre_lot(messages, salle_etat(self.id, 'json'))
+        mp = salle_etat(self.id, 'mp')
+        if MESSAGE_QUEUE or socketio.server.manager.rooms.get('/', {}).get(mp):
+            if position is not None:
+                messages[position] = ('patch_jeu_mp', encoder_compact('patch_jeu_mp', messages[position][1], etat))
+            emettre_lot(messages, mp)
+
+    @metriques.chronometrer(BROADCAST_TEMPS)
+    def calculer_patch(self):
+        """(patch, état) depuis le dernier envoi, patch vide si rien n'a changé ; planifie la suite (hall, bots, spectateurs)"""
+        # On n'envoie que les champs modifiés depuis le dernier envoi
+        etat = self.etat_public()
+        patch = moteur.diff_etat(self.dernier_etat, etat)
+        if patch:
+            self.seq += 1
+            self.dernier_etat = etat
+            patch['seq'] = self.seq
+            # Les spectateurs n'ont pas chaque patch : un envoi regroupé, au plus SPECTATEURS_HZ par seconde
+            if a_des_spectateurs(self.id):
+                delai = max(0.0, self.derniere_vue + 1 / SPECTATEURS_HZ - time.monotonic())
+                vues.planifier(self.id, delai, lecture_salon, diffuser_spectateurs, self.id)
         
-        broadcast_game_list()
+        # Le hall n'est prévenu que si l'info publique du salon a changé
+        if self.get_info_publique() != lobby_publie.get(self.id): signaler_salon(self.id)
         
+        if self.etat == "FIN" and self.table and not self.table['fini']: fin_de_table(self)
+
         # Gestion Bots
         cur = self.get_joueur_actuel()
         if cur and cur.is_bot and self.etat != "FIN" and self.etat != "ATTENTE" and self.etat != "ATTRIBUTION_PV":
-            socketio.start_background_task(bot_play_turn, self)
+            bots.planifier(self.id, BOT_DELAI, action_bot, moteur.bot_jouer, self.id)
+        return patch, etat
 
-    def get_info_publique(self):
-        return {'id': self.id, 'nom': self.nom_salon, 'nb_joueurs': len(self.joueurs), 'statut': "En cours" if self.etat not in ["ATTENTE", "FIN"] else "En attente"}
+    def envoyer_snapshot(self, sid):
+        # Etat complet (arrivée dans le salon, reconnexion, trou de séquence côté client)
+        if self.dernier_etat is None: self.dernier_etat = self.etat_public()
+        snapshot = dict(self.dernier_etat)
+        snapshot['seq'] = self.seq
+        if formats.get(sid) == 'mp': socketio.emit('update_jeu_mp', encoder_compact('update_jeu_mp', snapshot, snapshot), to=sid)
+        else: socketio.emit('update_jeu', snapshot, to=sid)
 
-    def get_joueur_actuel(self):
-        if not self.joueurs: return None
-        return self.joueurs[self.joueur_actuel_idx]
 
-    # --- MODIFICATION PRINCIPALE ICI ---
-    def passer_suivant(self):
-        # 1. On regarde qui est vivant (PV >= 0) MAINTENANT
-        survivants = [j for j in self.joueurs if j.pv >= 0]
-        
-        # Condition de fin : Il reste 1 seul survivant OU tout le monde est mort (0 survivant)
-        if len(self.joueurs) > 1 and len(survivants) <= 1:
-            
-            if len(survivants) == 1:
-                # Cas standard : Il reste un vrai survivant
-                self.vainqueur = survivants[0].nom
-            else:
-                # Cas "Tout le monde est mort ce tour-ci"
-                # On départage parmi ceux qui étaient vivants AU DÉBUT DU TOUR
-                candidats = [j for j in self.joueurs if j.sid in self.ids_vivants_debut_tour]
-                
-                # Sécurité (si bug vide), on prend tout le monde
-                if not candidats: candidats = self.joueurs
-                
-                # On trie par PV décroissant (le moins négatif gagne : ex -7 gagne contre -10)
-                candidats.sort(key=lambda x: x.pv, reverse=True)
-                
-                if candidats:
-                    self.vainqueur = candidats[0].nom
-                else:
-                    self.vainqueur = "Personne"
-
-            self.etat = "FIN"
-            self.broadcast_etat(f"🏆 VICTOIRE ! {self.vainqueur} gagne !")
-        
-        else:
-            # La partie continue
-            self.joueur_actuel_idx = (self.joueur_actuel_idx + 1) % len(self.joueurs)
-            self.des_gardes, self.des_sur_table, self.etat = [], [], "TRANSITION_TOUR"
-            
-            # IMPORTANT : On met à jour la liste des éligibles pour le PROCHAIN tour
-            # Seuls ceux qui sont positifs maintenant pourront gagner si tout le monde meurt au prochain tour
-            self.ids_vivants_debut_tour = [j.sid for j in survivants]
-            
-            self.broadcast_etat(f"Au tour de {self.joueurs[self.joueur_actuel_idx].nom}")
-
-    def lancer_des(self, nombre):
-        self.des_sur_table = [random.randint(1, 6) for _ in range(nombre)]
-
-    def init_phase_attaque(self):
-        self.liste_victimes = []
-        nb_j = len(self.joueurs)
-        for i in range(1, nb_j):
-            cible_idx = (self.joueur_actuel_idx + i) % nb_j
-            self.liste_victimes.append(cible_idx)
-        self.preparer_prochaine_victime()
-
-    def preparer_prochaine_victime(self):
-        if not self.liste_victimes:
-            socketio.emit('notification', {'msg': "Tour Killer terminé."}, to=self.id)
-            self.passer_suivant() 
-            return
-        self.victime_actuelle_idx = self.liste_victimes.pop(0)
-        self.degats_accumules = 0 
-        self.des_gardes = []       
-        self.des_sur_table = []    
-        self.etat = "ATTENTE_LANCER"
-        nom_cible = self.joueurs[self.victime_actuelle_idx].nom
-        self.broadcast_etat(f"Prêt à attaquer {nom_cible} ?")
+# --- FORMAT DES ETATS (voir compact.py) ---
+# sid -> 'mp' pour les clients qui ont demandé le format compact ; les autres reçoivent du JSON.
+# Chaque joueur suit le salon (notifications) et la salle des états dans son format.
+formats = {}
+
+def salle_etat(rid, fmt): return f"{rid}/{fmt}"
+
+def choisir_format(data):
+    if isinstance(data, dict) and data.get('format') == 'mp' and compact.disponible:
+        with registre: formats[request.sid] = 'mp'
+
+def entrer_salon(rid):
+    join_room(rid); join_room(salle_etat(rid, formats.get(request.sid, 'json')))
+
+def emettre_etat(evt, donnees, etat, salle):
+    """Patch ou état complet à une salle : en JSON, et en compact (encodé une fois) s'il y a des clients compacts"""
+    socketio.emit(evt, donnees, to=salle_etat(salle, 'json'))
+    mp = salle_etat(salle, 'mp')
+    if MESSAGE_QUEUE or socketio.server.manager.rooms.get('/', {}).get(mp):
+        socketio.emit(evt + '_mp', encoder_compact(evt + '_mp', donnees, etat), to=mp)
+
+def emettre_lot(messages, salle):
+    if len(messages) == 1: socketio.emit(*messages[0], to=salle)
+    else: socketio.emit('lot', [list(m) for m in messages], to=salle)
+
+def encoder_compact(evt, donnees, etat):
+    debut = time.perf_counter()
+    trame = compact.encoder(donnees, etat)
+    ENCODAGE_TEMPS.observer(time.perf_counter() - debut, evt=evt)
+    ENCODAGE_OCTETS.observer(len(trame), evt=evt)
+    return trame
+
+
+# --- SPECTATEURS ---
+def salle_spectateurs(rid): return f"{rid}:spectateurs"
+
+def a_des_spectateurs(rid):
+    # Avec plusieurs workers, ils peuvent être connectés ailleurs
+    if MESSAGE_QUEUE: return True
+    salles = socketio.server.manager.rooms.get('/', {})
+    return any(salles.get(salle_etat(salle_spectateurs(rid), fmt)) for fmt in ('json', 'mp'))
+
+def diffuser_spectateurs(jeu):
+    """Envoie aux spectateurs ce qui a changé depuis leur dernier envoi (sous le verrou du salon).
+    Le patch porte `depuis` : le seq de l'état auquel il s'applique, les seq intermédiaires sont sautés."""
+    jeu.derniere_vue = time.monotonic()
+    etat = jeu.dernier_etat
+    if etat is None or etat is jeu.vue_spectateurs: return
+    salle = salle_spectateurs(jeu.id)
+    if jeu.vue_spectateurs is None:
+        # Premier envoi de ce worker (salon nouveau ou repris) : état complet
+        snapshot = dict(etat)
+        snapshot['seq'] = jeu.seq
+        emettre_etat('update_jeu', snapshot, snapshot, salle)
+    else:
+        patch = moteur.diff_etat(jeu.vue_spectateurs, etat)
+        patch['seq'], patch['depuis'] = jeu.seq, jeu.seq_vue
+        emettre_etat('patch_jeu', patch, etat, salle)
+    jeu.vue_spectateurs, jeu.seq_vue = etat, jeu.seq
+
+
+def action_bot(fn, rid, *args):
+    """Exécuté par l'ordonnanceur : on ignore les salons supprimés ou repris par un autre worker entre-temps
+    (celui-ci a replanifié les départs en rechargeant le salon, voir salon_a_jour)"""
+    with stockage.verrou(rid):
+        if not stockage.proprietaire(rid, WORKER): return
+        with salon_verrouille(rid) as jeu, app.app_context():
+            if jeu: fn(jeu, *args)
+
+def lecture_salon(fn, rid, *args):
+    """Comme action_bot, pour ce qui ne change pas l'état du jeu (envoi aux spectateurs) : la copie locale
+    sous le seul verrou du salon, ni rechargée ni sauvée dans le stockage (pas de nouvelle version)"""
+    with registre: jeu = games.get(rid)
+    if jeu is None or stockage.partage and not stockage.proprietaire(rid, WORKER): return
+    with jeu.verrou, app.app_context():
+        if games.get(rid) is jeu: fn(jeu, *args)
 
 # --- FONCTION BOT VALIDATION PV ---
+def planifier_validation_bot(jeu):
+    if any(p.is_bot and not p.est_pret for p in jeu.joueurs):
+        bots.planifier(jeu.id, random.uniform(1.0, 3.0), action_bot, bot_validate_sequence, jeu.id)
+
 def bot_validate_sequence(jeu):
-    """Simule les bots qui regardent leurs PV et valident"""
-    bots = [p for p in jeu.joueurs if p.is_bot]
-    for bot in bots:
-        time.sleep(random.uniform(1.0, 3.0))
-        
-        if jeu.etat != "ATTRIBUTION_PV": return
+    """Simule un bot qui regarde ses PV et valide, puis planifie le suivant"""
+    bot = next((p for p in jeu.joueurs if p.is_bot and not p.est_pret), None)
+    if not bot or jeu.etat != "ATTRIBUTION_PV": return
 
-        with app.app_context():
-            bot.est_pret = True
-            socketio.emit('notification', {'msg': f"🤖 {bot.nom} a validé ses PV.", 'sound':'dice'}, to=jeu.id)
-            jeu.broadcast_etat()
-            check_start_real_game(jeu)
+    jeu.notifier(f"🤖 {bot.nom} a validé ses PV.", 'dice')
+    jeu.valider_pv(bot)
+    if jeu.etat == "ATTRIBUTION_PV": planifier_validation_bot(jeu)
 
-def check_start_real_game(jeu):
-    if all(p.est_pret for p in jeu.joueurs):
-        jeu.joueurs.sort(key=lambda p: p.pv)
-        jeu.joueur_actuel_idx = 0
-        jeu.etat = "TRANSITION_TOUR"
-        
-        # Réinitialisation des vivants (ajouté lors de notre précédente correction)
-        jeu.ids_vivants_debut_tour = [p.sid for p in jeu.joueurs if p.pv >= 0]
-        
-        noms = " > ".join([p.nom for p in jeu.joueurs])
-        
-        # CORRECTION ICI : Utiliser socketio.emit au lieu de emit tout court
-        socketio.emit('notification', {'msg': f"Tout le monde est prêt ! Ordre : {noms}", 'sound': 'win'}, to=jeu.id)
-        
-        jeu.broadcast_etat("La partie commence !")
-
-# --- CERVEAU DU BOT (JEU) ---
-def bot_play_turn(jeu):
-    time.sleep(1.5)
-    cur = jeu.get_joueur_actuel()
-    if not cur or not cur.is_bot: return 
-
-    with app.app_context():
-        if jeu.etat == "TRANSITION_TOUR":
-            jeu.etat = "TOUR_CHOIX"
-            jeu.lancer_des(5)
-            jeu.broadcast_etat("Le Bot lance les dés...")
-
-        elif jeu.etat == "TOUR_CHOIX":
-            des = jeu.des_sur_table
-            
-            def val_low(d):
-                if d == 1: return 6000
-                if d == 2: return 4000
-                if d == 3: return 2000
-                if d == 4: return 1000
-                if d == 5: return 500
-                return 0 
-
-            def val_high(d):
-                if d == 6: return 6000
-                if d == 5: return 4000
-                if d == 4: return 2000
-                if d == 3: return 1000
-                if d == 2: return 500
-                return 0
-
-            mode = "NEUTRE"
-            nb_low_gardes = len([d for d in jeu.des_gardes if d <= 3])
-            nb_high_gardes = len([d for d in jeu.des_gardes if d >= 4])
-            
-            if nb_high_gardes > nb_low_gardes: mode = "HIGH"
-            elif nb_low_gardes > nb_high_gardes: mode = "LOW"
-            else:
-                score_total_low = sum([val_low(d) for d in des])
-                score_total_high = sum([val_high(d) for d in des])
-                if score_total_low >= score_total_high: mode = "LOW"
-                else: mode = "HIGH"
-
-            indices_finaux = []
-            if mode == "LOW":
-                for i, val in enumerate(des):
-                    if val_low(val) >= 4000: indices_finaux.append(i)
-                if not indices_finaux:
-                    for i, val in enumerate(des):
-                        if val == 3: indices_finaux.append(i)
-            else:
-                for i, val in enumerate(des):
-                    if val_high(val) >= 4000: indices_finaux.append(i)
-                if not indices_finaux:
-                    for i, val in enumerate(des):
-                        if val == 4: indices_finaux.append(i)
-
-            if not indices_finaux and des:
-                if mode == "LOW":
-                    scores = [val_low(d) for d in des]
-                    indices_finaux = [scores.index(max(scores))]
-                else:
-                    scores = [val_high(d) for d in des]
-                    indices_finaux = [scores.index(max(scores))]
-
-            indices_finaux = list(set(indices_finaux))
-            indices_finaux.sort(reverse=True)
-            for i in indices_finaux: jeu.des_gardes.append(jeu.des_sur_table.pop(i))
-            
-            if len(jeu.des_gardes) == 5:
-                s = sum(jeu.des_gardes); j = jeu.get_joueur_actuel()
-                if 5<=s<=10:
-                    jeu.valeur_killer = 11 - s
-                    socketio.emit('notification', {'msg': f"🤖 Bot KILLER {jeu.valeur_killer} !", 'sound':'sword'}, to=jeu.id)
-                    jeu.init_phase_attaque()
-                elif s==11 or s==24:
-                    jeu.etat, jeu.des_gardes, jeu.des_sur_table = "TOUR_REGEN", [], []
-                    socketio.emit('notification', {'msg': "🤖 Bot Regen !", 'sound':'dice'}, to=jeu.id)
-                    jeu.broadcast_etat()
-                elif 12<=s<=17:
-                    p=s-11; j.pv-=p; socketio.emit('notification', {'msg': f"🤖 Bot -{p} PV", 'sound':'oof'}, to=jeu.id); jeu.passer_suivant()
-                elif 18<=s<=23:
-                    p=24-s; j.pv-=p; socketio.emit('notification', {'msg': f"🤖 Bot -{p} PV", 'sound':'oof'}, to=jeu.id); jeu.passer_suivant()
-                elif 25<=s<=30:
-                    jeu.valeur_killer = s - 24
-                    socketio.emit('notification', {'msg': f"🤖 Bot KILLER {jeu.valeur_killer} !", 'sound':'sword'}, to=jeu.id)
-                    jeu.init_phase_attaque()
-                else: jeu.passer_suivant()
-            else:
-                jeu.lancer_des(5 - len(jeu.des_gardes))
-                jeu.broadcast_etat(f"Bot joue {mode}...")
-
-        elif jeu.etat == "TOUR_REGEN":
-            v = random.randint(1,6); jeu.des_sur_table = [v]; jeu.joueurs[jeu.joueur_actuel_idx].pv += v
-            jeu.etat = "RESULTAT_REGEN"
-            socketio.emit('notification', {'msg': f"🤖 Bot +{v} PV", 'sound':'dice'}, to=jeu.id)
-            jeu.broadcast_etat()
-        elif jeu.etat == "RESULTAT_REGEN": jeu.passer_suivant()
-        elif jeu.etat == "ATTENTE_LANCER":
-            jeu.lancer_des(5)
-            if jeu.valeur_killer in jeu.des_sur_table: jeu.etat = "TOUR_ATTAQUE"
-            else: 
-                jeu.etat = "ATTAQUE_RATEE"; socketio.emit('notification', {'msg': "🤖 Bot rate son attaque."}, to=jeu.id)
+# --- ROUTES & EVENTS ---
+def signaler_salon(rid):
+    """Marque un salon comme modifié ; le hall sera mis à jour au prochain flush"""
+    global lobby_flush_prevu
+    with verrou_lobby:
+        lobby_a_verifier.add(rid)
+        if lobby_flush_prevu: return
+        lobby_flush_prevu = True
+    tache_de_fond(broadcast_game_list)
+
+def broadcast_game_list():
+    """Regroupe les changements de la fenêtre et envoie au hall les ajouts / mises à jour / suppressions"""
+    global lobby_flush_prevu
+    socketio.sleep(LOBBY_FENETRE)
+    with verrou_lobby:
+        lobby_flush_prevu = False
+        a_verifier = list(lobby_a_verifier); lobby_a_verifier.clear()
+
+    # La référence est l'info publiée dans le stockage (partagée entre workers)
+    ajouts, maj, suppr = [], [], []
+    for rid in a_verifier:
+        jeu = games.get(rid)
+        if jeu is None:
+            lobby_publie.pop(rid, None)
+            # Supprimé, et pas seulement repris par un autre worker
+            if not stockage.existe(rid) and stockage.retirer_info(rid): suppr.append(rid)
+            continue
+        info = jeu.get_info_publique()
+        lobby_publie[rid] = info
+        ancienne = stockage.info(rid)
+        if info == ancienne: continue
+        stockage.publier_info(rid, info)
+        (ajouts if ancienne is None else maj).append(info)
+
+    if ajouts or maj or suppr:
+        LOBBY_DIFFUSION.observer(len(socketio.server.manager.rooms.get('/', {}).get('hall', ())))
+        socketio.emit('maj_lobby', {'ajouts': ajouts, 'maj': maj, 'suppr': suppr}, to='hall')
+
+def supprimer_salon(rid):
+    with registre:
+        jeu = games.pop(rid, None)
+        if jeu is None: return
+        activite.pop(rid, None)
+        for j in jeu.joueurs:
+            if sid_to_room.get(j.sid) == rid: del sid_to_room[j.sid]
+    stockage.supprimer(rid)
+    if journal: journal.suppression(rid)
+    if jeu.table and not jeu.table['fini']: fin_de_table(jeu, abandon=True)
+    bots.annuler(rid)
+    vues.annuler(rid)
+    salle = salle_spectateurs(rid)
+    socketio.emit('force_quit', to=[salle_etat(salle, 'json'), salle_etat(salle, 'mp')])
+    SALON_CPU.retirer(salon=rid)
+    signaler_salon(rid)
+
+# --- MENAGE ---
+def toucher(jeu):
+    """Action d'un humain sur le salon : il passe en queue de l'index LRU"""
+    jeu.derniere_activite = time.monotonic()
+    with registre:
+        activite[jeu.id] = jeu.derniere_activite
+        activite.move_to_end(jeu.id)
+
+def raison_expiration(jeu, urgence=False):
+    """Pourquoi fermer ce salon maintenant (None s'il reste) ; en urgence on ne regarde plus l'âge"""
+    age = time.monotonic() - jeu.derniere_activite
+    if not any(not j.is_bot for j in jeu.joueurs) and (urgence or age > SALON_VIDE_DELAI): return 'sans_humain'
+    if jeu.etat == "FIN" and (urgence or age > SALON_FIN_DELAI): return 'termine'
+    if age > SALON_INACTIF_DELAI: return 'inactif'
+    return None
+
+def nettoyer_salons(urgence=False):
+    """Ferme les salons abandonnés (du plus ancien au plus récent) et les sid_to_room orphelins"""
+    limite = time.monotonic() - min(SALON_VIDE_DELAI, SALON_FIN_DELAI, SALON_INACTIF_DELAI)
+    with registre:
+        if urgence: candidats = list(activite)
+        else:
+            # Index LRU : on s'arrête au premier salon trop récent, les suivants le sont aussi
+            candidats = []
+            for rid, t in activite.items():
+                if t >= limite: break
+                candidats.append(rid)
+    fermes = 0
+    for rid in candidats:
+        with stockage.verrou(rid):
+            with registre: jeu = games.get(rid)
+            if jeu is None:
+                with registre: activite.pop(rid, None)
+                continue
+            if stockage.partage and not stockage.proprietaire(rid, WORKER):
+                # Copie locale d'un salon tenu par un autre worker : on l'oublie, il sera rechargé au besoin
+                with registre: games.pop(rid, None); activite.pop(rid, None)
+                continue
+            if any(j.deconnecte for j in jeu.joueurs): action_bot(expirer_places, rid)
+            with jeu.verrou:
+                raison = raison_expiration(jeu, urgence)
+                if not raison or games.get(rid) is not jeu: continue
+                socketio.emit('force_quit', to=rid)
+                supprimer_salon(rid)
+                SALONS_EXPIRES.inc(raison=raison)
+                fermes += 1
+
+    # Joueurs encore rattachés à un salon disparu, ou déconnectés sans passer par disconnect
+    with registre: liens = list(sid_to_room.items())
+    for sid, rid in liens:
+        if (rid in games or stockage.existe(rid)) and socketio.server.manager.is_connected(sid, '/'): continue
+        with registre:
+            if sid_to_room.get(sid) == rid: del sid_to_room[sid]
+    with registre: compacts = list(formats)
+    for sid in compacts:
+        if not socketio.server.manager.is_connected(sid, '/'):
+            with registre: formats.pop(sid, None)
+    return fermes
+
+def memoire_salons():
+    """(octets, nombre de salons) : taille estimée des objets Partie et de tout ce qu'ils référencent"""
+    with registre: salons = list(games.values())
+    exclus = {id(evenements_socketio)}
+    return sum(metriques.taille_profonde(jeu, exclus) for jeu in salons), len(salons)
+
+def boucle_menage():
+    while True:
+        socketio.sleep(MENAGE_PERIODE)
+        try:
+            fermes = nettoyer_salons()
+            if fermes:
+                octets, nb = memoire_salons()
+                app.logger.info("Ménage : %d salons fermés, %d restants (%.1f Ko par salon)", fermes, nb, octets / max(nb, 1) / 1024)
+            if journal and journal.a_compacter(): journal.compacter(snapshots_journal())
+        except Exception:
+            app.logger.exception("Ménage des salons en erreur")
+
+# --- JOURNAL ---
+def snapshot_journal(jeu):
+    # Le dernier état envoyé n'est pas gardé : il est recalculé à la reprise
+    snap = jeu.to_snapshot()
+    del snap['dernier_etat']
+    return snap
+
+def journaliser(jeu):
+    """Snapshot du salon dans le journal (sous son verrou) : la reprise repartira de là"""
+    jeu.actions_journal = 0
+    journal.snapshot(jeu.id, snapshot_journal(jeu))
+
+def snapshots_journal():
+    # Parcouru par journal.compacter après l'ouverture du nouveau segment, un salon verrouillé à la fois
+    with registre: salons = list(games.values())
+    for jeu in salons:
+        with jeu.verrou:
+            if games.get(jeu.id) is not jeu: continue
+            jeu.actions_journal = 0
+            yield jeu.id, snapshot_journal(jeu)
+
+def restaurer_journal():
+    """Au démarrage : chaque salon repart de son dernier snapshot, les actions suivantes sont rejouées"""
+    debut = time.perf_counter()
+    salons = journal.relire()
+    actions = divergences = 0
+    gc.disable()  # Comme pour la relecture : rien à libérer pendant la reconstruction
+    try:
+        for rid, (snap, suite) in salons.items():
+            jeu = Partie(rid, snap['nom_salon'])
+            snap['dernier_etat'] = None
+            jeu.charger_snapshot(snap)
+            for a in suite:
+                actions += 1
+                if not jeu.rejouer(a['a'], a['p'], a.get('k', {}), a['d'], a['v']):
+                    # Le salon reste dans l'état obtenu, sans les actions suivantes
+                    app.logger.warning("Journal : le salon %s diverge à l'action %s, reprise arrêtée là", rid, a['a'])
+                    divergences += 1
+                    break
+            # Les anciens sids n'existent plus : chaque humain a RECONNEXION_DELAI pour reprendre sa place
+            for j in jeu.joueurs:
+                if j.jeton: garder_siege(jeu, j)
+            with registre: games[rid] = jeu
+            toucher(jeu)
+    finally:
+        gc.enable()
+
+    # Le journal repart d'un segment neuf, puis les salons reprennent leur cours (bots, hall)
+    journal.compacter(snapshots_journal())
+    for jeu in list(games.values()):
+        with jeu.verrou:
             jeu.broadcast_etat()
-        elif jeu.etat == "TOUR_ATTAQUE":
-            ind = [i for i, x in enumerate(jeu.des_sur_table) if x == jeu.valeur_killer]
-            if ind:
-                ind.sort(reverse=True)
-                for i in ind: v = jeu.des_sur_table.pop(i); jeu.des_gardes.append(v); jeu.degats_accumules += v
-                if len(jeu.des_gardes) == 5:
-                    jeu.des_gardes = []; socketio.emit('notification', {'msg': "🤖 Bot FULL ! Relance !"}, to=jeu.id); jeu.lancer_des(5)
-                    if jeu.valeur_killer not in jeu.des_sur_table: jeu.etat = "FIN_ATTAQUE"
-                else:
-                    jeu.lancer_des(5 - len(jeu.des_gardes))
-                    if jeu.valeur_killer not in jeu.des_sur_table: jeu.etat = "FIN_ATTAQUE"
-                jeu.broadcast_etat("Le Bot attaque...")
-            else: jeu.etat = "FIN_ATTAQUE"; jeu.broadcast_etat()
-        elif jeu.etat == "FIN_ATTAQUE" or jeu.etat == "ATTAQUE_RATEE":
-            vic = jeu.joueurs[jeu.victime_actuelle_idx]
-            if jeu.degats_accumules > 0:
-                vic.pv -= jeu.degats_accumules
-                socketio.emit('notification', {'msg': f"💥 Bot inflige {jeu.degats_accumules} dégâts !", 'sound':'punch'}, to=jeu.id)
-            else: socketio.emit('notification', {'msg': "Bot finit sans dégâts."}, to=jeu.id)
-            jeu.etat = "RESULTAT_ATTAQUE"; jeu.broadcast_etat()
-        elif jeu.etat == "RESULTAT_ATTAQUE": jeu.preparer_prochaine_victime()
+            if jeu.etat == "ATTRIBUTION_PV": planifier_validation_bot(jeu)
+    duree = time.perf_counter() - debut
+    REPRISE_DUREE.set(duree)
+    app.logger.info("Journal : %d salons repris en %.2f s (%d actions rejouées, %d divergences)",
+                       len(salons), duree, actions, divergences)
+
+def demarrer_menage():
+    global menage_demarre
+    with registre:
+        if menage_demarre: return
+        menage_demarre = True
+    tache_de_fond(boucle_menage)
+
+def envoyer_liste_salons(sid):
+    # Liste complète, seulement pour celui qui arrive dans le hall
+    if stockage.partage: infos = stockage.infos()
+    else:
+        with registre: infos = [g.get_info_publique() for g in games.values()]
+    socketio.emit('update_game_list', infos, to=sid)
 
-# --- ROUTES & EVENTS ---
-def broadcast_game_list(): socketio.emit('update_game_list', [g.get_info_publique() for g in games.values()], to='hall')
 def get_game(sid):
-    rid = sid_to_room.get(sid)
-    return games[rid] if rid in games else None
+    with registre:
+        return games.get(sid_to_room.get(sid))
+
+def salon_a_jour(rid):
+    """Le salon tel que connu du stockage, rechargé si un autre worker l'a modifié (sous stockage.verrou)"""
+    with registre: jeu = games.get(rid)
+    if not stockage.partage: return jeu
+
+    charge = stockage.charger(rid)
+    if charge is None:
+        # Supprimé par un autre worker
+        if jeu:
+            with registre: games.pop(rid, None)
+            bots.annuler(rid)
+        return None
+    version, snap = charge
+    if jeu and jeu.version_stockage == version: return jeu
+
+    nouveau = jeu is None
+    if nouveau: jeu = Partie(rid, snap['nom_salon'])
+    with jeu.verrou:
+        jeu.charger_snapshot(snap)
+        jeu.version_stockage = version
+        # Les minuteries de départ sont sur le worker qui a vu la déconnexion : le propriétaire, c'est nous désormais
+        for j in jeu.joueurs:
+            if j.deconnecte and j.jeton: planifier_depart(jeu, j)
+    with registre: games[rid] = jeu
+    if nouveau: toucher(jeu)  # Tout salon de `games` est dans l'index du ménage
+    return jeu
+
+def sauver_salon(jeu):
+    # Sauver le salon fait de ce worker son propriétaire (c'est lui qui fait jouer les bots)
+    if stockage.partage and games.get(jeu.id) is jeu:
+        jeu.version_stockage = stockage.sauver(jeu.id, WORKER, jeu.to_snapshot())
+
+@contextmanager
+def salon_verrouille(rid):
+    """Donne le salon à jour (ou None) avec ses verrous pris, et le sauve en sortie"""
+    with stockage.verrou(rid):
+        jeu = salon_a_jour(rid)
+        if jeu is None:
+            yield None
+            return
+        with jeu.verrou:
+            if games.get(rid) is not jeu:
+                yield None  # Supprimé pendant l'attente du verrou
+                return
+            debut = time.thread_time()
+            sortie = jeu.ouvrir_sortie()
+            try: yield jeu
+            finally:
+                if sortie: jeu.vider_sortie()
+                sauver_salon(jeu)
+                if games.get(rid) is jeu: SALON_CPU.inc(time.thread_time() - debut, salon=rid)
+
+def action_salon(handler):
+    """Exécute le handler sous le verrou du salon de l'émetteur : les actions d'un salon sont
+    strictement ordonnées, celles de salons différents tournent en parallèle"""
+    @functools.wraps(handler)
+    def wrapper(*args):
+        with registre: rid = sid_to_room.get(request.sid)
+        if not rid: return
+        with salon_verrouille(rid) as jeu:
+            if jeu:
+                toucher(jeu)
+                return handler(jeu, *args)
+    return wrapper
+
+def on(evt):
+    """socketio.on, avec la durée du handler dans /metrics"""
+    def decorateur(handler):
+        return socketio.on(evt)(metriques.chronometrer(HANDLER_TEMPS, evt=evt)(handler))
+    return decorateur
 
 @app.route('/')
 def index(): return render_template('index.html', room_id=request.args.get('room', ""))
 
-@socketio.on('join_hall')
-def handle_hall(): join_room('hall'); broadcast_game_list()
+@app.route('/metrics')
+def metrics(): return Response(metriques.exposer(), mimetype='text/plain; version=0.0.4')
+
+@on('join_hall')
+def handle_hall(data=None):
+    choisir_format(data); join_room('hall'); envoyer_liste_salons(request.sid)
+    emit('tournois', liste_tournois())
 
-@socketio.on('creer_salon')
+def place_pour_salon():
+    # Trop de salons : on ferme d'abord les abandonnés sans attendre leur délai
+    if len(games) >= MAX_SALONS: nettoyer_salons(urgence=True)
+    return len(games) < MAX_SALONS
+
+@on('creer_salon')
 def handle_create(data):
-    rid = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    games[rid] = Partie(rid, data.get('nom_salon', 'Salon'))
-    emit('salon_cree', {'room_id': rid}); broadcast_game_list()
+    demarrer_menage()
+    if not place_pour_salon():
+        emit('erreur', "Trop de salons ouverts, réessaie dans un moment.")
+        return
+    jeu = creer_partie(data.get('nom_salon', 'Salon'), bool(data.get('attaque_groupee')))
+    emit('salon_cree', {'room_id': jeu.id}); signaler_salon(jeu.id)
+
+def creer_partie(nom_salon, attaque_groupee=False, table=None):
+    with registre:
+        rid = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        while rid in games or stockage.existe(rid): rid = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        games[rid] = jeu = Partie(rid, nom_salon, attaque_groupee)
+        jeu.table = table
+        toucher(jeu)
+    with stockage.verrou(rid): sauver_salon(jeu)
+    if journal:
+        with jeu.verrou: journaliser(jeu)
+    return jeu
 
-@socketio.on('rejoindre')
+@on('rejoindre')
 def handle_join(data):
     rid, nom = data['room_id'], data['nom']
-    if rid in games:
-        leave_room('hall'); join_room(rid); sid_to_room[request.sid] = rid
-        jeu = games[rid]; jeu.joueurs.append(Joueur(request.sid, nom))
-        jeu.verifier_proprietaire()
-        if not jeu.createur_sid: jeu.createur_sid = request.sid
-        jeu.broadcast_etat(f"{nom} a rejoint")
-
-@socketio.on('ajouter_bot')
-def handle_add_bot():
-    jeu = get_game(request.sid)
-    if jeu and request.sid == jeu.createur_sid and jeu.etat == "ATTENTE":
-        nb = len([j for j in jeu.joueurs if j.is_bot]) + 1
-        fake = f"BOT_{jeu.id}_{nb}"
-        jeu.joueurs.append(Joueur(fake, f"Bot {nb}", True))
-        jeu.broadcast_etat(f"Bot {nb} ajouté !")
-
-@socketio.on('disconnect')
+    choisir_format(data)
+    with salon_verrouille(rid) as jeu:
+        if not jeu: return
+        cle = data.get('cle')
+        if jeu.table and cle not in jeu.table['attendus']:
+            emit('erreur', "Cette table est réservée à ses joueurs (👁 pour la regarder)."); return
+        toucher(jeu)
+        with registre: ancien, sid_to_room[request.sid] = sid_to_room.get(request.sid), rid
+        # Table suivante d'un tournoi : on ne suit plus la précédente
+        if ancien and ancien != rid:
+            for salle in (ancien, salle_etat(ancien, 'json'), salle_etat(ancien, 'mp')): leave_room(salle)
+        leave_room('hall')
+        j = jeu.ajouter_joueur(request.sid, nom, jeton=secrets.token_urlsafe(16))
+        jeu.publier(f"{nom} a rejoint")
+        # Le nouveau venu reçoit l'état complet, les autres seulement le patch
+        entrer_salon(rid); jeu.envoyer_snapshot(request.sid)
+        emit('jeton', {'room_id': rid, 'jeton': j.jeton})
+        if jeu.table:
+            jeu.table['sieges'][j.jeton] = cle
+            jeu.table['attendus'].discard(cle)
+            if not jeu.table['attendus']: demarrer_table(jeu)
+
+@on('reprendre')
+def handle_resume(data):
+    """Reconnexion : le jeton redonne sa place au joueur sous son nouveau sid, avec un seul snapshot"""
+    rid, jeton = data.get('room_id'), data.get('jeton')
+    if not rid or not jeton: return False
+    choisir_format(data)
+    with salon_verrouille(rid) as jeu:
+        j = jeu and jeu.joueur_par_jeton(jeton)
+        if not j: return False
+        toucher(jeu)
+        departs.annuler(jeton)
+        with registre:
+            if sid_to_room.get(j.sid) == rid: del sid_to_room[j.sid]
+            sid_to_room[request.sid] = rid
+        leave_room('hall')
+        revenu, ancien = j.deconnecte, j.sid
+        # Même joueur depuis un autre onglet encore ouvert : l'ancien ne suit plus le salon
+        if not revenu and ancien != request.sid:
+            leave_room(rid, sid=ancien, namespace='/')
+            leave_room(salle_etat(rid, formats.get(ancien, 'json')), sid=ancien, namespace='/')
+        jeu.changer_sid(j, request.sid)
+        # Les autres reçoivent le patch (nouveau sid), le revenant l'état complet
+        jeu.publier()
+        if revenu: jeu.notifier(f"📶 {j.nom} est de retour.")
+        entrer_salon(rid); jeu.envoyer_snapshot(request.sid)
+        return True
+
+@on('regarder')
+def handle_watch(data):
+    """Spectateur : ni joueur ni compté dans le salon, il reçoit l'état regroupé (voir diffuser_spectateurs).
+    Renvoyé par le client pour repartir d'un état complet."""
+    rid = data.get('room_id')
+    if not rid: return False
+    choisir_format(data)
+    with salon_verrouille(rid) as jeu:
+        if not jeu: return False
+        leave_room('hall')
+        if jeu.dernier_etat is None: jeu.dernier_etat = jeu.etat_public()
+        # Les spectateurs déjà là rattrapent l'état courant, le nouveau part de ce même état
+        diffuser_spectateurs(jeu)
+        join_room(salle_etat(salle_spectateurs(rid), formats.get(request.sid, 'json')))
+        jeu.envoyer_snapshot(request.sid)
+        return True
+
+@on('ajouter_bot')
+@action_salon
+def handle_add_bot(jeu, data=None):
+    if request.sid == jeu.createur_sid: jeu.ajouter_bot((data or {}).get('niveau'))
+
+@on('disconnect')
 def handle_disconnect():
-    jeu = get_game(request.sid)
-    if request.sid in admin_sids: admin_sids.remove(request.sid)
-    if jeu:
-        j = next((p for p in jeu.joueurs if p.sid == request.sid), None)
-        if j:
-            jeu.joueurs.remove(j)
-            if jeu.createur_sid == request.sid:
-                jeu.verifier_proprietaire()
-                if jeu.createur_sid == request.sid:
-                     del games[jeu.id]; broadcast_game_list(); return
-            if jeu.etat != "ATTENTE" and jeu.etat != "FIN" and len(jeu.joueurs) > 0:
-                if jeu.joueur_actuel_idx >= len(jeu.joueurs): jeu.joueur_actuel_idx = 0
-                if j.nom == jeu.get_joueur_actuel().nom: jeu.passer_suivant()
-            jeu.broadcast_etat(f"{j.nom} a quitté.")
-    if request.sid in sid_to_room: del sid_to_room[request.sid]
+    with registre: admin_sids.discard(request.sid)
+    quitter_file()
+    garder_place()
+    with registre: sid_to_room.pop(request.sid, None); formats.pop(request.sid, None)
+
+@action_salon
+def garder_place(jeu):
+    """Coupure réseau : la place est gardée RECONNEXION_DELAI secondes avant le vrai départ"""
+    j = jeu.get_joueur(request.sid)
+    if not j: return
+    if not RECONNEXION_DELAI or not j.jeton:
+        quitter_salon(jeu, j); return
+    garder_siege(jeu, j)
+    jeu.publier()
+
+def garder_siege(jeu, j):
+    j.deconnecte = True
+    j.deconnecte_jusqua = time.time() + RECONNEXION_DELAI
+    planifier_depart(jeu, j)
+
+def planifier_depart(jeu, j):
+    # L'échéance est dans le snapshot (heure murale) : tout worker qui reprend le salon peut la replanifier
+    if j.deconnecte_jusqua is None: j.deconnecte_jusqua = time.time() + RECONNEXION_DELAI
+    departs.planifier(j.jeton, max(0.0, j.deconnecte_jusqua - time.time()), action_bot, expirer_place, jeu.id, j.jeton)
+
+def expirer_place(jeu, jeton):
+    j = jeu.joueur_par_jeton(jeton)
+    if not j or not j.deconnecte: return
+    # Minuterie d'une déconnexion précédente (revenu puis reparti, sur un autre worker) : on attend la nouvelle échéance
+    if j.deconnecte_jusqua and j.deconnecte_jusqua - time.time() > 0.1: planifier_depart(jeu, j)
+    else: quitter_salon(jeu, j)
+
+def expirer_places(jeu):
+    """Ménage : places dont l'échéance est passée sans que la minuterie ait tourné (worker arrêté entre-temps...)"""
+    for j in [j for j in jeu.joueurs if j.deconnecte and j.jeton and (j.deconnecte_jusqua or 0) <= time.time()]:
+        if games.get(jeu.id) is not jeu: return
+        quitter_salon(jeu, j)
+
+def quitter_salon(jeu, j):
+    # Le créateur part sans humain pour lui succéder : on ferme le salon
+    if jeu.createur_sid == j.sid and not any(not p.is_bot and p is not j for p in jeu.joueurs):
+        supprimer_salon(jeu.id); return
+    jeu.retirer_joueur(j, f"{j.nom} a quitté.")
+
+# --- FILE D'ATTENTE ET TOURNOIS (voir tournoi.py) ---
+def creer_table(nom_salon, joueurs, places, tid=None):
+    """Salon pour `joueurs` [(cle, nom)] : chacun reçoit 'table' (à la salle de sa cle) et le rejoint avec
+    sa cle ; la partie démarre quand tous sont assis, ou après TABLE_DELAI avec des bots aux places vides.
+    None si MAX_SALONS est atteint : les joueurs reçoivent 'erreur' (0 point pour la ronde d'un tournoi)"""
+    if not place_pour_salon():
+        for cle, _ in joueurs: socketio.emit('erreur', "Trop de salons ouverts, réessaie dans un moment.", to=cle)
+        return None
+    jeu = creer_partie(nom_salon, table={'tournoi': tid, 'places': places, 'attendus': {c for c, _ in joueurs},
+                                         'sieges': {}, 'fini': False})
+    if tid is not None:
+        with verrou_tournois: competitions[tid].ouvrir_table(jeu.id, [c for c, _ in joueurs])
+    bots.planifier(f"{jeu.id}:table", TABLE_DELAI, action_bot, demarrer_table, jeu.id)
+    for cle, nom in joueurs: socketio.emit('table', {'room_id': jeu.id, 'nom_salon': nom_salon, 'nom': nom, 'cle': cle}, to=cle)
+    signaler_salon(jeu.id)
+    return jeu
+
+def demarrer_table(jeu):
+    bots.annuler(f"{jeu.id}:table")
+    if jeu.etat != "ATTENTE": return
+    jeu.table['attendus'].clear()
+    while len(jeu.joueurs) < jeu.table['places']: jeu.ajouter_bot()
+    demarrer(jeu)
+
+def fin_de_table(jeu, abandon=False):
+    """Résultat de la table pour son tournoi (sous le verrou du salon) ; la dernière de la ronde lance la suivante.
+    Une table abandonnée (salon fermé avant la fin) ne rapporte de points à personne."""
+    jeu.table['fini'] = True
+    tid = jeu.table['tournoi']
+    if tid is None: return
+    ordre = [] if abandon else tournois.classement_table(jeu)
+    classement = [jeu.table['sieges'].get(j.jeton) if j.jeton else None for j in ordre]
+    with verrou_tournois:
+        t = competitions.get(tid)
+        if t is None: return
+        ronde_finie = t.resultat(jeu.id, classement, [j.pv for j in ordre])
+    # Les nouvelles tables prennent d'autres verrous de salon : hors de celui-ci
+    tache_de_fond(ronde_suivante if ronde_finie else diffuser_tournoi, tid)
+
+def ronde_suivante(tid):
+    with verrou_tournois:
+        t = competitions.get(tid)
+        if t is None: return
+        tables = t.nouvelle_ronde()
+        noms = {cle: p['nom'] for cle, p in t.participants.items()}
+        nom, ronde, places = t.nom, t.ronde, t.taille_table
+    ouvertes = [creer_table(f"{nom} · ronde {ronde} · table {num}", [(c, noms[c]) for c in cles], places, tid)
+                for num, cles in enumerate(tables or (), 1)]
+    # Aucune table ouverte (trop de salons) : personne ne terminera cette ronde, on passe à la suivante plus tard
+    if tables and not any(ouvertes): orchestration.planifier(salle_tournoi(tid), TABLE_DELAI, ronde_suivante, tid)
+    diffuser_tournoi(tid)
+
+def salle_tournoi(tid): return f"tournoi:{tid}"
+
+def diffuser_tournoi(tid):
+    """Etat et classement du tournoi : à ses inscrits et au hall"""
+    with verrou_tournois:
+        t = competitions.get(tid)
+        if t is None: return
+        info = t.to_dict()
+    socketio.emit('tournoi', info, to=[salle_tournoi(tid), 'hall'])
+
+def former_tables_file():
+    """Tables de la file d'attente ; rappelée à l'échéance du plus ancien, qui partira avec des bots"""
+    with verrou_tournois:
+        tables = file_attente.former_tables()
+        echeance = file_attente.echeance()
+    for joueurs in tables: creer_table("Partie rapide", joueurs, TABLE_TAILLE)
+    if echeance is not None: orchestration.planifier('file_attente', max(0.0, echeance - time.monotonic()), former_tables_file)
+
+@on('file_rejoindre')
+def handle_queue(data):
+    """Partie rapide : le joueur attend sa table dans la file ('table' arrive à la salle de sa cle secrète)"""
+    nom = (data or {}).get('nom')
+    if not nom: return False
+    demarrer_menage()
+    with verrou_tournois:
+        if cles_file.get(request.sid) in file_attente.attente: return True
+        cle = cles_file[request.sid] = secrets.token_urlsafe(12)
+        file_attente.rejoindre(cle, nom)
+    join_room(cle)
+    former_tables_file()
+    return True
+
+@on('file_quitter')
+def handle_queue_leave(): return quitter_file()
+
+def quitter_file():
+    with verrou_tournois:
+        cle = cles_file.pop(request.sid, None)
+        return cle is not None and file_attente.quitter(cle)
+
+@on('inscrire_tournoi')
+def handle_register(data):
+    """Inscription : la cle renvoyée identifie le joueur d'une ronde à l'autre (et après une reconnexion)"""
+    tid, nom = data.get('tournoi_id'), data.get('nom')
+    if not nom: return None
+    cle = secrets.token_urlsafe(12)
+    with verrou_tournois:
+        t = competitions.get(tid)
+        if not t or not t.inscrire(cle, nom): return None
+    join_room(cle); join_room(salle_tournoi(tid))
+    diffuser_tournoi(tid)
+    return cle
+
+@on('suivre_tournoi')
+def handle_follow(data):
+    """Reconnexion d'un inscrit (avec sa cle), ou simple suivi du classement"""
+    tid, cle = data.get('tournoi_id'), data.get('cle')
+    with verrou_tournois:
+        t = competitions.get(tid)
+        if t is None: return False
+        inscrit = cle in t.participants
+        info = t.to_dict()
+    if inscrit: join_room(cle)
+    join_room(salle_tournoi(tid))
+    emit('tournoi', info)
+    return inscrit
+
+def liste_tournois():
+    with verrou_tournois: return [t.to_dict(top=3) for t in competitions.values()]
+
+@on('admin_creer_tournoi')
+def handle_admin_create_tournament(data):
+    if request.sid not in admin_sids: return
+    demarrer_menage()
+    with verrou_tournois:
+        tid = secrets.token_hex(3).upper()
+        competitions[tid] = tournois.Tournoi(tid, data.get('nom') or "Tournoi", int(data.get('taille_table') or TABLE_TAILLE),
+                                             int(data.get('nb_rondes') or 3))
+    diffuser_tournoi(tid)
+
+@on('admin_lancer_tournoi')
+def handle_admin_start_tournament(data):
+    if request.sid in admin_sids: ronde_suivante(data.get('tournoi_id'))
 
 # --- ADMIN PANEL ---
-@socketio.on('admin_login')
+@on('admin_login')
 def handle_admin_login(data):
     if data.get('password') == '12345':
-        admin_sids.add(request.sid)
+        with registre: admin_sids.add(request.sid)
         emit('admin_success', {'msg': "Mode Admin Activé"})
-        broadcast_game_list() 
+        envoyer_liste_salons(request.sid)
         jeu = get_game(request.sid)
-        if jeu: jeu.broadcast_etat()
+        if jeu: jeu.envoyer_snapshot(request.sid)
 
-@socketio.on('admin_kick')
-def handle_admin_kick(data):
+@on('admin_kick')
+@action_salon
+def handle_admin_kick(jeu, data):
     if request.sid not in admin_sids: return
     target_sid = data.get('target_sid')
-    jeu = get_game(request.sid)
-    if jeu:
-        target = next((p for p in jeu.joueurs if p.sid == target_sid), None)
-        if target:
-            jeu.joueurs.remove(target)
-            jeu.broadcast_etat(f"ADMIN: {target.nom} a été exclu !")
-            socketio.emit('force_quit', to=target_sid)
-            jeu.verifier_proprietaire()
-            if len(jeu.joueurs) > 0 and jeu.joueur_actuel_idx >= len(jeu.joueurs): jeu.joueur_actuel_idx = 0
-
-@socketio.on('admin_delete_room')
+    target = jeu.get_joueur(target_sid)
+    if target:
+        with registre: sid_to_room.pop(target_sid, None)
+        if target.jeton: departs.annuler(target.jeton)
+        jeu.retirer_joueur(target, f"ADMIN: {target.nom} a été exclu !")
+        socketio.emit('force_quit', to=target_sid)
+
+@on('admin_delete_room')
 def handle_admin_delete_room(data):
     if request.sid in admin_sids:
         rid = data.get('room_id')
-        if rid in games:
-            socketio.emit('force_quit', to=rid) 
-            del games[rid]
-            broadcast_game_list()
+        with salon_verrouille(rid) as jeu:
+            if jeu:
+                socketio.emit('force_quit', to=rid) 
+                supprimer_salon(rid)
 
-@socketio.on('fermer_salon')
-def handle_close():
-    jeu = get_game(request.sid)
-    if jeu and (request.sid == jeu.createur_sid or request.sid in admin_sids): 
-        socketio.emit('force_quit', to=jeu.id); del games[jeu.id]; broadcast_game_list()
+@on('fermer_salon')
+@action_salon
+def handle_close(jeu):
+    if request.sid == jeu.createur_sid or request.sid in admin_sids: 
+        socketio.emit('force_quit', to=jeu.id); supprimer_salon(jeu.id)
 
 # --- JEU ACTIONS ---
-@socketio.on('demarrer_partie')
-def handle_demarrer():
-    jeu = get_game(request.sid)
-    if jeu and len(jeu.joueurs) >= 2:
-        jeu.etat = "ATTRIBUTION_PV"
-        
-        for j in jeu.joueurs:
-            j.des_pv = [random.randint(1,6) for _ in range(5)]
-            j.pv = sum(j.des_pv)
-            j.est_pret = False 
-        
-        jeu.broadcast_etat("Initialisation des PV...")
-        socketio.start_background_task(bot_validate_sequence, jeu)
-
-@socketio.on('valider_pv')
-def handle_valider_pv():
-    jeu = get_game(request.sid)
-    if jeu and jeu.etat == "ATTRIBUTION_PV":
-        joueur = next((p for p in jeu.joueurs if p.sid == request.sid), None)
-        if joueur:
-            joueur.est_pret = True
-            jeu.broadcast_etat() 
-            check_start_real_game(jeu)
-
-@socketio.on('valider_debut_tour')
-def handle_val():
-    jeu = get_game(request.sid)
-    if jeu and request.sid == jeu.joueurs[jeu.joueur_actuel_idx].sid:
-        jeu.etat, jeu.des_sur_table = "TOUR_CHOIX", [random.randint(1,6) for _ in range(5)]
-        jeu.broadcast_etat("À toi de jouer !")
-
-@socketio.on('action_garder')
-def handle_garder(indices):
-    jeu = get_game(request.sid)
-    if not jeu or jeu.etat != "TOUR_CHOIX": return
-    indices.sort(reverse=True)
-    for i in indices: jeu.des_gardes.append(jeu.des_sur_table.pop(i))
-    
-    if len(jeu.des_gardes) == 5:
-        s, j = sum(jeu.des_gardes), jeu.joueurs[jeu.joueur_actuel_idx]
-        if 5<=s<=10: 
-            jeu.valeur_killer, jeu.etat = 11-s, "ATTENTE_LANCER"
-            emit('notification', {'msg': f"KILLER {jeu.valeur_killer}!", 'sound':'sword'}, to=jeu.id)
-        elif s==11 or s==24: 
-            jeu.etat, jeu.des_gardes, jeu.des_sur_table = "TOUR_REGEN", [], []
-            emit('notification',{'msg':f"Score {s}: Régénération !"},to=jeu.id)
-            jeu.broadcast_etat(); return
-        elif 12<=s<=17: 
-            p=s-11; j.pv-=p; emit('notification',{'msg':f"Score {s}: -{p} PV", 'sound':'oof'},to=jeu.id); jeu.passer_suivant(); return
-        elif 18<=s<=23: 
-            p=24-s; j.pv-=p; emit('notification',{'msg':f"Score {s}: -{p} PV", 'sound':'oof'},to=jeu.id); jeu.passer_suivant(); return
-        elif 25<=s<=30: 
-            jeu.valeur_killer, jeu.etat = s-24, "ATTENTE_LANCER"
-            emit('notification', {'msg': f"KILLER {jeu.valeur_killer}!", 'sound':'sword'}, to=jeu.id)
-        
-        if jeu.etat == "ATTENTE_LANCER": 
-            jeu.liste_victimes = [(jeu.joueur_actuel_idx + i)%len(jeu.joueurs) for i in range(1,len(jeu.joueurs))]
-            jeu.victime_actuelle_idx = jeu.liste_victimes.pop(0); jeu.degats_accumules, jeu.des_gardes = 0, []
-        jeu.broadcast_etat()
-    else: 
-        jeu.des_sur_table = [random.randint(1,6) for _ in range(5-len(jeu.des_gardes))]
-        jeu.broadcast_etat("Relance...")
-
-@socketio.on('action_lancer_regen')
-def handle_regen_roll():
-    jeu = get_game(request.sid)
-    if jeu and jeu.etat == "TOUR_REGEN":
-        v = random.randint(1,6); jeu.des_sur_table = [v]; jeu.joueurs[jeu.joueur_actuel_idx].pv += v
-        jeu.etat = "RESULTAT_REGEN"
-        emit('notification', {'msg': f"Régénération +{v} PV", 'sound':'dice'}, to=jeu.id)
-        jeu.broadcast_etat(f"Gain de {v} PV !")
-
-@socketio.on('action_fin_regen')
-def handle_regen_end():
-    jeu = get_game(request.sid)
-    if jeu and jeu.etat == "RESULTAT_REGEN": jeu.passer_suivant()
-
-@socketio.on('action_lancer_attaque')
-def handle_atk():
-    jeu = get_game(request.sid)
-    if jeu:
-        jeu.des_sur_table = [random.randint(1,6) for _ in range(5)]
-        if jeu.valeur_killer in jeu.des_sur_table: jeu.etat = "TOUR_ATTAQUE"; jeu.broadcast_etat("Choisis tes dés !")
-        else: jeu.etat = "ATTAQUE_RATEE"; jeu.broadcast_etat("Raté !")
-
-@socketio.on('action_garder_attaque')
-def handle_g_atk(indices):
-    jeu = get_game(request.sid)
-    if not jeu or jeu.etat != "TOUR_ATTAQUE": return
-    indices.sort(reverse=True)
-    for i in indices: v=jeu.des_sur_table.pop(i); jeu.des_gardes.append(v); jeu.degats_accumules+=v
-    
-    if len(jeu.des_gardes)==5:
-        jeu.des_gardes=[]; emit('notification', {'msg': "FULL ! Relance 5 dés !", 'sound':'sword'}, to=jeu.id)
-        jeu.des_sur_table=[random.randint(1,6) for _ in range(5)]
-        if jeu.valeur_killer not in jeu.des_sur_table: jeu.etat = "FIN_ATTAQUE"
-    else:
-        jeu.des_sur_table=[random.randint(1,6) for _ in range(5-len(jeu.des_gardes))]
-        if jeu.valeur_killer not in jeu.des_sur_table: jeu.etat = "FIN_ATTAQUE"
-    jeu.broadcast_etat()
-
-@socketio.on('action_terminer_attaque')
-def handle_fin_atk():
-    jeu = get_game(request.sid)
-    if jeu and (jeu.etat == "FIN_ATTAQUE" or jeu.etat == "ATTAQUE_RATEE"):
-        victime = jeu.joueurs[jeu.victime_actuelle_idx]
-        if jeu.degats_accumules > 0:
-            victime.pv -= jeu.degats_accumules
-            emit('notification', {'msg': f"💥 -{jeu.degats_accumules} pour {victime.nom}", 'sound':'punch'}, to=jeu.id)
-        else:
-            emit('notification', {'msg': "Aucun dégât."}, to=jeu.id)
-        
-        jeu.preparer_prochaine_victime()
+@on('demander_etat')
+@action_salon
+def handle_demander_etat(jeu):
+    jeu.envoyer_snapshot(request.sid)
+
+@on('demarrer_partie')
+@action_salon
+def handle_demarrer(jeu):
+    demarrer(jeu)
+
+def demarrer(jeu):
+    # Chaque partie a sa graine : gardée dans le snapshot et le journal, jamais envoyée aux joueurs.
+    # Elle est aussi écrite dans le log (sans journal ni stockage, le salon disparaît avec elle) : de quoi
+    # rejouer les dés d'une partie contestée
+    graine = secrets.randbits(64)
+    if not jeu.demarrer(graine=graine): return False
+    app.logger.info("Salon %s : partie démarrée, graine %d, joueurs %s", jeu.id, graine, ", ".join(j.nom for j in jeu.joueurs))
+    planifier_validation_bot(jeu)
+    return True
+
+@on('valider_pv')
+@action_salon
+def handle_valider_pv(jeu):
+    joueur = jeu.get_joueur(request.sid)
+    if joueur: jeu.valider_pv(joueur)
+
+def action_tour(handler):
+    """Action réservée au joueur dont c'est le tour (sous le verrou du salon)"""
+    @functools.wraps(handler)
+    def wrapper(jeu, *args):
+        if jeu.est_tour_de(request.sid): return handler(jeu, *args)
+    return action_salon(wrapper)
+
+@on('valider_debut_tour')
+@action_tour
+def handle_val(jeu): jeu.valider_debut_tour()
+
+@on('action_garder')
+@action_tour
+def handle_garder(jeu, indices): jeu.garder(indices)
+
+@on('action_lancer_regen')
+@action_tour
+def handle_regen_roll(jeu): jeu.lancer_regen()
+
+@on('action_fin_regen')
+@action_tour
+def handle_regen_end(jeu): jeu.fin_regen()
+
+@on('action_lancer_attaque')
+@action_tour
+def handle_atk(jeu): jeu.lancer_attaque()
+
+@on('action_garder_attaque')
+@action_tour
+def handle_g_atk(jeu, indices): jeu.garder_attaque(indices)
+
+@on('action_terminer_attaque')
+@action_tour
+def handle_fin_atk(jeu): jeu.terminer_attaque()
+
+@on('action_suivant')
+@action_tour
+def handle_next(jeu): jeu.suivant()
 
-@socketio.on('action_suivant')
-def handle_next():
-    jeu = get_game(request.sid)
-    if jeu.liste_victimes: jeu.victime_actuelle_idx=jeu.liste_victimes.pop(0); jeu.degats_accumules,jeu.des_gardes,jeu.des_sur_table,jeu.etat=0,[],[],"ATTENTE_LANCER"; jeu.broadcast_etat()
-    else: jeu.passer_suivant()
+@on('rejouer_partie')
+@action_salon
+def handle_replay(jeu):
+    if request.sid == jeu.createur_sid:
+        jeu.reset_jeu()
+        if not demarrer(jeu): jeu.publier()
 
-@socketio.on('rejouer_partie')
-def handle_replay():
-    jeu = get_game(request.sid)
-    if jeu and request.sid == jeu.createur_sid: jeu.reset_jeu(); handle_demarrer()
+# Avec le reloader (python app.py), seul le processus qui sert reprend le journal
+if journal and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN')):
+    restaurer_journal()
+    demarrer_menage()
+    atexit.register(journal.vider, True)
 
-if __name__ == '__main__': socketio.run(app, debug=True)
\ No newline at end of file
+if __name__ == '__main__': socketio.run(app, debug=True)
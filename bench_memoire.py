@@ -0,0 +1,90 @@
+"""Benchmark mémoire du moteur : taille d'un salon et allocations par action (tracemalloc).
+
+Les salons sont en pleine partie, avec comme sur le serveur le dernier état public gardé en mémoire
+(pour les patchs) et un état public recalculé à chaque transition.
+
+    python bench_memoire.py --salons 2000 --joueurs 4 --actions 20000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import metriques
+import moteur
+
+
+class EvenementsServeur(moteur.Evenements):
+    """Fait le travail du serveur à chaque transition : état public + diff avec le précédent"""
+
+    def __init__(self):
+        self.derniers = {}
+        self.patch = None
+
+    def etat(self, partie):
+        etat = partie.etat_public()
+        self.patch = {k: v for k, v in etat.items() if self.derniers.get(partie.id, {}).get(k) != v}
+        self.derniers[partie.id] = etat
+
+
+def creer_salon(num, nb_joueurs, evenements, rng):
+    """Un salon de bots dont la partie a commencé"""
+    jeu = moteur.Partie(f"B{num:05d}", f"Bench {num}", evenements, rng)
+    for i in range(nb_joueurs): jeu.ajouter_joueur(f"SID_{num}_{i}", f"Joueur {i + 1}", True, 'facile')
+    jeu.demarrer()
+    for j in jeu.joueurs: jeu.valider_pv(j)
+    return jeu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire par salon et allocations par action")
+    parser.add_argument('--salons', type=int, default=2000)
+    parser.add_argument('--joueurs', type=int, default=4)
+    parser.add_argument('--actions', type=int, default=20000)
+    parser.add_argument('--graine', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.graine)
+    evenements = EvenementsServeur()
+
+    # 1. Mémoire retenue par salon
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    salons = [creer_salon(i, args.joueurs, evenements, rng) for i in range(args.salons)]
+    par_salon = (tracemalloc.get_traced_memory()[0] - avant) / args.salons
+    profonde = metriques.taille_profonde(salons[0], {id(evenements), id(rng)})
+    print(f"Salon à {args.joueurs} joueurs : {par_salon:.0f} octets (tracemalloc, avec l'état public gardé), "
+          f"{profonde} octets (objet Partie seul)")
+
+    # 2. Allocations transitoires par action de jeu (pic au-dessus de la mémoire retenue)
+    pics, duree = 0, 0.0
+    for n in range(args.actions):
+        jeu = salons[n % len(salons)]
+        if jeu.etat == "FIN":
+            jeu.reset_jeu(); jeu.demarrer()
+            for j in jeu.joueurs: jeu.valider_pv(j)
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        debut = time.perf_counter()
+        moteur.bot_jouer(jeu)
+        duree += time.perf_counter() - debut
+        pics += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print(f"Action : {pics / args.actions:.0f} octets alloués au pic, {1e6 * duree / args.actions:.1f} µs (sous tracemalloc)")
+
+    # 3. Même boucle sans tracemalloc, pour le temps réel (meilleur de 5 passes)
+    durees = []
+    for _ in range(5):
+        debut = time.perf_counter()
+        for n in range(args.actions):
+            jeu = salons[n % len(salons)]
+            if jeu.etat == "FIN":
+                jeu.reset_jeu(); jeu.demarrer()
+                for j in jeu.joueurs: jeu.valider_pv(j)
+            moteur.bot_jouer(jeu)
+        durees.append(time.perf_counter() - debut)
+    print(f"Action : {1e6 * min(durees) / args.actions:.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
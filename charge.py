@@ -0,0 +1,271 @@
+"""Test de charge : N faux joueurs humains contre un serveur, salon par salon.
+
+Chaque client est un vrai client Socket.IO (websocket) qui suit le même parcours que le navigateur :
+join_hall, creer_salon / rejoindre, demarrer_partie, valider_pv, puis les actions de son tour, et
+rejouer_partie en fin de partie. On ajoute des salons par paliers et, pour chaque palier, on mesure :
+    - le temps aller-retour des évènements (émission -> accusé de réception du serveur), par pourcentile
+    - les émissions et réceptions par seconde, les octets reçus par seconde (JSON)
+    - le CPU et la mémoire (RSS) du serveur, lus dans /proc
+
+    python charge.py --lancer --salons 50 --pas 5                  # démarre le serveur (1 worker)
+    python charge.py --url http://127.0.0.1:5000 --pid 1234        # serveur déjà lancé
+
+Les clients tournent dans ce seul processus Python : si le CPU du serveur reste bas alors que la
+latence monte, c'est le générateur qui sature ; lancer alors plusieurs instances (--pid sur le même serveur).
+Nécessite python-socketio[client] (pas utilisé par le serveur).
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import socketio
+except ImportError:
+    sys.exit("Le test de charge a besoin du client Socket.IO : pip install \"python-socketio[client]\"")
+
+import moteur
+from ordonnanceur import Ordonnanceur
+
+
+def lancer_thread(fn, *args):
+    threading.Thread(target=fn, args=args, daemon=True).start()
+
+
+class Mesures:
+    """Compteurs partagés par tous les clients, remis à zéro à chaque palier"""
+
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.verrou:
+            self.debut = time.monotonic()
+            self.rtt = {}  # évènement -> [secondes]
+            self.emis = self.recus = self.octets = 0
+            self.parties = 0
+
+    def emission(self, evt, t0):
+        with self.verrou: self.emis += 1
+        return lambda *_: self.accuse(evt, t0)
+
+    def accuse(self, evt, t0):
+        with self.verrou: self.rtt.setdefault(evt, []).append(time.perf_counter() - t0)
+
+    def reception(self, evt, args):
+        taille = len(evt) + len(json.dumps(args, separators=(',', ':'), ensure_ascii=False).encode())
+        with self.verrou: self.recus += 1; self.octets += taille
+
+
+mesures = Mesures()
+actions = Ordonnanceur(lancer_thread)  # Les "réflexions" des joueurs, une au plus par client
+
+
+class JoueurSimule:
+    """Un faux humain : garde l'état du salon à jour (snapshots + patchs) et joue quand c'est son tour"""
+
+    def __init__(self, num, url, reflexion, salon):
+        self.num, self.url, self.reflexion, self.salon = num, url, reflexion, salon
+        self.nom = f"Charge {num}"
+        self.etat = None
+        self.seq_action = None  # On n'agit qu'une fois par état reçu
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('*', self.recevoir)
+
+    def connecter(self):
+        self.sio.connect(self.url, transports=['websocket'])
+        self.sid = self.sio.get_sid()
+        self.emettre('join_hall')
+
+    def emettre(self, evt, *args):
+        t0 = time.perf_counter()
+        self.sio.emit(evt, args[0] if args else None, callback=mesures.emission(evt, t0))
+
+    def recevoir(self, evt, *args):
+        mesures.reception(evt, args)
+        data = args[0] if args else None
+        if evt == 'lot':  # Plusieurs messages d'une même action, dans une seule trame (comptée une fois)
+            for e, d in data: self.traiter(e, d)
+        else:
+            self.traiter(evt, data)
+
+    def traiter(self, evt, data):
+        if evt == 'salon_cree':
+            self.salon['room_id'] = data['room_id']
+            self.emettre('rejoindre', {'room_id': data['room_id'], 'nom': self.nom})
+            self.salon['pret'].set()
+        elif evt == 'update_jeu':
+            self.etat = data
+            self.planifier()
+        elif evt == 'patch_jeu' and self.etat is not None:
+            if data['seq'] != self.etat['seq'] + 1:
+                self.emettre('demander_etat')
+                return
+            for i, j in data.pop('joueurs_maj', []): self.etat['joueurs'][i] = j
+            self.etat.update(data)
+            self.planifier()
+
+    def planifier(self):
+        actions.planifier(self.num, self.reflexion, self.agir)
+
+    def agir(self):
+        e = self.etat
+        if e is None or e['seq'] == self.seq_action: return
+        moi = next((j for j in e['joueurs'] if j['sid'] == self.sid), None)
+        if not moi: return
+        createur = e['createur_sid'] == self.sid
+        mon_tour = e['joueur_actuel_sid'] == self.sid
+        action = None
+
+        if e['etat'] == "ATTENTE":
+            if createur and len(e['joueurs']) >= self.salon['joueurs']: action = ('demarrer_partie',)
+        elif e['etat'] == "FIN":
+            if createur: action = ('rejouer_partie',)
+        elif e['etat'] == "ATTRIBUTION_PV":
+            if not moi['est_pret']: action = ('valider_pv',)
+        elif mon_tour:
+            if e['etat'] == "TRANSITION_TOUR": action = ('valider_debut_tour',)
+            elif e['etat'] == "TOUR_CHOIX" and e['des_table']:
+                action = ('action_garder', moteur.choix_bot(e['des_table'], e['des_gardes']))
+            elif e['etat'] == "TOUR_REGEN": action = ('action_lancer_regen',)
+            elif e['etat'] == "RESULTAT_REGEN": action = ('action_fin_regen',)
+            elif e['etat'] == "ATTENTE_LANCER": action = ('action_lancer_attaque',)
+            elif e['etat'] == "TOUR_ATTAQUE":
+                action = ('action_garder_attaque', [i for i, d in enumerate(e['des_table']) if d == e['valeur_killer']])
+            elif e['etat'] in ("FIN_ATTAQUE", "ATTAQUE_RATEE"): action = ('action_terminer_attaque',)
+            elif e['etat'] == "RESULTAT_ATTAQUE": action = ('action_suivant',)
+
+        if action:
+            self.seq_action = e['seq']
+            if action[0] == 'rejouer_partie':
+                with mesures.verrou: mesures.parties += 1
+            self.emettre(*action)
+
+    def deconnecter(self):
+        try: self.sio.disconnect()
+        except Exception: pass
+
+
+def creer_salon(num, url, nb_joueurs, reflexion):
+    """Un salon de nb_joueurs faux humains : le premier le crée, les autres le rejoignent"""
+    salon = {'room_id': None, 'pret': threading.Event(), 'joueurs': nb_joueurs}
+    clients = [JoueurSimule(num * nb_joueurs + i, url, reflexion, salon) for i in range(nb_joueurs)]
+    for c in clients: c.connecter()
+    clients[0].emettre('creer_salon', {'nom_salon': f"Charge {num}"})
+    if not salon['pret'].wait(30): raise RuntimeError(f"Salon {num} : pas de réponse à creer_salon")
+    for c in clients[1:]: c.emettre('rejoindre', {'room_id': salon['room_id'], 'nom': c.nom})
+    return clients
+
+
+# --- SERVEUR ---
+def processus(pid):
+    """pid et tous ses descendants (workers gunicorn, reloader...)"""
+    pids, a_voir = [], [pid]
+    while a_voir:
+        p = a_voir.pop()
+        pids.append(p)
+        try:
+            for tache in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{tache}/children") as f: a_voir += [int(x) for x in f.read().split()]
+        except OSError: pass
+    return pids
+
+
+def conso_serveur(pid):
+    """(secondes CPU cumulées, RSS en octets) du serveur et de ses enfants"""
+    cpu = rss = 0
+    for p in processus(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f: champs = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(champs[11]) + int(champs[12])) / os.sysconf('SC_CLK_TCK')
+            rss += int(champs[21]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError: pass
+    return cpu, rss
+
+
+def lancer_serveur(port):
+    """Un seul worker eventlet, comme une instance du Procfile"""
+    code = f"import app; app.socketio.run(app.app, host='127.0.0.1', port={port}, log_output=False)"
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return proc
+        except OSError: time.sleep(0.05)
+    proc.kill()
+    sys.exit("Le serveur n'a pas démarré")
+
+
+# --- RAPPORT ---
+def pourcentile(valeurs, q):
+    return valeurs[min(len(valeurs) - 1, int(q * len(valeurs)))] if valeurs else float('nan')
+
+
+def palier(nb_salons, nb_clients, pid, duree):
+    mesures.reset()
+    cpu0 = conso_serveur(pid)[0] if pid else 0
+    time.sleep(duree)
+    with mesures.verrou:
+        ecoule = time.monotonic() - mesures.debut
+        rtt = sorted(t for ts in mesures.rtt.values() for t in ts)
+        par_evt = {e: sorted(ts) for e, ts in mesures.rtt.items()}
+        emis, recus, octets, parties = mesures.emis, mesures.recus, mesures.octets, mesures.parties
+    ligne = (f"{nb_salons:6d} {nb_clients:7d} {1000 * pourcentile(rtt, .5):7.1f} {1000 * pourcentile(rtt, .95):7.1f} "
+             f"{1000 * pourcentile(rtt, .99):7.1f} {emis / ecoule:8.0f} {recus / ecoule:8.0f} {octets / ecoule / 1024:8.1f} "
+             f"{parties / ecoule * 60:7.1f}")
+    if pid:
+        cpu, rss = conso_serveur(pid)
+        ligne += f" {100 * (cpu - cpu0) / ecoule:6.0f} {rss / 2 ** 20:7.1f}"
+    print(ligne, flush=True)
+    return rtt, par_evt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du serveur Killer")
+    parser.add_argument('--url', default=None, help="serveur à tester (défaut : celui lancé par --lancer)")
+    parser.add_argument('--lancer', action='store_true', help="lance le serveur (un worker) et le mesure")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--pid', type=int, default=None, help="pid du serveur déjà lancé, pour CPU/RSS")
+    parser.add_argument('--salons', type=int, default=20, help="nombre de salons au dernier palier")
+    parser.add_argument('--pas', type=int, default=5, help="salons ajoutés à chaque palier")
+    parser.add_argument('--joueurs', type=int, default=3, help="joueurs humains par salon")
+    parser.add_argument('--reflexion', type=float, default=0.2, help="secondes entre un état reçu et l'action")
+    parser.add_argument('--duree', type=float, default=5.0, help="secondes de mesure par palier")
+    parser.add_argument('--seuil', type=float, default=1.0, help="arrêt si le p95 dépasse ce temps (s)")
+    args = parser.parse_args()
+
+    serveur = None
+    if args.lancer:
+        serveur = lancer_serveur(args.port)
+        args.pid = serveur.pid
+    url = args.url or f"http://127.0.0.1:{args.port}"
+
+    clients = []
+    print("salons clients  p50 ms  p95 ms  p99 ms  émis/s  reçus/s    Ko/s  part/min" + ("   CPU%  RSS Mo" if args.pid else ""))
+    try:
+        while len(clients) < args.salons * args.joueurs:
+            debut = len(clients) // args.joueurs
+            for num in range(debut, min(debut + args.pas, args.salons)):
+                clients += creer_salon(num, url, args.joueurs, args.reflexion)
+            rtt, par_evt = palier(len(clients) // args.joueurs, len(clients), args.pid, args.duree)
+            if pourcentile(rtt, .95) > args.seuil:
+                print(f"Saturé : p95 > {args.seuil * 1000:.0f} ms")
+                break
+        print("Dernier palier, par évènement (p50 / p95 ms, nombre) :")
+        for evt, ts in sorted(par_evt.items()):
+            print(f"  {evt:24s} {1000 * pourcentile(ts, .5):7.1f} {1000 * pourcentile(ts, .95):7.1f} {len(ts):7d}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for c in clients: c.deconnecter()
+        if serveur: serveur.terminate(); serveur.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Format compact des états de jeu (sur demande du client) : MessagePack, champs numérotés, joueurs
+désignés par leur index, compression zlib des gros messages.
+
+Le client le demande à join_hall / rejoindre / reprendre ({'format': 'mp'}) ; il reçoit alors
+'update_jeu_mp' et 'patch_jeu_mp' (binaires) au lieu de 'update_jeu' et 'patch_jeu'.
+static/compact.js (et `decoder` + `etendre` ici) les redonnent sous la forme JSON habituelle.
+
+Trame : 1 octet (0 = MessagePack, 1 = MessagePack compressé zlib) puis les données, une map
+{numéro de champ (CHAMPS): valeur} où :
+    joueurs            [[sid, nom, pv, is_bot, est_pret, niveau, deconnecte, des_pv], ...]
+    joueurs_maj        [[index, [None, nom, pv, ...]], ...]   le sid ne change pas, il n'est pas renvoyé
+    joueur_actuel_sid  index du joueur (-1 : aucun) ; joueur_actuel (son nom) n'est pas envoyé
+    createur_sid       index du joueur (-1 : aucun)
+    etat               rang dans ETATS
+    depuis             (flux des spectateurs) seq de l'état auquel le patch s'applique
+Les index sont renvoyés dès que la liste des joueurs change de composition.
+
+    python compact.py --joueurs 4 10 20     # octets et temps d'encodage, JSON contre compact
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # Le format compact est alors refusé : tout le monde reste en JSON
+    msgpack = None
+
+disponible = msgpack is not None
+
+CHAMPS = ('seq', 'joueurs', 'joueurs_maj', 'etat', 'joueur_actuel_sid', 'des_table', 'des_gardes', 'message',
+          'valeur_killer', 'nom_victime', 'degats_accumules', 'vainqueur', 'createur_sid', 'room_id', 'nom_salon',
+          'depuis')
+NUMEROS = {c: i for i, c in enumerate(CHAMPS)}
+CHAMPS_JOUEUR = ('sid', 'nom', 'pv', 'is_bot', 'est_pret', 'niveau', 'deconnecte', 'des_pv')
+ETATS = ("ATTENTE", "ATTRIBUTION_PV", "TRANSITION_TOUR", "TOUR_CHOIX", "TOUR_REGEN", "RESULTAT_REGEN",
+         "ATTENTE_LANCER", "TOUR_ATTAQUE", "ATTAQUE_RATEE", "FIN_ATTAQUE", "RESULTAT_ATTAQUE", "FIN")
+RANGS_ETATS = {e: i for i, e in enumerate(ETATS)}
+SEUIL_COMPRESSION = 256  # octets : en dessous, zlib ne gagne presque rien et coûte du temps
+JSON_SEPARATEURS = (',', ':')  # Comme Socket.IO
+
+
+def joueur(j, avec_sid=True):
+    return [j['sid'] if avec_sid else None, j['nom'], j['pv'], j['is_bot'], j['est_pret'], j['niveau'],
+            j['deconnecte'], j['des_pv']]
+
+
+def index_sid(sids, sid):
+    try: return sids.index(sid)
+    except ValueError: return -1
+
+
+def compacter(donnees, etat):
+    """Patch (ou état complet) -> map compacte ; `etat` est l'état public complet correspondant"""
+    c = {}
+    for k, v in donnees.items():
+        if k == 'joueur_actuel': continue
+        if k == 'joueurs': v = [joueur(j) for j in v]
+        elif k == 'joueurs_maj': v = [[i, joueur(j, False)] for i, j in v]
+        elif k == 'etat': v = RANGS_ETATS[v]
+        elif k == 'joueur_actuel_sid' or k == 'createur_sid': continue  # Voir plus bas
+        c[NUMEROS[k]] = v
+    if 'joueurs' in donnees or 'joueur_actuel_sid' in donnees or 'createur_sid' in donnees:
+        sids = [j['sid'] for j in etat['joueurs']]
+        c[NUMEROS['joueur_actuel_sid']] = index_sid(sids, etat['joueur_actuel_sid'])
+        c[NUMEROS['createur_sid']] = index_sid(sids, etat['createur_sid'])
+    return c
+
+
+def encoder(donnees, etat):
+    """Trame binaire d'un patch ou d'un état complet"""
+    brut = msgpack.packb(compacter(donnees, etat))
+    if len(brut) > SEUIL_COMPRESSION:
+        comprime = zlib.compress(brut, 1)
+        if len(comprime) < len(brut): return b'\x01' + comprime
+    return b'\x00' + brut
+
+
+def decoder(trame):
+    """Trame -> map compacte (numéros de champs)"""
+    donnees = zlib.decompress(trame[1:]) if trame[0] == 1 else trame[1:]
+    return msgpack.unpackb(donnees, strict_map_key=False)
+
+
+def etendre(c, courant=None):
+    """Map compacte -> patch (ou état) sous la forme JSON ; `courant` : état du client avant le patch"""
+    d = {CHAMPS[k]: v for k, v in c.items()}
+    if 'etat' in d: d['etat'] = ETATS[d['etat']]
+    if 'joueurs' in d: d['joueurs'] = [dict(zip(CHAMPS_JOUEUR, j)) for j in d['joueurs']]
+    if 'joueurs_maj' in d:
+        d['joueurs_maj'] = [[i, dict(zip(CHAMPS_JOUEUR, j), sid=courant['joueurs'][i]['sid'])] for i, j in d['joueurs_maj']]
+    liste = d.get('joueurs') or (courant or {}).get('joueurs', [])
+    if 'joueur_actuel_sid' in d:
+        i = d['joueur_actuel_sid']
+        d['joueur_actuel_sid'], d['joueur_actuel'] = (liste[i]['sid'], liste[i]['nom']) if i >= 0 else ("", "")
+    if 'createur_sid' in d:
+        i = d['createur_sid']
+        d['createur_sid'] = liste[i]['sid'] if i >= 0 else None
+    return d
+
+
+# --- BENCHMARK ---
+def mesurer(nb_joueurs, nb_parties, graine=1):
+    """Rejoue des parties de bots et encode chaque état (snapshot) et chaque patch dans les deux formats"""
+    import moteur
+
+    class Mesure(moteur.Evenements):
+        def __init__(self):
+            self.dernier = None
+            self.totaux = {k: [0, 0.0, 0] for k in ('json_etat', 'mp_etat', 'json_patch', 'mp_patch')}
+            self.verifies = 0
+            self.seq = 0
+
+        def compter(self, cle, fn):
+            debut = time.perf_counter()
+            octets = fn()
+            t = self.totaux[cle]
+            t[0] += len(octets); t[1] += time.perf_counter() - debut; t[2] += 1
+            return octets
+
+        def etat(self, partie):
+            etat = partie.etat_public()
+            patch = moteur.diff_etat(self.dernier, etat)
+            if not patch: return
+            self.seq += 1
+            patch['seq'] = etat['seq'] = self.seq
+            self.compter('json_etat', lambda: json.dumps(['update_jeu', etat], separators=JSON_SEPARATEURS).encode())
+            self.compter('mp_etat', lambda: encoder(etat, etat))
+            self.compter('json_patch', lambda: json.dumps(['patch_jeu', patch], separators=JSON_SEPARATEURS).encode())
+            trame = self.compter('mp_patch', lambda: encoder(patch, etat))
+
+            # Le client compact doit retrouver exactement l'état JSON
+            if self.dernier is not None:
+                client = json.loads(json.dumps(self.dernier))
+                p = etendre(decoder(trame), client)
+                for i, j in p.pop('joueurs_maj', []): client['joueurs'][i] = j
+                client.update(p)
+                client['seq'] = etat['seq']
+                assert client == json.loads(json.dumps(etat)), (client, etat)
+                self.verifies += 1
+            self.dernier = etat
+
+    rng = random.Random(graine)
+    mesure = Mesure()
+    for num in range(nb_parties):
+        jeu = moteur.Partie(f"B{num:05d}", f"Bench {num}", mesure, rng)
+        for i in range(nb_joueurs): jeu.ajouter_joueur(f"{rng.getrandbits(100):020x}", f"Joueur {i + 1}", True, 'facile')
+        mesure.dernier = None
+        jeu.demarrer()
+        for j in jeu.joueurs: jeu.valider_pv(j)
+        while jeu.etat != "FIN": moteur.bot_jouer(jeu)
+    return mesure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Format compact contre JSON : octets et temps d'encodage")
+    parser.add_argument('--joueurs', type=int, nargs='+', default=[4, 10, 20])
+    parser.add_argument('--parties', type=int, default=50)
+    args = parser.parse_args()
+    if not disponible: raise SystemExit("Le format compact a besoin de msgpack : pip install msgpack")
+
+    print("joueurs  message     JSON o   compact o   gain    JSON µs  compact µs")
+    for n in args.joueurs:
+        m = mesurer(n, args.parties)
+        for quoi in ('etat', 'patch'):
+            (oj, tj, nb), (om, tm, _) = m.totaux['json_' + quoi], m.totaux['mp_' + quoi]
+            print(f"{n:7d}  {quoi:8s} {oj / nb:9.0f} {om / nb:11.0f} {100 * (1 - om / oj):5.0f} % "
+                  f"{1e6 * tj / nb:9.1f} {1e6 * tm / nb:11.1f}")
+        print(f"         ({m.verifies} patchs décodés et vérifiés)")
+
+
+if __name__ == '__main__':
+    main()
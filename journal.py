@@ -0,0 +1,262 @@
+"""Journal des parties : fichier local en ajout seul, pour retrouver les salons après un redémarrage.
+
+Une ligne JSON par enregistrement, dans des segments journal-000001.jsonl, journal-000002.jsonl... :
+    {"t": "s", "r": salon, "s": snapshot}                        état complet du salon
+    {"t": "a", "r": salon, "a": action, "p": args, "k": kwargs,  action du moteur (voir moteur.journalise)
+     "d": dés tirés, "v": variations de PV}
+    {"t": "x", "r": salon}                                        salon supprimé
+
+Les handlers ne font qu'ajouter l'enregistrement à une liste : une seule tâche de fond encode et écrit
+par lots (une écriture, un flush par lot). Encodage, écriture et fsync passent par `executer`
+(eventlet.tpool.execute sur le serveur) : ils tournent dans un vrai thread, la boucle d'évènements n'attend
+jamais le disque. L'encodage lui dispute encore le GIL, par tranches de quelques ms (sys.getswitchinterval).
+
+Au démarrage, `relire` donne pour chaque salon vivant son dernier snapshot et les actions qui le
+suivent. Le serveur écrit régulièrement des snapshots ; quand un segment devient trop gros, il en
+ouvre un nouveau, y écrit un snapshot de chaque salon puis fait supprimer les anciens (`compacter`).
+
+    python journal.py --salons 5000      # temps de reprise pour 5000 salons en cours de partie (objectif 3 s)
+"""
+import argparse
+import gc
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+NOUVEAU_SEGMENT = object()
+PURGER = object()
+
+
+class Journal:
+
+    def __init__(self, dossier, lanceur, periode=0.05, taille_segment=64 * 2 ** 20, fsync=False, executer=None):
+        self.dossier = dossier
+        self.lanceur = lanceur  # ex: socketio.start_background_task
+        self.executer = executer or (lambda fn, *args: fn(*args))  # ex: eventlet.tpool.execute
+        self.periode = periode  # secondes d'attente pour regrouper un lot
+        self.taille_segment = taille_segment
+        self.fsync = fsync
+        os.makedirs(dossier, exist_ok=True)
+        self.a_ecrire = []
+        self.cond = threading.Condition()
+        self.demarre = False
+        self.fichier = None
+        self.numero = max(self.segments(), default=(0, None))[0]
+        self.taille = 0
+
+        # Métriques
+        self.lots = 0
+        self.enregistrements = 0
+        self.octets = 0
+        self.duree_ecriture = 0.0
+
+    def chemin(self, numero): return os.path.join(self.dossier, f"journal-{numero:06d}.jsonl")
+
+    def segments(self):
+        """[(numéro, chemin)] dans l'ordre"""
+        segments = []
+        for chemin in glob.glob(os.path.join(self.dossier, "journal-*.jsonl")):
+            try: segments.append((int(os.path.basename(chemin)[8:-6]), chemin))
+            except ValueError: pass
+        return sorted(segments)
+
+    # --- ECRITURE ---
+    def ajouter(self, enreg):
+        """Non bloquant. L'enregistrement est encodé plus tard, hors de la boucle d'évènements : il ne doit
+        plus être modifié (un snapshot ne partage rien de mutable avec le salon, voir Partie.to_snapshot)"""
+        with self.cond:
+            self.a_ecrire.append(enreg)
+            if not self.demarre:
+                self.demarre = True
+                self.lanceur(self.boucle)
+            self.cond.notify()
+
+    def snapshot(self, rid, snap): self.ajouter({'t': 's', 'r': rid, 's': snap})
+
+    def action(self, rid, nom, args, kwargs, des, variations):
+        enreg = {'t': 'a', 'r': rid, 'a': nom, 'p': args, 'd': des, 'v': variations}
+        if kwargs: enreg['k'] = kwargs
+        self.ajouter(enreg)
+
+    def suppression(self, rid): self.ajouter({'t': 'x', 'r': rid})
+
+    def compacter(self, snapshots):
+        """Nouveau segment qui commence par `snapshots` (itérable de (rid, snapshot), un par salon
+        vivant), puis suppression des segments précédents une fois ces snapshots écrits"""
+        self.ajouter(NOUVEAU_SEGMENT)
+        for rid, snap in snapshots: self.snapshot(rid, snap)
+        self.ajouter(PURGER)
+
+    def a_compacter(self): return self.taille > self.taille_segment
+
+    def boucle(self):
+        while True:
+            with self.cond:
+                while not self.a_ecrire: self.cond.wait()
+            time.sleep(self.periode)  # On laisse le lot se remplir
+            try:
+                self.vider()
+            except Exception:
+                log.exception("Ecriture du journal en erreur")
+
+    def vider(self, sur_place=False):
+        """Ecrit tout ce qui attend (appelé par la tâche de fond ; aussi à l'arrêt, `sur_place`)"""
+        with self.cond: lot, self.a_ecrire = self.a_ecrire, []
+        if not lot: return
+        debut = time.perf_counter()
+        if sur_place: self.ecrire_lot(lot)
+        else: self.executer(self.ecrire_lot, lot)
+        self.lots += 1
+        self.enregistrements += len(lot)
+        self.duree_ecriture += time.perf_counter() - debut
+
+    def ecrire_lot(self, lot):
+        # Seule la tâche d'écriture touche au fichier : rien à verrouiller
+        lignes = []
+        for enreg in lot:
+            if enreg is NOUVEAU_SEGMENT or enreg is PURGER:
+                self.ecrire(lignes); lignes = []
+                if enreg is NOUVEAU_SEGMENT: self.ouvrir(self.numero + 1)
+                else: self.purger()
+            else:
+                lignes.append(json.dumps(enreg, separators=(',', ':'), ensure_ascii=False))
+        self.ecrire(lignes)
+
+    def ouvrir(self, numero):
+        if self.fichier: self.fichier.close()
+        self.numero = numero
+        self.fichier = open(self.chemin(numero), 'a', encoding='utf-8')
+        self.taille = self.fichier.tell()
+
+    def ecrire(self, lignes):
+        if not lignes: return
+        if self.fichier is None: self.ouvrir(max(self.numero, 1))
+        texte = '\n'.join(lignes) + '\n'
+        self.fichier.write(texte)
+        self.fichier.flush()
+        if self.fsync: os.fsync(self.fichier.fileno())
+        taille = len(texte.encode())
+        self.taille += taille
+        self.octets += taille
+
+    def purger(self):
+        for numero, chemin in self.segments():
+            if numero < self.numero: os.remove(chemin)
+
+    def stats(self):
+        return {
+            'en_attente': len(self.a_ecrire),
+            'lots': self.lots,
+            'enregistrements': self.enregistrements,
+            'octets': self.octets,
+            'duree_ecriture': self.duree_ecriture,
+            'taille_segment': self.taille,
+        }
+
+    # --- LECTURE ---
+    def relire(self):
+        """{rid: (dernier snapshot, [actions qui le suivent])} des salons non supprimés.
+
+        Seul le début de chaque ligne est lu (type et salon, toujours en tête) : on ne décode que le
+        dernier snapshot de chaque salon et les actions qui le suivent."""
+        # Des centaines de milliers de petits objets qui vivent tous : le ramasse-miettes ne ferait que les parcourir
+        gc_actif = gc.isenabled()
+        gc.disable()
+        try: return self.lire_segments()
+        finally:
+            if gc_actif: gc.enable()
+
+    def lire_segments(self):
+        lignes = {}
+        for _, chemin in self.segments():
+            with open(chemin, encoding='utf-8') as f:
+                for num, ligne in enumerate(f, 1):
+                    if not ligne.endswith('\n') or ligne[7:14] != '","r":"':
+                        # Dernière ligne coupée par un arrêt brutal : le reste du segment est ignoré
+                        log.warning("%s:%d illisible, fin du segment ignorée", chemin, num)
+                        break
+                    t, rid = ligne[6], ligne[14:ligne.index('"', 14)]
+                    if t == 'a':
+                        if rid in lignes: lignes[rid][1].append(ligne)
+                    elif t == 's': lignes[rid] = (ligne, [])
+                    elif t == 'x': lignes.pop(rid, None)
+
+        salons = {}
+        for rid, (snap, actions) in lignes.items():
+            try: salons[rid] = (json.loads(snap)['s'], [json.loads(a) for a in actions])
+            except ValueError: log.warning("Salon %s illisible dans le journal, ignoré", rid)
+        return salons
+
+
+# --- OUTILS ---
+def mesurer_reprise(nb_salons, nb_joueurs, actions_max, dossier, graine=1):
+    """Ecrit le journal de `nb_salons` parties de bots arrêtées en cours de route, puis mesure
+    la relecture et la reconstruction des salons (ce que fait le serveur au démarrage)"""
+    import moteur
+
+    class EvenementsJournal(moteur.Evenements):
+        journal = True
+
+        def action(self, partie, nom, args, kwargs, des, variations):
+            journal.action(partie.id, nom, args, kwargs, des, variations)
+            depuis[partie.id] = depuis.get(partie.id, 0) + 1
+            if depuis[partie.id] >= actions_max:
+                depuis[partie.id] = 0
+                journal.snapshot(partie.id, partie.to_snapshot())
+
+    for _, chemin in Journal(dossier, None).segments(): os.remove(chemin)
+    journal = Journal(dossier, lambda fn: None)  # Pas de tâche de fond : on vide à la main
+    rng, depuis, evenements = random.Random(graine), {}, EvenementsJournal()
+    etapes = 0
+    for num in range(nb_salons):
+        jeu = moteur.Partie(f"J{num:05d}", f"Salon {num}", evenements, rng)
+        journal.snapshot(jeu.id, jeu.to_snapshot())
+        for i in range(nb_joueurs): jeu.ajouter_bot()
+        jeu.demarrer()
+        for j in jeu.joueurs: jeu.valider_pv(j)
+        for _ in range(rng.randrange(300)):
+            if jeu.etat == "FIN": break
+            moteur.bot_jouer(jeu); etapes += 1
+        if len(journal.a_ecrire) > 10000: journal.vider()
+    journal.vider()
+    print(f"{nb_salons} salons, {etapes} actions, journal de {journal.octets / 2 ** 20:.1f} Mo")
+
+    debut = time.perf_counter()
+    salons = Journal(dossier, None).relire()
+    lecture = time.perf_counter() - debut
+    rejouees = divergences = 0
+    gc.disable()
+    for rid, (snap, actions) in salons.items():
+        jeu = moteur.Partie(rid, snap['nom_salon'])
+        jeu.charger_snapshot(snap)
+        for a in actions:
+            rejouees += 1
+            if not jeu.rejouer(a['a'], a['p'], a.get('k', {}), a['d'], a['v']): divergences += 1; break
+    gc.enable()
+    total = time.perf_counter() - debut
+    print(f"Reprise : {total:.2f} s ({lecture:.2f} s de lecture, {rejouees} actions rejouées, {divergences} divergences)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de reprise depuis le journal")
+    parser.add_argument('--salons', type=int, default=5000)
+    parser.add_argument('--joueurs', type=int, default=4)
+    parser.add_argument('--snapshot', type=int, default=50, help="actions entre deux snapshots d'un salon")
+    parser.add_argument('--dossier', default='/tmp/killer-journal-bench')
+    parser.add_argument('--objectif', type=float, default=3.0, help="secondes de reprise à ne pas dépasser")
+    args = parser.parse_args()
+    duree = mesurer_reprise(args.salons, args.joueurs, args.snapshot, args.dossier)
+    if duree > args.objectif: sys.exit(f"Objectif manqué : {duree:.2f} s > {args.objectif:.2f} s")
+    print(f"Objectif atteint : {duree:.2f} s <= {args.objectif:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
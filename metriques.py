@@ -0,0 +1,161 @@
+"""Métriques du serveur au format texte de Prometheus (route /metrics), sans dépendance.
+
+Compteurs, jauges et histogrammes, avec étiquettes. Une jauge (ou un compteur) peut être calculée à
+la lecture par une fonction, pour ce qui existe déjà ailleurs (salons, sids, ordonnanceur).
+Chaque worker expose ses propres valeurs : Prometheus les agrège.
+"""
+import bisect
+import functools
+import json
+import sys
+import threading
+import time
+import types
+
+METRIQUES = []
+
+SEAUX_SECONDES = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+SEAUX_OCTETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+SEAUX_NOMBRE = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def echapper(v):
+    return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_etiquettes(noms, valeurs, extra=''):
+    paires = [f'{n}="{echapper(v)}"' for n, v in zip(noms, valeurs)]
+    if extra: paires.append(extra)
+    return '{' + ','.join(paires) + '}' if paires else ''
+
+
+class Metrique:
+    type = 'untyped'
+
+    def __init__(self, nom, aide, etiquettes=(), fonction=None):
+        self.nom, self.aide, self.etiquettes = nom, aide, tuple(etiquettes)
+        # fonction() -> valeur, ou {tuple d'étiquettes: valeur}, lue à chaque exposition
+        self.fonction = fonction
+        self.valeurs = {}
+        self.verrou = threading.Lock()
+        METRIQUES.append(self)
+
+    def cle(self, etiquettes): return tuple(str(etiquettes[e]) for e in self.etiquettes)
+
+    def retirer(self, **etiquettes):
+        with self.verrou: self.valeurs.pop(self.cle(etiquettes), None)
+
+    def inc(self, n=1, **etiquettes):
+        cle = self.cle(etiquettes)
+        with self.verrou: self.valeurs[cle] = self.valeurs.get(cle, 0) + n
+
+    def lignes(self):
+        if self.fonction:
+            valeurs = self.fonction()
+            if not isinstance(valeurs, dict): valeurs = {(): valeurs}
+        else:
+            with self.verrou: valeurs = dict(self.valeurs)
+        return [f"{self.nom}{format_etiquettes(self.etiquettes, cle)} {v}" for cle, v in sorted(valeurs.items())]
+
+
+class Compteur(Metrique):
+    type = 'counter'
+
+
+class Jauge(Metrique):
+    type = 'gauge'
+
+    def set(self, v, **etiquettes):
+        with self.verrou: self.valeurs[self.cle(etiquettes)] = v
+
+
+class Histogramme(Metrique):
+    type = 'histogram'
+
+    def __init__(self, nom, aide, etiquettes=(), seaux=SEAUX_SECONDES):
+        super().__init__(nom, aide, etiquettes)
+        self.seaux = tuple(seaux)
+
+    def observer(self, v, **etiquettes):
+        cle = self.cle(etiquettes)
+        with self.verrou:
+            h = self.valeurs.get(cle)
+            if h is None: h = self.valeurs[cle] = [[0] * (len(self.seaux) + 1), 0.0, 0]
+            h[0][bisect.bisect_left(self.seaux, v)] += 1
+            h[1] += v
+            h[2] += 1
+
+    def lignes(self):
+        with self.verrou: valeurs = {cle: (list(h[0]), h[1], h[2]) for cle, h in self.valeurs.items()}
+        lignes = []
+        for cle, (compte, somme, total) in sorted(valeurs.items()):
+            cumul = 0
+            for borne, n in zip(self.seaux + ('+Inf',), compte):
+                cumul += n
+                le = f'le="{borne}"'
+                lignes.append(f"{self.nom}_bucket{format_etiquettes(self.etiquettes, cle, le)} {cumul}")
+            lignes.append(f"{self.nom}_sum{format_etiquettes(self.etiquettes, cle)} {somme}")
+            lignes.append(f"{self.nom}_count{format_etiquettes(self.etiquettes, cle)} {total}")
+        return lignes
+
+
+def taille_profonde(obj, exclus=()):
+    """Taille mémoire estimée d'un objet et de tout ce qu'il référence (hors modules, classes, fonctions)"""
+    vus, a_voir, total = set(exclus), [obj], 0
+    while a_voir:
+        o = a_voir.pop()
+        if id(o) in vus or isinstance(o, (types.ModuleType, type, types.FunctionType, types.MethodType)): continue
+        vus.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict): a_voir += list(o.keys()) + list(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)): a_voir += list(o)
+        if hasattr(o, '__dict__'): a_voir.append(o.__dict__)
+        for cls in type(o).__mro__:
+            for nom in cls.__dict__.get('__slots__', ()):
+                if hasattr(o, nom): a_voir.append(getattr(o, nom))
+    return total
+
+
+def chronometrer(histogramme, **etiquettes):
+    """Décorateur : durée de chaque appel dans l'histogramme"""
+    def decorateur(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            debut = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: histogramme.observer(time.perf_counter() - debut, **etiquettes)
+        return wrapper
+    return decorateur
+
+
+class JSONMesure:
+    """Module json donné à Socket.IO : mesure l'encodage de chaque paquet émis, par évènement.
+
+    Un paquet est encodé une seule fois, même envoyé à tout un salon. Les paquets binaires (format
+    compact) sont mesurés par l'appelant : ici on ne verrait que leur enveloppe.
+    """
+
+    def __init__(self, temps, octets):
+        self.temps, self.octets = temps, octets
+
+    def dumps(self, obj, *args, **kwargs):
+        debut = time.perf_counter()
+        texte = json.dumps(obj, *args, **kwargs)
+        duree = time.perf_counter() - debut
+        evt = obj[0] if isinstance(obj, list) and obj and isinstance(obj[0], str) else 'autre'
+        if isinstance(obj, list) and len(obj) > 1 and isinstance(obj[1], dict) and obj[1].get('_placeholder'): return texte
+        self.temps.observer(duree, evt=evt)
+        self.octets.observer(len(texte), evt=evt)
+        return texte
+
+    @staticmethod
+    def loads(*args, **kwargs): return json.loads(*args, **kwargs)
+
+
+def exposer():
+    lignes = []
+    for m in METRIQUES:
+        lignes.append(f"# HELP {m.nom} {m.aide}")
+        lignes.append(f"# TYPE {m.nom} {m.type}")
+        lignes += m.lignes()
+    return '\n'.join(lignes) + '\n'
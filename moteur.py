@@ -0,0 +1,741 @@
+"""Règles du Killer, sans aucune entrée/sortie.
+
+Le moteur ne connaît ni Socket.IO ni Flask : chaque transition passe par un puits d'évènements
+(`Evenements`) que la couche serveur branche sur Socket.IO, et qui ne fait rien en simulation.
+
+Etats d'une partie :
+    ATTENTE -> ATTRIBUTION_PV -> TRANSITION_TOUR -> TOUR_CHOIX -> (TOUR_REGEN -> RESULTAT_REGEN)
+    | (ATTENTE_LANCER -> TOUR_ATTAQUE / ATTAQUE_RATEE -> FIN_ATTAQUE -> RESULTAT_ATTAQUE -> ...) -> TRANSITION_TOUR ... -> FIN
+
+En mode `attaque_groupee` (grands salons), un Killer résout d'un coup les chaînes d'attaque contre
+toutes les victimes (en gardant tous les dés Killer) et passe directement au joueur suivant.
+
+Les actions (@journalise) sont déterministes une fois connus les dés tirés : si le puits le demande,
+chacune lui est passée avec ses arguments, ses dés et ses variations de PV, et `Partie.rejouer` la
+reproduit à l'identique (journal du serveur).
+
+`demarrer(graine)` donne au salon son propre flux de dés (`Des`) : la partie est reproductible depuis
+sa graine, gardée avec la position du flux dans le snapshot.
+"""
+import functools
+import random
+import secrets
+from array import array
+
+import politique
+
+
+class Evenements:
+    """Puits d'évènements du moteur : ne fait rien par défaut (simulation)"""
+    journal = False  # True : recevoir chaque action (voir journalise)
+
+    def notification(self, partie, msg, son=None): pass
+
+    def etat(self, partie): pass
+
+    def attaques(self, partie, resultats): pass
+
+    def action(self, partie, nom, args, kwargs, des, variations): pass
+
+
+SILENCE = Evenements()
+
+
+# Dés tirés par blocs d'octets aléatoires, ramenés à 1..6 par rejet (252 = 42 x 6 : sans biais)
+TAILLE_BLOC = 256
+DE_DEPUIS_OCTET = bytes(o % 6 + 1 for o in range(256))
+OCTETS_REJETES = bytes(range(252, 256))
+
+
+class Des:
+    """Flux de dés d'un salon, reproductible depuis sa graine ; `tires` : dés déjà tirés (position)"""
+    __slots__ = ('graine', 'aleas', 'bloc', 'i', 'tires')
+
+    def __init__(self, graine, tires=0):
+        self.graine = graine
+        self.aleas = random.Random(graine)
+        self.bloc, self.i, self.tires = b'', 0, 0
+        self.avancer(tires)
+
+    def remplir(self):
+        self.bloc, self.i = self.aleas.randbytes(TAILLE_BLOC).translate(DE_DEPUIS_OCTET, OCTETS_REJETES), 0
+
+    def randint(self, a, b):
+        # Uniquement des dés à 6 faces (a = 1, b = 6), les seuls tirages du moteur
+        while self.i >= len(self.bloc): self.remplir()
+        v = self.bloc[self.i]
+        self.i += 1
+        self.tires += 1
+        return v
+
+    def avancer(self, n):
+        """Saute n dés (reprise d'un snapshot)"""
+        while n > 0:
+            if self.i >= len(self.bloc): self.remplir()
+            k = min(n, len(self.bloc) - self.i)
+            self.i += k; self.tires += k; n -= k
+
+
+class DesEnregistres:
+    """rng qui note chaque dé tiré"""
+    __slots__ = ('rng', 'des')
+
+    def __init__(self, rng, des): self.rng, self.des = rng, des
+
+    def randint(self, a, b):
+        v = self.rng.randint(a, b)
+        self.des.append(v)
+        return v
+
+
+class DesRejoues:
+    """rng qui redonne les dés d'une action journalisée ; le flux du salon (`suite`) avance d'autant"""
+    __slots__ = ('des', 'i', 'suite')
+
+    def __init__(self, des, suite=None): self.des, self.i, self.suite = des, 0, suite
+
+    def randint(self, a, b):
+        v = self.des[self.i]
+        self.i += 1
+        if self.suite: self.suite.randint(a, b)
+        return v
+
+
+ACTIONS = set()
+ACTIONS_JOUEUR = {'valider_pv', 'retirer_joueur', 'changer_sid'}  # Premier argument : un Joueur (journalisé par sid)
+
+
+def journalise(methode):
+    """Action de jeu : transmise au puits (si evenements.journal) avec les dés tirés et les variations
+    de PV. Une action qui renvoie False n'a rien changé et n'est pas transmise ; une action appelée
+    par une autre fait partie de celle-ci."""
+    nom = methode.__name__
+    ACTIONS.add(nom)
+
+    @functools.wraps(methode)
+    def wrapper(self, *args, **kwargs):
+        if not self.evenements.journal or self.variations is not None: return methode(self, *args, **kwargs)
+        rng, des = self.rng, []
+        journalises = [a.sid if isinstance(a, Joueur) else a for a in args]  # Avant : changer_sid modifie le sid
+        enregistreur = self.rng = DesEnregistres(rng, des)
+        self.variations = []
+        try: resultat = methode(self, *args, **kwargs)
+        finally:
+            variations, self.variations = self.variations, None
+            # Sauf si l'action a changé de flux (demarrer avec une graine : ses dés se déduisent de la graine)
+            if self.rng is enregistreur: self.rng = rng
+        if resultat is not False: self.evenements.action(self, nom, journalises, kwargs, des, variations)
+        return resultat
+    return wrapper
+
+
+# Emplacements des dés sur la table / gardés, indexés par (nb_des << 5 | masque_gardes)
+LIBRES = [tuple(i for i in range(n >> 5) if not n >> i & 1) for n in range(6 << 5)]
+GARDES = [tuple(i for i in range(n >> 5) if n >> i & 1) for n in range(6 << 5)]
+
+
+# --- CLASSES ---
+class Joueur:
+    __slots__ = ('sid', 'nom', 'pv', 'des_pv', 'est_pret', 'is_bot', 'niveau', 'jeton', 'deconnecte', 'deconnecte_jusqua', '_dict')
+
+    def __init__(self, sid, nom, is_bot=False, niveau=None, jeton=None):
+        self.sid = sid
+        self.nom = nom
+        self.pv = 0
+        self.des_pv = ()
+        self.est_pret = False
+        self.is_bot = is_bot
+        self.niveau = niveau  # Bots seulement : facile, moyen ou expert
+        # Humains seulement : secret qui permet de reprendre sa place avec un autre sid (jamais publié)
+        self.jeton = jeton
+        self.deconnecte = False
+        self.deconnecte_jusqua = None  # Déconnecté : heure (time.time) où sa place est libérée (jamais publiée)
+
+    def __setattr__(self, nom, valeur):
+        # Toute modification invalide la forme sérialisée
+        object.__setattr__(self, nom, valeur)
+        object.__setattr__(self, '_dict', None)
+
+    def to_dict(self):
+        """Forme sérialisée, recalculée seulement si le joueur a changé (ne pas la modifier)"""
+        if self._dict is None: object.__setattr__(self, '_dict', self.calculer_dict())
+        return self._dict
+
+    def calculer_dict(self):
+        return {
+            'nom': self.nom,
+            'pv': self.pv,
+            'sid': self.sid,
+            'is_bot': self.is_bot,
+            'est_pret': self.est_pret,
+            'niveau': self.niveau,
+            'deconnecte': self.deconnecte,
+            'des_pv': self.des_pv
+        }
+
+    @classmethod
+    def depuis_dict(cls, d, jeton=None):
+        j = cls(d['sid'], d['nom'], d['is_bot'], d.get('niveau'), jeton)
+        j.pv, j.est_pret, j.des_pv, j.deconnecte = d['pv'], d['est_pret'], tuple(d['des_pv']), d.get('deconnecte', False)
+        return j
+
+
+class Partie:
+    __slots__ = ('id', 'nom_salon', 'joueurs', 'par_sid', 'vivants', 'evenements', 'rng', 'etat', 'joueur_actuel_idx',
+                 'des', 'nb_des', 'masque_gardes', 'message', 'vainqueur', 'vainqueur_sid', 'createur_sid', 'valeur_killer',
+                 'liste_victimes', 'victime_actuelle_idx', 'degats_accumules', 'morts_du_tour', 'nb_tours', 'attaque_groupee', 'variations')
+    CHAMPS_SNAPSHOT = ('nom_salon', 'etat', 'joueur_actuel_idx', 'nb_des', 'masque_gardes', 'message', 'vainqueur',
+                       'createur_sid', 'valeur_killer', 'liste_victimes', 'victime_actuelle_idx', 'degats_accumules',
+                       'nb_tours', 'attaque_groupee')
+
+    def __init__(self, room_id, nom_salon, evenements=None, rng=random, attaque_groupee=False):
+        # rng : dés jusqu'à demarrer(graine), qui donne au salon son propre flux
+        self.id = room_id
+        self.nom_salon = nom_salon
+        self.attaque_groupee = attaque_groupee
+        self.joueurs = []
+        # Index tenus à jour à chaque arrivée, départ et changement de PV : sid -> joueur, sids à PV >= 0
+        self.par_sid = {}
+        self.vivants = set()
+        self.evenements = evenements or Evenements()
+        self.rng = rng
+        self.variations = None  # Variations de PV de l'action en cours de journalisation
+        # Les dés du tour : 5 emplacements fixes, les `nb_des` premiers sont en jeu, le masque dit
+        # lesquels sont gardés (des_sur_table / des_gardes en sont des vues)
+        self.des = array('B', bytes(5))
+        self.initialiser()
+
+    @journalise
+    def reset_jeu(self): self.initialiser()
+
+    def initialiser(self):
+        self.etat = "ATTENTE"
+        self.joueur_actuel_idx = 0
+        self.vider_des()
+        self.message, self.vainqueur = "En attente...", None
+        self.vainqueur_sid = None  # vainqueur n'est que son nom, affiché : deux joueurs peuvent l'avoir
+        self.createur_sid = self.joueurs[0].sid if self.joueurs else None
+        self.valeur_killer, self.liste_victimes = 0, []
+        self.victime_actuelle_idx, self.degats_accumules = -1, 0
+
+        # Vivants au début du tour qui sont morts depuis (départage si tout le monde meurt)
+        self.morts_du_tour = set()
+        self.nb_tours = 0
+
+    # --- SNAPSHOT ---
+    def to_snapshot(self):
+        snap = {k: getattr(self, k) for k in self.CHAMPS_SNAPSHOT}
+        snap['des'] = list(self.des)
+        snap['liste_victimes'] = list(self.liste_victimes)  # Vidée sur place pendant l'attaque
+        snap['morts_du_tour'] = list(self.morts_du_tour)
+        snap['joueurs'] = [j.to_dict() for j in self.joueurs]
+        snap['jetons'] = [j.jeton for j in self.joueurs]
+        snap['departs'] = [j.deconnecte_jusqua for j in self.joueurs]
+        snap['vainqueur_sid'] = self.vainqueur_sid
+        snap['graine'], snap['tirages'] = (self.rng.graine, self.rng.tires) if isinstance(self.rng, Des) else (None, 0)
+        return snap
+
+    def charger_snapshot(self, snap):
+        for k in self.CHAMPS_SNAPSHOT: setattr(self, k, snap[k])
+        self.des = array('B', snap['des'])
+        self.morts_du_tour = set(snap['morts_du_tour'])
+        jetons = snap.get('jetons') or [None] * len(snap['joueurs'])
+        self.joueurs = [Joueur.depuis_dict(d, jeton) for d, jeton in zip(snap['joueurs'], jetons)]
+        for j, depart in zip(self.joueurs, snap.get('departs') or ()): j.deconnecte_jusqua = depart
+        self.vainqueur_sid = snap.get('vainqueur_sid')
+        self.par_sid = {j.sid: j for j in self.joueurs}
+        self.vivants = {j.sid for j in self.joueurs if j.pv >= 0}
+        if snap.get('graine') is not None: self.rng = Des(snap['graine'], snap['tirages'])
+
+    def rejouer(self, nom, args, kwargs, des, variations):
+        """Rejoue une action du journal, sans évènements ; False si elle ne redonne pas le même résultat"""
+        if nom not in ACTIONS: return False
+        if nom in ACTIONS_JOUEUR:
+            joueur = self.get_joueur(args[0])
+            if joueur is None: return False
+            args = [joueur] + args[1:]
+        evenements, rng = self.evenements, self.rng
+        rejoues = self.rng = DesRejoues(des, rng if isinstance(rng, Des) else None)
+        self.evenements, self.variations = SILENCE, []
+        try:
+            resultat = getattr(self, nom)(*args, **kwargs)
+        except IndexError:
+            resultat = False  # Plus de dés que dans le journal
+        finally:
+            obtenues, self.evenements, self.variations = self.variations, evenements, None
+            if self.rng is rejoues: self.rng = rng
+        return resultat is not False and obtenues == variations
+
+    # --- DES ---
+    @property
+    def des_sur_table(self):
+        des = self.des
+        return [des[i] for i in LIBRES[self.nb_des << 5 | self.masque_gardes]]
+
+    @property
+    def des_gardes(self):
+        des = self.des
+        return [des[i] for i in GARDES[self.nb_des << 5 | self.masque_gardes]]
+
+    def vider_des(self):
+        self.nb_des, self.masque_gardes = 0, 0
+
+    def lancer_des(self):
+        """Relance tous les dés non gardés (les 5 emplacements sont en jeu)"""
+        for i in LIBRES[5 << 5 | self.masque_gardes]: self.des[i] = self.rng.randint(1, 6)
+        self.nb_des = 5
+
+    def garder_indices(self, indices):
+        """Marque comme gardés les dés de la table d'indices `indices` ; renvoie leur somme"""
+        libres = LIBRES[self.nb_des << 5 | self.masque_gardes]
+        for i in indices: self.masque_gardes |= 1 << libres[i]
+        return sum(self.des[libres[i]] for i in indices)
+
+    # --- VUES ---
+    def etat_public(self):
+        v_nom = self.joueurs[self.victime_actuelle_idx].nom if self.victime_actuelle_idx != -1 else ""
+        return {
+            'joueurs': [j.to_dict() for j in self.joueurs],
+            'etat': self.etat,
+            'joueur_actuel': self.joueurs[self.joueur_actuel_idx].nom if self.joueurs else "",
+            'joueur_actuel_sid': self.joueurs[self.joueur_actuel_idx].sid if self.joueurs else "",
+            'des_table': self.des_sur_table, 'des_gardes': self.des_gardes,
+            'message': self.message, 'valeur_killer': self.valeur_killer,
+            'nom_victime': v_nom, 'degats_accumules': self.degats_accumules,
+            'vainqueur': self.vainqueur, 'createur_sid': self.createur_sid,
+            'room_id': self.id, 'nom_salon': self.nom_salon
+        }
+
+    def get_info_publique(self):
+        return {'id': self.id, 'nom': self.nom_salon, 'nb_joueurs': len(self.joueurs), 'statut': "En cours" if self.etat not in ["ATTENTE", "FIN"] else "En attente"}
+
+    def get_joueur_actuel(self):
+        if not self.joueurs: return None
+        return self.joueurs[self.joueur_actuel_idx]
+
+    def get_joueur(self, sid):
+        return self.par_sid.get(sid)
+
+    def est_tour_de(self, sid):
+        cur = self.get_joueur_actuel()
+        return cur is not None and cur.sid == sid
+
+    # --- EVENEMENTS ---
+    def notifier(self, msg, son=None):
+        self.evenements.notification(self, msg, son)
+
+    def publier(self, msg=None):
+        if msg: self.message = msg
+        self.verifier_proprietaire()
+        self.evenements.etat(self)
+
+    # --- JOUEURS ---
+    def verifier_proprietaire(self):
+        chef_actuel = self.get_joueur(self.createur_sid)
+        if not chef_actuel or chef_actuel.is_bot:
+            nouveau_chef = next((p for p in self.joueurs if not p.is_bot), None)
+            if nouveau_chef: self.createur_sid = nouveau_chef.sid
+
+    @journalise
+    def ajouter_joueur(self, sid, nom, is_bot=False, niveau=None, jeton=None):
+        j = Joueur(sid, nom, is_bot, niveau, jeton)
+        self.joueurs.append(j)
+        self.par_sid[sid] = j
+        self.vivants.add(sid)
+        self.verifier_proprietaire()
+        if not self.createur_sid: self.createur_sid = sid
+        return j
+
+    @journalise
+    def ajouter_bot(self, niveau=None):
+        if self.etat != "ATTENTE": return None
+        if niveau not in politique.NIVEAUX: niveau = NIVEAU_BOT
+        nb = len([j for j in self.joueurs if j.is_bot]) + 1
+        while f"BOT_{self.id}_{nb}" in self.par_sid: nb += 1
+        bot = self.ajouter_joueur(f"BOT_{self.id}_{nb}", f"Bot {nb}", True, niveau)
+        self.publier(f"Bot {nb} ({niveau}) ajouté !")
+        return bot
+
+    def joueur_par_jeton(self, jeton):
+        if not jeton: return None
+        return next((j for j in self.joueurs if j.jeton is not None and secrets.compare_digest(j.jeton, jeton)), None)
+
+    @journalise
+    def changer_sid(self, joueur, sid):
+        """Reprise de place : le joueur garde tout (PV, tour, création du salon) sous un nouveau sid"""
+        ancien = joueur.sid
+        del self.par_sid[ancien]
+        self.par_sid[sid] = joueur
+        if ancien in self.vivants: self.vivants.discard(ancien); self.vivants.add(sid)
+        if ancien in self.morts_du_tour: self.morts_du_tour.discard(ancien); self.morts_du_tour.add(sid)
+        if self.createur_sid == ancien: self.createur_sid = sid
+        if self.vainqueur_sid == ancien: self.vainqueur_sid = sid
+        joueur.sid = sid
+        joueur.deconnecte = False
+        joueur.deconnecte_jusqua = None
+
+    @journalise
+    def retirer_joueur(self, joueur, msg=None):
+        """Retire un joueur (départ, exclusion) ; si c'était son tour, il passe au joueur suivant"""
+        idx = self.joueurs.index(joueur)
+        etait_son_tour = idx == self.joueur_actuel_idx
+        self.joueurs.remove(joueur)
+        del self.par_sid[joueur.sid]
+        self.vivants.discard(joueur.sid)
+        self.morts_du_tour.discard(joueur.sid)
+        self.verifier_proprietaire()
+        if not self.joueurs: return
+
+        if idx < self.joueur_actuel_idx: self.joueur_actuel_idx -= 1
+        victime_retiree = idx == self.victime_actuelle_idx
+        if victime_retiree: self.victime_actuelle_idx = -1
+        elif self.victime_actuelle_idx > idx: self.victime_actuelle_idx -= 1
+        self.liste_victimes = [v - (v > idx) for v in self.liste_victimes if v != idx]
+
+        if self.etat not in ("ATTENTE", "ATTRIBUTION_PV", "FIN"):
+            if etait_son_tour:
+                self.joueur_actuel_idx -= 1
+                self.passer_suivant(msg)
+                return
+            if victime_retiree and self.etat in ("ATTENTE_LANCER", "TOUR_ATTAQUE", "FIN_ATTAQUE", "ATTAQUE_RATEE"):
+                if msg: self.notifier(msg)
+                self.preparer_prochaine_victime()
+                return
+
+        if self.joueur_actuel_idx >= len(self.joueurs): self.joueur_actuel_idx = 0
+        self.publier(msg)
+        if self.etat == "ATTRIBUTION_PV": self.check_start_real_game()
+
+    def changer_pv(self, joueur, delta):
+        """Seul point de modification des PV : tient à jour les vivants et les morts du tour"""
+        vivant = joueur.pv >= 0
+        joueur.pv += delta
+        if self.variations is not None: self.variations.append([joueur.sid, delta])
+        if joueur.pv >= 0: self.vivants.add(joueur.sid)
+        else:
+            self.vivants.discard(joueur.sid)
+            if vivant: self.morts_du_tour.add(joueur.sid)
+
+    # --- DEROULEMENT ---
+    @journalise
+    def demarrer(self, graine=None):
+        if len(self.joueurs) < 2 or self.etat != "ATTENTE": return False
+        if graine is not None: self.rng = Des(graine)
+        self.etat = "ATTRIBUTION_PV"
+        for j in self.joueurs:
+            j.des_pv = tuple(self.rng.randint(1,6) for _ in range(5))
+            self.changer_pv(j, sum(j.des_pv) - j.pv)
+            j.est_pret = False
+        self.publier("Initialisation des PV...")
+        return True
+
+    @journalise
+    def valider_pv(self, joueur):
+        if self.etat != "ATTRIBUTION_PV" or joueur.est_pret: return False
+        joueur.est_pret = True
+        self.publier()
+        self.check_start_real_game()
+        return True
+
+    def check_start_real_game(self):
+        if not all(p.est_pret for p in self.joueurs): return
+        self.joueurs.sort(key=lambda p: p.pv)
+        self.joueur_actuel_idx = 0
+        self.etat = "TRANSITION_TOUR"
+        self.morts_du_tour = set()
+
+        noms = " > ".join([p.nom for p in self.joueurs])
+        self.notifier(f"Tout le monde est prêt ! Ordre : {noms}", 'win')
+        self.publier("La partie commence !")
+
+    def passer_suivant(self, notification=None):
+        if notification: self.notifier(notification)
+        self.nb_tours += 1
+
+        # 1. On regarde qui est vivant (PV >= 0) MAINTENANT (index tenu à jour par changer_pv)
+        survivants = self.vivants
+
+        # Condition de fin : Il reste 1 seul survivant OU tout le monde est mort (0 survivant)
+        if len(self.joueurs) > 1 and len(survivants) <= 1:
+
+            if len(survivants) == 1:
+                # Cas standard : Il reste un vrai survivant
+                gagnant = self.par_sid[next(iter(survivants))]
+                self.vainqueur, self.vainqueur_sid = gagnant.nom, gagnant.sid
+            else:
+                # Cas "Tout le monde est mort ce tour-ci"
+                # On départage parmi ceux qui étaient vivants AU DÉBUT DU TOUR
+                candidats = [j for j in self.joueurs if j.sid in self.morts_du_tour]
+
+                # Sécurité (si bug vide), on prend tout le monde
+                if not candidats: candidats = self.joueurs
+
+                # On trie par PV décroissant (le moins négatif gagne : ex -7 gagne contre -10)
+                candidats = sorted(candidats, key=lambda x: x.pv, reverse=True)
+
+                if candidats:
+                    self.vainqueur, self.vainqueur_sid = candidats[0].nom, candidats[0].sid
+                else:
+                    self.vainqueur = "Personne"
+
+            self.etat = "FIN"
+            self.publier(f"🏆 VICTOIRE ! {self.vainqueur} gagne !")
+
+        else:
+            # La partie continue
+            self.joueur_actuel_idx = (self.joueur_actuel_idx + 1) % len(self.joueurs)
+            self.vider_des()
+            self.etat = "TRANSITION_TOUR"
+
+            # Seuls ceux qui sont positifs maintenant pourront gagner si tout le monde meurt au prochain tour
+            self.morts_du_tour.clear()
+
+            self.publier(f"Au tour de {self.joueurs[self.joueur_actuel_idx].nom}")
+
+    @journalise
+    def valider_debut_tour(self):
+        if self.etat != "TRANSITION_TOUR": return False
+        self.etat = "TOUR_CHOIX"
+        self.vider_des()
+        self.lancer_des()
+        self.publier("Le Bot lance les dés..." if self.get_joueur_actuel().is_bot else "À toi de jouer !")
+        return True
+
+    def prefixe(self):
+        cur = self.get_joueur_actuel()
+        return "🤖 " if cur and cur.is_bot else ""
+
+    def indices_valides(self, indices, valeur=None):
+        if not indices or len(set(indices)) != len(indices): return False
+        table = self.des_sur_table
+        if not all(isinstance(i, int) and 0 <= i < len(table) for i in indices): return False
+        return valeur is None or all(table[i] == valeur for i in indices)
+
+    @journalise
+    def garder(self, indices):
+        if self.etat != "TOUR_CHOIX" or not self.indices_valides(indices): return False
+        self.garder_indices(indices)
+
+        if self.masque_gardes != 0b11111:
+            self.lancer_des()
+            self.publier("Relance...")
+        else:
+            self.resoudre_score(sum(self.des))
+        return True
+
+    def resoudre_score(self, s):
+        """5 dés gardés : Killer (5-10, 25-30), régénération (11, 24) ou dégâts (12-23)"""
+        j, p = self.get_joueur_actuel(), self.prefixe()
+        if 5<=s<=10 or 25<=s<=30:
+            self.valeur_killer = 11-s if s <= 10 else s-24
+            self.notifier(f"{p}KILLER {self.valeur_killer}!", 'sword')
+            self.init_phase_attaque()
+        elif s==11 or s==24:
+            self.etat = "TOUR_REGEN"
+            self.vider_des()
+            self.notifier(f"{p}Score {s}: Régénération !")
+            self.publier()
+        else:
+            perte = s-11 if s <= 17 else 24-s
+            self.changer_pv(j, -perte)
+            self.notifier(f"{p}Score {s}: -{perte} PV", 'oof')
+            self.passer_suivant()
+
+    @journalise
+    def lancer_regen(self):
+        if self.etat != "TOUR_REGEN": return False
+        v = self.rng.randint(1,6); self.des[0], self.nb_des, self.masque_gardes = v, 1, 0; self.changer_pv(self.get_joueur_actuel(), v)
+        self.etat = "RESULTAT_REGEN"
+        self.notifier(f"{self.prefixe()}Régénération +{v} PV", 'dice')
+        self.publier(f"Gain de {v} PV !")
+        return True
+
+    @journalise
+    def fin_regen(self):
+        if self.etat != "RESULTAT_REGEN": return False
+        self.passer_suivant()
+        return True
+
+    # --- ATTAQUE ---
+    def init_phase_attaque(self):
+        nb_j = len(self.joueurs)
+        self.liste_victimes = [(self.joueur_actuel_idx + i) % nb_j for i in range(1, nb_j)]
+        if self.attaque_groupee: self.resoudre_attaques()
+        else: self.preparer_prochaine_victime()
+
+    def chaine_attaque(self):
+        """Une chaîne d'attaque complète en gardant tous les dés Killer : (dégâts, lancers successifs)"""
+        k, gardes, degats, lancers = self.valeur_killer, 0, 0, []
+        while True:
+            lancer = [self.rng.randint(1, 6) for _ in range(5 - gardes)]
+            lancers.append(lancer)
+            touches = lancer.count(k)
+            if not touches: return degats, lancers
+            degats += touches * k
+            gardes += touches
+            if gardes == 5: gardes = 0  # FULL : on relance les 5 dés
+
+    def resoudre_attaques(self):
+        """Mode attaque_groupee : toutes les victimes d'un coup, un seul évènement pour le client"""
+        resultats, bilan = [], []
+        for idx in self.liste_victimes:
+            degats, lancers = self.chaine_attaque()
+            victime = self.joueurs[idx]
+            if degats: self.changer_pv(victime, -degats); bilan.append(f"{victime.nom} -{degats}")
+            resultats.append([idx, degats, lancers])
+        self.liste_victimes = []
+        self.evenements.attaques(self, resultats)
+        self.notifier(f"💥 {', '.join(bilan)}" if bilan else "Aucun dégât.", 'punch' if bilan else None)
+        self.passer_suivant("Tour Killer terminé.")
+
+    def preparer_prochaine_victime(self):
+        if not self.liste_victimes:
+            self.victime_actuelle_idx = -1
+            self.passer_suivant("Tour Killer terminé.")
+            return
+        self.victime_actuelle_idx = self.liste_victimes.pop(0)
+        self.degats_accumules = 0
+        self.vider_des()
+        self.etat = "ATTENTE_LANCER"
+        nom_cible = self.joueurs[self.victime_actuelle_idx].nom
+        self.publier(f"Prêt à attaquer {nom_cible} ?")
+
+    @journalise
+    def lancer_attaque(self):
+        if self.etat != "ATTENTE_LANCER": return False
+        self.lancer_des()
+        if self.valeur_killer in self.des_sur_table: self.etat = "TOUR_ATTAQUE"; self.publier("Choisis tes dés !")
+        else: self.etat = "ATTAQUE_RATEE"; self.publier("Raté !")
+        return True
+
+    @journalise
+    def garder_attaque(self, indices):
+        if self.etat != "TOUR_ATTAQUE" or not self.indices_valides(indices, self.valeur_killer): return False
+        self.degats_accumules += self.garder_indices(indices)
+
+        if self.masque_gardes == 0b11111:
+            # FULL : on garde les dégâts et on relance les 5 dés
+            self.masque_gardes = 0
+            self.notifier(f"{self.prefixe()}FULL ! Relance 5 dés !", 'sword')
+        self.lancer_des()
+        if self.valeur_killer not in self.des_sur_table: self.etat = "FIN_ATTAQUE"
+        self.publier()
+        return True
+
+    @journalise
+    def terminer_attaque(self, afficher_resultat=False):
+        """Applique les dégâts à la victime ; `afficher_resultat` marque une pause en RESULTAT_ATTAQUE (bots)"""
+        if self.etat not in ("FIN_ATTAQUE", "ATTAQUE_RATEE"): return False
+        victime = self.joueurs[self.victime_actuelle_idx]
+        if self.degats_accumules > 0:
+            self.changer_pv(victime, -self.degats_accumules)
+            self.notifier(f"💥 -{self.degats_accumules} pour {victime.nom}", 'punch')
+        else:
+            self.notifier("Aucun dégât.")
+
+        if afficher_resultat: self.etat = "RESULTAT_ATTAQUE"; self.publier()
+        else: self.preparer_prochaine_victime()
+        return True
+
+    @journalise
+    def suivant(self):
+        if self.etat != "RESULTAT_ATTAQUE": return False
+        self.preparer_prochaine_victime()
+        return True
+
+
+# --- PROTOCOLE ---
+def diff_etat(ancien, nouveau):
+    """Champs de `nouveau` qui diffèrent de `ancien` (tout si pas d'état précédent)"""
+    if ancien is None: return dict(nouveau)
+    patch = {k: v for k, v in nouveau.items() if ancien.get(k) != v}
+    
+    # Joueurs : si la liste a la même composition, on n'envoie que les joueurs modifiés
+    if 'joueurs' in patch:
+        avant, apres = ancien['joueurs'], nouveau['joueurs']
+        if len(avant) == len(apres) and all(a['sid'] == j['sid'] for a, j in zip(avant, apres)):
+            del patch['joueurs']
+            # Un joueur inchangé garde le même dict (forme sérialisée en cache) : test d'identité d'abord
+            patch['joueurs_maj'] = [[i, j] for i, (a, j) in enumerate(zip(avant, apres)) if a is not j and a != j]
+    return patch
+
+
+# --- CERVEAU DU BOT ---
+NIVEAU_BOT = 'moyen'
+
+def val_low(d):
+    if d == 1: return 6000
+    if d == 2: return 4000
+    if d == 3: return 2000
+    if d == 4: return 1000
+    if d == 5: return 500
+    return 0
+
+def val_high(d):
+    if d == 6: return 6000
+    if d == 5: return 4000
+    if d == 4: return 2000
+    if d == 3: return 1000
+    if d == 2: return 500
+    return 0
+
+def choix_bot(des, des_gardes):
+    """Indices des dés à garder : le bot vise un petit (LOW) ou un grand (HIGH) total"""
+    nb_low_gardes = len([d for d in des_gardes if d <= 3])
+    nb_high_gardes = len([d for d in des_gardes if d >= 4])
+
+    if nb_high_gardes > nb_low_gardes: mode = "HIGH"
+    elif nb_low_gardes > nb_high_gardes: mode = "LOW"
+    else:
+        score_total_low = sum([val_low(d) for d in des])
+        score_total_high = sum([val_high(d) for d in des])
+        if score_total_low >= score_total_high: mode = "LOW"
+        else: mode = "HIGH"
+
+    val, secours = (val_low, 3) if mode == "LOW" else (val_high, 4)
+    indices = [i for i, d in enumerate(des) if val(d) >= 4000]
+    if not indices: indices = [i for i, d in enumerate(des) if d == secours]
+    if not indices and des:
+        scores = [val(d) for d in des]
+        indices = [scores.index(max(scores))]
+    return indices
+
+def bot_jouer(jeu):
+    """Une étape du bot dont c'est le tour (mêmes actions que les joueurs humains)"""
+    cur = jeu.get_joueur_actuel()
+    if not cur or not cur.is_bot: return False
+
+    if jeu.etat == "TRANSITION_TOUR": return jeu.valider_debut_tour()
+    niveau = cur.niveau or NIVEAU_BOT
+    if jeu.etat == "TOUR_CHOIX":
+        # moyen : premier choix du tour selon la table expert, les suivants à l'heuristique
+        if niveau == 'facile' or niveau == 'moyen' and jeu.des_gardes: return jeu.garder(choix_bot(jeu.des_sur_table, jeu.des_gardes))
+        return jeu.garder(politique.choix(jeu.des_sur_table, jeu.des_gardes, 'expert'))
+    if jeu.etat == "TOUR_REGEN": return jeu.lancer_regen()
+    if jeu.etat == "RESULTAT_REGEN": return jeu.fin_regen()
+    if jeu.etat == "ATTENTE_LANCER": return jeu.lancer_attaque()
+    if jeu.etat == "TOUR_ATTAQUE":
+        if niveau == 'facile': return jeu.garder_attaque([i for i, x in enumerate(jeu.des_sur_table) if x == jeu.valeur_killer])
+        return jeu.garder_attaque(politique.choix_attaque(jeu.des_sur_table, jeu.des_gardes, jeu.valeur_killer))
+    if jeu.etat in ("FIN_ATTAQUE", "ATTAQUE_RATEE"): return jeu.terminer_attaque(afficher_resultat=True)
+    if jeu.etat == "RESULTAT_ATTAQUE": return jeu.suivant()
+    return False
+
+
+# --- SIMULATION ---
+def simuler_partie(nb_joueurs, rng=random, max_etapes=100000, niveaux='facile', attaque_groupee=False, graine=None):
+    """Joue une partie entre bots sans serveur ; renvoie (partie, nombre d'étapes).
+    Avec une `graine`, les dés ne dépendent que d'elle : même graine, même partie.
+
+    `niveaux` : un niveau pour tous les bots, ou une liste (un par joueur)
+    """
+    if isinstance(niveaux, str): niveaux = [niveaux] * nb_joueurs
+    jeu = Partie("SIM", "Simulation", rng=rng, attaque_groupee=attaque_groupee)
+    for i in range(nb_joueurs): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, niveaux[i])
+    jeu.demarrer(graine)
+    for j in jeu.joueurs: jeu.valider_pv(j)
+    etapes = 0
+    while jeu.etat != "FIN" and etapes < max_etapes:
+        bot_jouer(jeu)
+        etapes += 1
+    return jeu, etapes
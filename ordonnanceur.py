@@ -0,0 +1,88 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Ordonnanceur:
+    """File de priorité (par échéance) des actions différées, au plus une action en attente par clé.
+
+    Une seule boucle tient le tas, au lieu d'une tâche qui dort par action ; chaque action échue part dans
+    sa propre tâche (lanceur), pour qu'une action lente ou qui attend un verrou ne retarde pas les suivantes.
+    """
+
+    def __init__(self, lanceur):
+        self.lanceur = lanceur  # lanceur(fn, *args), ex: socketio.start_background_task
+        self.tas = []
+        self.en_attente = {}  # cle -> entrée du tas
+        self.compteur = itertools.count()
+        self.cond = threading.Condition()
+        self.demarre = False
+
+        # Métriques
+        self.executees = 0
+        self.retard_dernier = 0.0
+        self.retard_max = 0.0
+
+    def planifier(self, cle, delai, action, *args):
+        """Planifie action(*args) dans `delai` secondes.
+
+        Si la même action est déjà en attente pour cette clé, on la garde ; une autre action la remplace.
+        """
+        with self.cond:
+            entree = self.en_attente.get(cle)
+            if entree and entree[3] is action and entree[4] == args: return False
+            if entree: entree[3] = None  # Annulée, sera ignorée à la sortie du tas
+
+            entree = [time.monotonic() + delai, next(self.compteur), cle, action, args]
+            self.en_attente[cle] = entree
+            heapq.heappush(self.tas, entree)
+            self.cond.notify()
+
+            if not self.demarre:
+                self.demarre = True
+                self.lanceur(self.boucle)
+        return True
+
+    def annuler(self, cle):
+        with self.cond:
+            entree = self.en_attente.pop(cle, None)
+            if entree: entree[3] = None
+
+    def boucle(self):
+        while True:
+            with self.cond:
+                while True:
+                    while self.tas and self.tas[0][3] is None: heapq.heappop(self.tas)
+                    if not self.tas:
+                        self.cond.wait()
+                        continue
+                    attente = self.tas[0][0] - time.monotonic()
+                    if attente <= 0: break
+                    self.cond.wait(attente)
+
+                echeance, _, cle, action, args = heapq.heappop(self.tas)
+                del self.en_attente[cle]
+
+            self.retard_dernier = time.monotonic() - echeance
+            self.retard_max = max(self.retard_max, self.retard_dernier)
+            self.executees += 1
+            self.lanceur(self.executer, cle, action, args)
+
+    @staticmethod
+    def executer(cle, action, args):
+        try:
+            action(*args)
+        except Exception:
+            log.exception("Action planifiée en erreur (%s)", cle)
+
+    def stats(self):
+        return {
+            'profondeur': len(self.en_attente),
+            'executees': self.executees,
+            'retard_dernier': self.retard_dernier,
+            'retard_max': self.retard_max,
+        }
@@ -0,0 +1,214 @@
+"""Politique des bots : tables de décision précalculées (programmation dynamique exacte).
+
+Un lancer du Killer est petit : au plus 5 dés gardés et 5 dés sur la table. On résout donc une fois
+pour toutes, hors ligne, quels dés garder pour maximiser l'écart de PV espéré avec les adversaires :
+    - Killer k : k x (dés gagnés en moyenne par une chaîne d'attaque) pour chaque adversaire
+    - Régénération : +3.5 ; sinon les PV perdus.
+
+Les tables sont écrites dans politique.bin (`python politique.py`) et chargées une fois à l'import ;
+une décision est ensuite une simple lecture d'octet.
+
+Niveaux (du plus faible au plus fort, vérifié avec --tournoi) :
+    facile : l'ancienne heuristique (moteur.choix_bot), aucune table
+    moyen  : la table expert pour le premier choix du tour, l'heuristique pour les suivants
+    expert : politique optimale pour l'écart de PV
+
+Pendant l'attaque, la table dit combien de dés Killer garder ; la résolution montre que les garder
+tous est toujours le meilleur choix (chaque dé gardé est un dégât acquis).
+
+    python politique.py                  # reconstruit politique.bin
+    python politique.py --tournoi 2000   # fait s'affronter les niveaux
+"""
+import argparse
+import itertools
+import logging
+import math
+import os
+import random
+from array import array
+
+log = logging.getLogger(__name__)
+
+NIVEAUX = ('facile', 'moyen', 'expert')
+NIVEAUX_TABLES = ('expert',)
+FICHIER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'politique.bin')
+MAGIQUE = b'KLR2'
+
+# Tous les lancers triés de n dés, et leur rang dans la table
+LANCERS = [list(itertools.combinations_with_replacement(range(1, 7), n)) for n in range(6)]
+RANGS = [{r: i for i, r in enumerate(lancers)} for lancers in LANCERS]
+
+# Table TOUR_CHOIX : (nb de dés gardés c, somme gardée s, lancer trié) -> masque des positions à garder
+DEBUTS = []
+_n = 0
+for _c in range(5):
+    DEBUTS.append(_n)
+    _n += (5 * _c + 1) * len(LANCERS[5 - _c])
+TAILLE_CHOIX = _n
+# Table TOUR_ATTAQUE : (dés Killer déjà gardés, dés Killer sur la table) -> combien en garder
+TAILLE_ATTAQUE = 5 * 6
+
+
+def index_choix(c, s, lancer):
+    return DEBUTS[c] + (s - c) * len(LANCERS[5 - c]) + RANGS[5 - c][lancer]
+
+
+def proba(lancer):
+    """Probabilité d'obtenir ce multiensemble en lançant len(lancer) dés"""
+    p = math.factorial(len(lancer)) / 6 ** len(lancer)
+    for v in set(lancer): p /= math.factorial(lancer.count(v))
+    return p
+
+
+def sous_ensembles(lancer):
+    """Masques (sur les positions du lancer trié) des façons distinctes de garder au moins un dé"""
+    vus = {}
+    for masque in range(1, 1 << len(lancer)):
+        garde = tuple(v for i, v in enumerate(lancer) if masque >> i & 1)
+        vus.setdefault(garde, masque)
+    return [(len(g), sum(g), m) for g, m in vus.items()]
+
+
+def utilite(s, des_par_attaque):
+    """Ecart de PV espéré avec chaque adversaire pour un total de 5 dés"""
+    if 5 <= s <= 10: return (11 - s) * des_par_attaque
+    if 25 <= s <= 30: return (s - 24) * des_par_attaque
+    if s == 11 or s == 24: return 3.5
+    return -(s - 11 if s <= 17 else 24 - s)
+
+
+# --- ATTAQUE ---
+def construire_attaque():
+    """Dés Killer gagnés en moyenne par chaîne, et table (gardés, touchés) -> dés à garder"""
+    # P(h touchés en lançant n dés)
+    touches = [[math.comb(n, h) * 5 ** (n - h) / 6 ** n for h in range(n + 1)] for n in range(6)]
+    a = [0.0] * 6  # a[g] : dés encore à gagner avec g dés gardés (a[5] = FULL = on relance tout)
+
+    def meilleur(g, h):
+        return max(range(1, h + 1), key=lambda t: t + a[(g + t) % 5])
+
+    for _ in range(1000):
+        nouveau = [sum(p * (meilleur(g, h) + a[(g + meilleur(g, h)) % 5]) for h, p in enumerate(touches[5 - g]) if h)
+                   for g in range(5)]
+        ecart = max(abs(x - y) for x, y in zip(nouveau, a))
+        a = nouveau + [nouveau[0]]
+        if ecart < 1e-12: break
+
+    table = array('B', bytes(TAILLE_ATTAQUE))
+    for g in range(5):
+        for h in range(1, 6 - g): table[g * 6 + h] = meilleur(g, h)
+    return a[0], table
+
+
+# --- CHOIX ---
+def construire_choix(u):
+    """Table TOUR_CHOIX qui maximise l'espérance de u(total des 5 dés)"""
+    # w[c][s] : valeur espérée avant de lancer 5 - c dés avec c dés gardés de somme s
+    w = {5: {s: u(s) for s in range(5, 31)}}
+    table = array('B', bytes(TAILLE_CHOIX))
+    for c in range(4, -1, -1):
+        w[c] = {}
+        n = 5 - c
+        for s in range(c, 6 * c + 1):
+            total = 0.0
+            for lancer in LANCERS[n]:
+                meilleure, masque = None, 0
+                for k, sk, m in sous_ensembles(lancer):
+                    v = w[c + k][s + sk]
+                    if meilleure is None or v > meilleure: meilleure, masque = v, m
+                table[index_choix(c, s, lancer)] = masque
+                total += proba(lancer) * meilleure
+            w[c][s] = total
+    return w[0][0], table
+
+
+def construire():
+    """Toutes les tables : {'attaque': table, niveau: table TOUR_CHOIX}"""
+    des_par_attaque, attaque = construire_attaque()
+    tables = {'attaque': attaque}
+    for niveau in NIVEAUX_TABLES:
+        valeur, tables[niveau] = construire_choix(lambda s: utilite(s, des_par_attaque))
+        log.info("Politique %s : valeur d'un tour %.3f (%.3f dés par attaque)", niveau, valeur, des_par_attaque)
+    return tables
+
+
+def ecrire(tables, chemin=FICHIER):
+    with open(chemin, 'wb') as f:
+        f.write(MAGIQUE)
+        tables['attaque'].tofile(f)
+        for niveau in NIVEAUX_TABLES: tables[niveau].tofile(f)
+
+
+def charger(chemin=FICHIER):
+    """Lit politique.bin ; s'il manque ou ne correspond pas, reconstruit les tables en mémoire"""
+    taille = len(MAGIQUE) + TAILLE_ATTAQUE + len(NIVEAUX_TABLES) * TAILLE_CHOIX
+    try:
+        with open(chemin, 'rb') as f: data = f.read()
+    except FileNotFoundError:
+        data = b''
+    if len(data) != taille or not data.startswith(MAGIQUE):
+        log.warning("%s absent ou périmé : tables reconstruites (python politique.py pour l'écrire)", chemin)
+        return construire()
+
+    pos = len(MAGIQUE) + TAILLE_ATTAQUE
+    tables = {'attaque': array('B', data[len(MAGIQUE):pos])}
+    for niveau in NIVEAUX_TABLES:
+        tables[niveau] = array('B', data[pos:pos + TAILLE_CHOIX]); pos += TAILLE_CHOIX
+    return tables
+
+
+TABLES = charger()  # Une seule lecture, au démarrage
+
+
+# --- DECISIONS ---
+def choix(des, des_gardes, niveau):
+    """Indices des dés à garder en TOUR_CHOIX selon la table du niveau (voir NIVEAUX_TABLES)"""
+    ordre = sorted(range(len(des)), key=des.__getitem__)
+    lancer = tuple(des[i] for i in ordre)
+    masque = TABLES[niveau][index_choix(len(des_gardes), sum(des_gardes), lancer)]
+    return [ordre[i] for i in range(len(ordre)) if masque >> i & 1]
+
+
+def choix_attaque(des, des_gardes, valeur):
+    """Indices des dés Killer à garder en TOUR_ATTAQUE"""
+    touches = [i for i, d in enumerate(des) if d == valeur]
+    return touches[:TABLES['attaque'][len(des_gardes) * 6 + len(touches)]]
+
+
+# --- OUTILS ---
+def tournoi(nb_parties, nb_joueurs, seed=None):
+    """Parties entre bots de niveaux différents (places tirées au hasard) : victoires par niveau"""
+    import moteur
+    rng = random.Random(seed)
+    victoires = {n: 0 for n in NIVEAUX}
+    places = {n: 0 for n in NIVEAUX}
+    for _ in range(nb_parties):
+        niveaux = [NIVEAUX[i % len(NIVEAUX)] for i in range(nb_joueurs)]
+        rng.shuffle(niveaux)
+        jeu, _ = moteur.simuler_partie(nb_joueurs, rng, niveaux=niveaux)
+        for n in niveaux: places[n] += 1
+        gagnant = jeu.par_sid.get(jeu.vainqueur_sid)
+        if gagnant: victoires[gagnant.niveau] += 1
+    return {n: victoires[n] / places[n] for n in NIVEAUX if places[n]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tables de décision des bots du Killer")
+    parser.add_argument('--tournoi', type=int, default=0, metavar='N', help="joue N parties entre niveaux")
+    parser.add_argument('--joueurs', type=int, default=3)
+    parser.add_argument('--graine', type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.tournoi:
+        for niveau, taux in tournoi(args.tournoi, args.joueurs, args.graine).items():
+            print(f"{niveau:7s} : {100 * taux:.1f} % de victoires")
+        return
+
+    tables = construire()
+    ecrire(tables)
+    print(f"{FICHIER} : {os.path.getsize(FICHIER)} octets")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Simulateur Monte Carlo du Killer : N parties entre bots jouées en parallèle avec NumPy.
+
+Reproduit exactement les règles de `moteur` et l'heuristique `moteur.choix_bot`, avec les dés en
+matrices (parties, dés) et les PV en vecteurs. Nécessite NumPy (pas utilisé par le serveur).
+
+    python simulateur.py --parties 100000 --joueurs 4
+    python simulateur.py --parties 20000 --comparer 2000   # + moteur Python, pour comparer
+    python simulateur.py --verifier                        # heuristique identique à moteur.choix_bot
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("Le simulateur a besoin de NumPy : pip install numpy")
+
+import moteur
+
+# Scores de l'heuristique, indexés par la valeur du dé (0 = pas de dé)
+VAL_LOW = np.array([0] + [moteur.val_low(d) for d in range(1, 7)])
+VAL_HIGH = np.array([0] + [moteur.val_high(d) for d in range(1, 7)])
+
+# Résultat d'un total de 5 dés (index = total) : valeur Killer, régénération, PV perdus
+KILLER = np.array([0] * 5 + [11 - s for s in range(5, 11)] + [0] * 14 + [s - 24 for s in range(25, 31)])
+REGEN = np.zeros(31, dtype=bool); REGEN[[11, 24]] = True
+PERTE = np.array([0] * 12 + [s - 11 for s in range(12, 18)] + [24 - s for s in range(18, 24)] + [0] * 7)
+
+
+def choix_bots(des, valides, nb_low, nb_high):
+    """Version vectorisée de moteur.choix_bot : masque (N, 5) des dés gardés"""
+    sl = np.where(valides, VAL_LOW[des], -1)
+    sh = np.where(valides, VAL_HIGH[des], -1)
+    low = (nb_low > nb_high) | ((nb_low == nb_high) & (sl.clip(0).sum(1) >= sh.clip(0).sum(1)))
+    scores = np.where(low[:, None], sl, sh)
+
+    garde = scores >= 4000
+    vide = ~garde.any(1)
+    secours = np.where(low, 3, 4)
+    garde[vide] = (des[vide] == secours[vide, None]) & valides[vide]
+    vide = ~garde.any(1)
+    if vide.any():
+        # Sinon le premier dé au meilleur score
+        lignes = np.flatnonzero(vide)
+        garde[lignes, scores[lignes].argmax(1)] = True
+    return garde
+
+
+def jouer_choix(rng, n):
+    """Phase TOUR_CHOIX pour n joueurs : total des 5 dés gardés"""
+    nb_gardes = np.zeros(n, dtype=np.int64)
+    somme = np.zeros(n, dtype=np.int64)
+    nb_low = np.zeros(n, dtype=np.int64)
+    nb_high = np.zeros(n, dtype=np.int64)
+    positions = np.arange(5)
+    while (nb_gardes < 5).any():
+        en_cours = nb_gardes < 5
+        valides = (positions[None, :] < (5 - nb_gardes)[:, None]) & en_cours[:, None]
+        des = np.where(valides, rng.integers(1, 7, size=(n, 5)), 0)
+        garde = choix_bots(des, valides, nb_low, nb_high) & valides
+        gardes = np.where(garde, des, 0)
+        nb_gardes += garde.sum(1)
+        somme += gardes.sum(1)
+        nb_low += (garde & (des <= 3)).sum(1)
+        nb_high += (garde & (des >= 4)).sum(1)
+    return somme
+
+
+def jouer_attaques(rng, k):
+    """Chaînes d'attaque (une par valeur Killer de `k`) : le bot garde tous les dés égaux à k"""
+    n = len(k)
+    degats = np.zeros(n, dtype=np.int64)
+    gardes = np.zeros(n, dtype=np.int64)
+    actives = np.ones(n, dtype=bool)
+    positions = np.arange(5)
+    while actives.any():
+        valides = (positions[None, :] < (5 - gardes)[:, None]) & actives[:, None]
+        touches = ((rng.integers(1, 7, size=(n, 5)) == k[:, None]) & valides).sum(1)
+        actives &= touches > 0
+        gardes = np.where(actives, gardes + touches, gardes)
+        degats += np.where(actives, touches * k, 0)
+        gardes[gardes == 5] = 0  # FULL : on relance les 5 dés
+    return degats
+
+
+class Resultats:
+    def __init__(self, nb_joueurs):
+        self.nb_parties = 0
+        self.victoires = np.zeros(nb_joueurs, dtype=np.int64)
+        self.durees = []
+        self.killers = self.regens = self.pertes = 0
+        self.degats = np.zeros(1, dtype=np.int64)  # histogramme des dégâts par attaque
+
+    def ajouter_degats(self, d):
+        h = np.bincount(d)
+        if len(h) > len(self.degats): h[:len(self.degats)] += self.degats; self.degats = h
+        else: self.degats[:len(h)] += h
+
+
+def simuler(nb_parties, nb_joueurs, rng, resultats, max_tours=10000):
+    """Joue nb_parties parties complètes en parallèle et cumule dans `resultats`"""
+    g, p = nb_parties, nb_joueurs
+    pv = np.sort(rng.integers(1, 7, size=(g, p, 5)).sum(2), axis=1)  # Ordre de jeu : PV croissants
+    actuel = np.zeros(g, dtype=np.int64)
+    vivants_debut = pv >= 0
+    en_cours = np.ones(g, dtype=bool)
+    tours = np.zeros(g, dtype=np.int64)
+    vainqueur = np.full(g, -1, dtype=np.int64)
+
+    while en_cours.any() and tours.max() < max_tours:
+        jg = np.flatnonzero(en_cours)
+        s = jouer_choix(rng, len(jg))
+        cur = actuel[jg]
+
+        # Dégâts / régénération pour le joueur actuel
+        pv[jg, cur] -= PERTE[s]
+        regen = REGEN[s]
+        pv[jg[regen], cur[regen]] += rng.integers(1, 7, size=regen.sum())
+
+        # Killer : chaque autre joueur (même mort) subit une chaîne d'attaque
+        k = KILLER[s]
+        tueurs = k > 0
+        if tueurs.any():
+            jt, ct, kt = jg[tueurs], cur[tueurs], k[tueurs]
+            victimes = (ct[:, None] + np.arange(1, p)[None, :]) % p
+            degats = jouer_attaques(rng, np.repeat(kt, p - 1)).reshape(-1, p - 1)
+            np.subtract.at(pv, (np.repeat(jt, p - 1), victimes.ravel()), degats.ravel())
+            resultats.ajouter_degats(degats.ravel())
+
+        resultats.killers += int(tueurs.sum()); resultats.regens += int(regen.sum())
+        resultats.pertes += int((PERTE[s] > 0).sum())
+        tours[jg] += 1
+
+        # passer_suivant
+        survivants = pv[jg] >= 0
+        nb_survivants = survivants.sum(1)
+        fin = nb_survivants <= 1
+        if fin.any():
+            jf = jg[fin]
+            # Le dernier survivant, sinon le meilleur des vivants au début du tour (puis de tous)
+            candidats = np.where(nb_survivants[fin, None] == 1, survivants[fin], vivants_debut[jf])
+            candidats[~candidats.any(1)] = True
+            vainqueur[jf] = np.where(candidats, pv[jf], np.iinfo(np.int64).min).argmax(1)
+            en_cours[jf] = False
+        jc = jg[~fin]
+        actuel[jc] = (actuel[jc] + 1) % p
+        vivants_debut[jc] = survivants[~fin]
+
+    termine = vainqueur >= 0
+    resultats.nb_parties += int(termine.sum())
+    resultats.victoires += np.bincount(vainqueur[termine], minlength=p)
+    resultats.durees.append(tours[termine])
+
+
+def simuler_moteur(nb_parties, nb_joueurs, seed):
+    """Même chose avec le moteur Python, partie par partie (référence)"""
+    rng = random.Random(seed)
+    victoires = np.zeros(nb_joueurs, dtype=np.int64)
+    durees = []
+    for _ in range(nb_parties):
+        jeu, _ = moteur.simuler_partie(nb_joueurs, rng)
+        victoires[[j.sid for j in jeu.joueurs].index(jeu.vainqueur_sid)] += 1
+        durees.append(jeu.nb_tours)
+    return victoires, np.array(durees)
+
+
+def verifier():
+    """Compare choix_bots à moteur.choix_bot sur tous les lancers possibles"""
+    nb = 0
+    for n in range(1, 6):
+        lancers = np.array(list(itertools.product(range(1, 7), repeat=n)))
+        des = np.zeros((len(lancers), 5), dtype=np.int64); des[:, :n] = lancers
+        valides = np.zeros_like(des, dtype=bool); valides[:, :n] = True
+        for gardes in itertools.combinations_with_replacement(range(1, 7), 5 - n):
+            nl = np.full(len(des), sum(d <= 3 for d in gardes)); nh = np.full(len(des), sum(d >= 4 for d in gardes))
+            masque = choix_bots(des, valides, nl, nh)
+            for lancer, m in zip(lancers, masque):
+                attendu = set(moteur.choix_bot(list(lancer), list(gardes)))
+                if attendu != set(np.flatnonzero(m)):
+                    sys.exit(f"Différence : gardés {gardes}, lancer {list(lancer)} -> {sorted(attendu)} / {list(np.flatnonzero(m))}")
+                nb += 1
+    print(f"Heuristique identique à moteur.choix_bot sur {nb} situations")
+
+
+def pourcentiles(valeurs, poids=None):
+    if poids is not None: valeurs = np.repeat(np.arange(len(poids)), poids)
+    return "moyenne {:.2f}, médiane {:.0f}, p90 {:.0f}, p99 {:.0f}, max {:.0f}".format(
+        valeurs.mean(), *np.percentile(valeurs, [50, 90, 99]), valeurs.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulateur Monte Carlo et benchmark du Killer")
+    parser.add_argument('--parties', type=int, default=100000)
+    parser.add_argument('--joueurs', type=int, default=4)
+    parser.add_argument('--lot', type=int, default=50000, help="parties jouées en parallèle")
+    parser.add_argument('--graine', type=int, default=None)
+    parser.add_argument('--comparer', type=int, default=0, metavar='N', help="joue aussi N parties avec le moteur Python")
+    parser.add_argument('--verifier', action='store_true', help="vérifie l'heuristique vectorisée et quitte")
+    args = parser.parse_args()
+
+    if args.verifier: return verifier()
+
+    rng = np.random.default_rng(args.graine)
+    res = Resultats(args.joueurs)
+    debut = time.perf_counter()
+    restant = args.parties
+    while restant > 0:
+        simuler(min(args.lot, restant), args.joueurs, rng, res)
+        restant -= args.lot
+    duree = time.perf_counter() - debut
+
+    durees = np.concatenate(res.durees)
+    nb_tours = durees.sum()
+    print(f"Killer : {res.nb_parties} parties à {args.joueurs} joueurs")
+    print(f"Simulateur NumPy : {duree:.2f} s -> {res.nb_parties / duree:.0f} parties/s, {nb_tours / duree:.0f} tours/s")
+    print("Victoires par position (ordre de jeu) : " + "  ".join(
+        f"{i + 1}: {100 * v / res.nb_parties:.1f} %" for i, v in enumerate(res.victoires)))
+    print("Durée (tours) : " + pourcentiles(durees))
+    print(f"Scores : Killer {100 * res.killers / nb_tours:.1f} %, Régénération {100 * res.regens / nb_tours:.1f} %, "
+          f"Dégâts {100 * res.pertes / nb_tours:.1f} %")
+    print(f"Dégâts par attaque : {pourcentiles(None, res.degats)}, attaques ratées {100 * res.degats[0] / res.degats.sum():.1f} %")
+
+    if args.comparer:
+        debut = time.perf_counter()
+        victoires, durees = simuler_moteur(args.comparer, args.joueurs, args.graine)
+        duree = time.perf_counter() - debut
+        print(f"Moteur Python : {args.comparer} parties en {duree:.2f} s -> {args.comparer / duree:.0f} parties/s")
+        print("  Victoires par position : " + "  ".join(
+            f"{i + 1}: {100 * v / args.comparer:.1f} %" for i, v in enumerate(victoires)))
+        print("  Durée (tours) : " + pourcentiles(durees))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+// Format compact des états de jeu (voir compact.py) : décodage MessagePack + zlib, puis retour à la
+// forme JSON habituelle. Seul le sens serveur -> client est compact.
+const KillerCompact = (() => {
+    const CHAMPS = ['seq', 'joueurs', 'joueurs_maj', 'etat', 'joueur_actuel_sid', 'des_table', 'des_gardes', 'message',
+                    'valeur_killer', 'nom_victime', 'degats_accumules', 'vainqueur', 'createur_sid', 'room_id', 'nom_salon',
+                    'depuis'];
+    const CHAMPS_JOUEUR = ['sid', 'nom', 'pv', 'is_bot', 'est_pret', 'niveau', 'deconnecte', 'des_pv'];
+    const ETATS = ["ATTENTE", "ATTRIBUTION_PV", "TRANSITION_TOUR", "TOUR_CHOIX", "TOUR_REGEN", "RESULTAT_REGEN",
+                   "ATTENTE_LANCER", "TOUR_ATTAQUE", "ATTAQUE_RATEE", "FIN_ATTAQUE", "RESULTAT_ATTAQUE", "FIN"];
+    const texte = new TextDecoder();
+
+    // MessagePack : seulement les types produits par msgpack.packb côté serveur
+    function lire(octets) {
+        const vue = new DataView(octets.buffer, octets.byteOffset, octets.byteLength);
+        let pos = 0;
+        const chaine = (n) => { const s = texte.decode(octets.subarray(pos, pos + n)); pos += n; return s; };
+        const tableau = (n) => { const a = new Array(n); for (let i = 0; i < n; i++) a[i] = valeur(); return a; };
+        const map = (n) => { const m = {}; for (let i = 0; i < n; i++) { const k = valeur(); m[k] = valeur(); } return m; };
+        function valeur() {
+            const t = octets[pos++];
+            if (t <= 0x7f) return t;
+            if (t >= 0xe0) return t - 0x100;
+            if ((t & 0xf0) === 0x80) return map(t & 0x0f);
+            if ((t & 0xf0) === 0x90) return tableau(t & 0x0f);
+            if ((t & 0xe0) === 0xa0) return chaine(t & 0x1f);
+            let v;
+            switch (t) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xca: v = vue.getFloat32(pos); pos += 4; return v;
+                case 0xcb: v = vue.getFloat64(pos); pos += 8; return v;
+                case 0xcc: return octets[pos++];
+                case 0xcd: v = vue.getUint16(pos); pos += 2; return v;
+                case 0xce: v = vue.getUint32(pos); pos += 4; return v;
+                case 0xd0: v = vue.getInt8(pos); pos += 1; return v;
+                case 0xd1: v = vue.getInt16(pos); pos += 2; return v;
+                case 0xd2: v = vue.getInt32(pos); pos += 4; return v;
+                case 0xd9: return chaine(octets[pos++]);
+                case 0xda: v = vue.getUint16(pos); pos += 2; return chaine(v);
+                case 0xdb: v = vue.getUint32(pos); pos += 4; return chaine(v);
+                case 0xdc: v = vue.getUint16(pos); pos += 2; return tableau(v);
+                case 0xdd: v = vue.getUint32(pos); pos += 4; return tableau(v);
+                case 0xde: v = vue.getUint16(pos); pos += 2; return map(v);
+                case 0xdf: v = vue.getUint32(pos); pos += 4; return map(v);
+            }
+            throw new Error("MessagePack : type non géré 0x" + t.toString(16));
+        }
+        return valeur();
+    }
+
+    // Trame -> map compacte (Promise : la décompression du navigateur est asynchrone)
+    async function decoder(trame) {
+        let octets = new Uint8Array(trame);
+        if (octets[0] === 1) {
+            const flux = new Blob([octets.subarray(1)]).stream().pipeThrough(new DecompressionStream('deflate'));
+            octets = new Uint8Array(await new Response(flux).arrayBuffer());
+        } else {
+            octets = octets.subarray(1);
+        }
+        return lire(octets);
+    }
+
+    const joueur = (a) => { const j = {}; CHAMPS_JOUEUR.forEach((c, i) => { j[c] = a[i]; }); return j; };
+
+    // Map compacte -> patch (ou état) JSON ; `courant` : état du client avant ce patch
+    function etendre(c, courant) {
+        const d = {};
+        for (const k in c) d[CHAMPS[k]] = c[k];
+        if ('etat' in d) d.etat = ETATS[d.etat];
+        if (d.joueurs) d.joueurs = d.joueurs.map(joueur);
+        if (d.joueurs_maj) d.joueurs_maj = d.joueurs_maj.map(([i, a]) => { const j = joueur(a); j.sid = courant.joueurs[i].sid; return [i, j]; });
+        const liste = d.joueurs || (courant ? courant.joueurs : []);
+        if ('joueur_actuel_sid' in d) {
+            const i = d.joueur_actuel_sid;
+            d.joueur_actuel_sid = i >= 0 ? liste[i].sid : "";
+            d.joueur_actuel = i >= 0 ? liste[i].nom : "";
+        }
+        if ('createur_sid' in d) d.createur_sid = d.createur_sid >= 0 ? liste[d.createur_sid].sid : null;
+        return d;
+    }
+
+    const supporte = typeof DecompressionStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+    return {decoder, etendre, supporte};
+})();
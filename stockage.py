@@ -0,0 +1,153 @@
+"""Stockage partagé des salons entre workers.
+
+- StockageMemoire : un seul worker, rien n'est copié (comportement historique).
+- StockageFichier : plusieurs workers sur la même machine, un fichier JSON par salon.
+
+Un salon appartient au dernier worker qui l'a sauvé ; un autre worker qui reçoit une action
+pour ce salon le recharge depuis le stockage (sous verrou) et en devient propriétaire.
+
+La propriété suit donc la dernière action, elle n'est pas fixée : les minuteries d'un salon (bots, départs)
+sont planifiées par le worker qui vient de calculer son nouvel état, et aucun canal ne permettrait de
+réveiller un propriétaire fixe. Elle ne bouge que si les joueurs d'un même salon sont connectés à des
+workers différents (websocket seul : un client reste sur son worker).
+"""
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StockageMemoire:
+    partage = False
+
+    def __init__(self):
+        self.infos_publiques = {}
+
+    @contextmanager
+    def verrou(self, rid):
+        yield
+
+    def existe(self, rid): return False
+    def version(self, rid): return None
+    def proprietaire(self, rid, worker): return True
+    def charger(self, rid): return None
+    def sauver(self, rid, worker, snapshot): return None
+    def supprimer(self, rid): pass
+
+    def info(self, rid): return self.infos_publiques.get(rid)
+    def publier_info(self, rid, info): self.infos_publiques[rid] = info
+    def retirer_info(self, rid): return self.infos_publiques.pop(rid, None) is not None
+    def infos(self): return list(self.infos_publiques.values())
+
+
+class StockageFichier:
+    partage = True
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+        self.verrous = {}  # rid -> [ident du thread, profondeur, fichier]
+        self.verrous_lock = threading.Lock()
+
+    def chemin(self, rid, ext): return os.path.join(self.dossier, f"{rid}.{ext}")
+
+    @contextmanager
+    def verrou(self, rid):
+        """Verrou inter-processus (flock) sur un salon, réentrant pour le thread qui le détient"""
+        moi = threading.get_ident()
+        with self.verrous_lock:
+            tenu = self.verrous.get(rid)
+            reentrant = tenu is not None and tenu[0] == moi
+            if reentrant: tenu[1] += 1
+        if reentrant:
+            try: yield
+            finally:
+                with self.verrous_lock: tenu[1] -= 1
+            return
+
+        while True:
+            f = open(self.chemin(rid, 'lock'), 'a')
+            # Non bloquant + attente courte : flock bloquerait tout le processus sous eventlet
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    time.sleep(0.005)
+            # Salon supprimé pendant l'attente : ce fichier n'est plus celui du chemin (un autre processus
+            # a pu en créer un nouveau et le verrouiller), on recommence avec le fichier courant
+            try: courant = os.fstat(f.fileno()).st_ino == os.stat(self.chemin(rid, 'lock')).st_ino
+            except FileNotFoundError: courant = False
+            if courant: break
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+        with self.verrous_lock: self.verrous[rid] = [moi, 1, f]
+        try: yield
+        finally:
+            with self.verrous_lock:
+                self.verrous[rid][1] -= 1
+                libre = self.verrous[rid][1] == 0
+                if libre: del self.verrous[rid]
+            if libre:
+                fcntl.flock(f, fcntl.LOCK_UN)
+                f.close()
+
+    def lire(self, rid, ext):
+        try:
+            with open(self.chemin(rid, ext)) as f: return json.load(f)
+        except (FileNotFoundError, ValueError): return None
+
+    def ecrire(self, rid, ext, data):
+        # Ecriture atomique : les autres workers ne voient jamais un fichier à moitié écrit
+        tmp = self.chemin(rid, f"{ext}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f: json.dump(data, f)
+        os.replace(tmp, self.chemin(rid, ext))
+
+    def existe(self, rid): return os.path.exists(self.chemin(rid, 'json'))
+
+    def version(self, rid):
+        data = self.lire(rid, 'json')
+        return data['version'] if data else None
+
+    def proprietaire(self, rid, worker):
+        data = self.lire(rid, 'json')
+        return bool(data) and data['proprietaire'] == worker
+
+    def charger(self, rid):
+        data = self.lire(rid, 'json')
+        return (data['version'], data['snapshot']) if data else None
+
+    def sauver(self, rid, worker, snapshot):
+        version = (self.version(rid) or 0) + 1
+        self.ecrire(rid, 'json', {'version': version, 'proprietaire': worker, 'snapshot': snapshot})
+        return version
+
+    def supprimer(self, rid):
+        # Sous le verrou du salon : ceux qui attendent le .lock supprimé le verront (voir verrou)
+        for ext in ('json', 'lock'):
+            try: os.remove(self.chemin(rid, ext))
+            except FileNotFoundError: pass
+
+    def info(self, rid): return self.lire(rid, 'info')
+    def publier_info(self, rid, info): self.ecrire(rid, 'info', info)
+
+    def retirer_info(self, rid):
+        try: os.remove(self.chemin(rid, 'info'))
+        except FileNotFoundError: return False
+        return True
+
+    def infos(self):
+        infos = []
+        for chemin in glob.glob(os.path.join(self.dossier, '*.info')):
+            info = self.lire(os.path.basename(chemin)[:-len('.info')], 'info')
+            if info: infos.append(info)
+        return infos
+
+
+def depuis_config(url):
+    """'' ou 'memoire' -> StockageMemoire ; 'fichier:/chemin' -> StockageFichier"""
+    if url and url.startswith('fichier:'): return StockageFichier(url[len('fichier:'):])
+    return StockageMemoire()
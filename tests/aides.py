@@ -0,0 +1,32 @@
+"""Outils communs aux tests : parties de bots jouées jusqu'au bout, salons créés par un client de test"""
+import json
+
+import moteur
+
+
+def jouer(jeu, etapes=100000):
+    while jeu.etat != "FIN" and etapes:
+        moteur.bot_jouer(jeu); etapes -= 1
+    return jeu
+
+
+def normaliser(snap):
+    # Comme après un passage par le journal ou le stockage (tuples -> listes) ; l'ordre des sets ne compte pas
+    snap = json.loads(json.dumps(snap))
+    snap['morts_du_tour'] = sorted(snap['morts_du_tour'])
+    return snap
+
+
+def partie_de_bots(nb_joueurs, graine, evenements=None, niveaux=('facile', 'moyen', 'expert')):
+    jeu = moteur.Partie("T", "Test", evenements)
+    for i in range(nb_joueurs): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, niveaux[i % len(niveaux)])
+    jeu.demarrer(graine)
+    for j in jeu.joueurs: jeu.valider_pv(j)
+    return jeu
+
+
+def creer_salon(c, nom='a', **options):
+    c.emit('creer_salon', {'nom_salon': 'Test'})
+    rid = next(m for m in c.get_received() if m['name'] == 'salon_cree')['args'][0]['room_id']
+    c.emit('rejoindre', dict(room_id=rid, nom=nom, **options))
+    return rid
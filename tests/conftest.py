@@ -0,0 +1,24 @@
+# python -m pytest (pip install pytest ; msgpack, numpy et python-socketio[client] en plus pour tout couvrir)
+import os
+import sys
+
+import pytest
+
+# Les modules du jeu sont à la racine du dépôt, sans paquet
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serveur(monkeypatch):
+    """Le module app (eventlet.monkey_patch à l'import), délais des bots et des reconnexions raccourcis"""
+    pytest.importorskip('flask_socketio')
+    import app
+    monkeypatch.setattr(app, 'BOT_DELAI', 0.005)
+    monkeypatch.setattr(app, 'RECONNEXION_DELAI', 0.2)
+    return app
+
+
+@pytest.fixture
+def client(serveur):
+    """Fabrique de clients Socket.IO de test branchés sur le serveur"""
+    return lambda: serveur.socketio.test_client(serveur.app)
@@ -0,0 +1,24 @@
+"""Format compact (msgpack) : les patchs décodés redonnent l'état JSON"""
+import pytest
+
+import moteur
+
+pytest.importorskip('msgpack')
+import compact  # noqa: E402
+
+
+def test_compact_redonne_l_etat_json():
+    for nb_joueurs in (2, 4, 10):
+        mesure = compact.mesurer(nb_joueurs, 5)  # Vérifie chaque patch décodé contre l'état JSON
+        assert mesure.verifies > 50
+
+
+def test_compact_patch_spectateur():
+    jeu = moteur.Partie("T", "Test")
+    for i in range(3): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, 'facile')
+    avant = jeu.etat_public()
+    jeu.demarrer(1)
+    etat = jeu.etat_public()
+    patch = dict(moteur.diff_etat(avant, etat), seq=9, depuis=4)
+    p = compact.etendre(compact.decoder(compact.encoder(patch, etat)), avant)
+    assert p['depuis'] == 4 and p['seq'] == 9 and p['etat'] == etat['etat']
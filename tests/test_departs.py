@@ -0,0 +1,66 @@
+"""Joueurs indexés par sid : départs en cours de partie sans casser les index du tour"""
+import pytest
+
+import moteur
+from aides import jouer, partie_de_bots
+
+
+def partie_en_attaque(graine):
+    """Partie de 5 bots arrêtée sur une attaque, quand l'attaquant n'est pas le premier et qu'il reste des victimes"""
+    jeu = partie_de_bots(5, graine)
+    while jeu.etat != "FIN":
+        if jeu.etat == "TOUR_ATTAQUE" and jeu.joueur_actuel_idx >= 2 and len(jeu.liste_victimes) >= 2: return jeu
+        moteur.bot_jouer(jeu)
+    return None
+
+
+def verifier_index(jeu):
+    assert jeu.par_sid == {j.sid: j for j in jeu.joueurs}
+    assert jeu.vivants == {j.sid for j in jeu.joueurs if j.pv >= 0}
+    assert 0 <= jeu.joueur_actuel_idx < len(jeu.joueurs)
+    assert all(0 <= v < len(jeu.joueurs) for v in jeu.liste_victimes)
+    assert -1 <= jeu.victime_actuelle_idx < len(jeu.joueurs)
+
+
+@pytest.mark.parametrize('graine', range(8))
+def test_retirer_un_joueur_avant_l_attaquant(graine):
+    jeu = next(filter(None, (partie_en_attaque(g) for g in range(graine * 100, graine * 100 + 100))))
+    attaquant = jeu.get_joueur_actuel()
+    victime = jeu.joueurs[jeu.victime_actuelle_idx] if jeu.victime_actuelle_idx >= 0 else None
+    victimes = [jeu.joueurs[v] for v in jeu.liste_victimes]
+    parti = next(j for j in jeu.joueurs[:jeu.joueur_actuel_idx] if j is not victime)
+    jeu.retirer_joueur(parti, "parti")
+
+    verifier_index(jeu)
+    assert jeu.get_joueur_actuel() is attaquant and jeu.etat == "TOUR_ATTAQUE"
+    assert [jeu.joueurs[v] for v in jeu.liste_victimes] == [j for j in victimes if j is not parti]
+    if victime: assert jeu.joueurs[jeu.victime_actuelle_idx] is victime
+    jouer(jeu)
+    assert jeu.etat == "FIN"
+
+
+@pytest.mark.parametrize('graine', range(8))
+def test_retirer_l_attaquant(graine):
+    jeu = next(filter(None, (partie_en_attaque(g) for g in range(graine * 100, graine * 100 + 100))))
+    idx = jeu.joueur_actuel_idx
+    suivant = jeu.joueurs[(idx + 1) % len(jeu.joueurs)]
+    jeu.retirer_joueur(jeu.get_joueur_actuel(), "parti")
+
+    verifier_index(jeu)
+    if jeu.etat != "FIN":
+        assert jeu.get_joueur_actuel() is suivant and jeu.etat == "TRANSITION_TOUR"
+    jouer(jeu)
+    assert jeu.etat == "FIN"
+
+
+def test_retirer_en_attribution_des_pv():
+    jeu = moteur.Partie("T", "Test")
+    humain = jeu.ajouter_joueur("H", "Humain")
+    for _ in range(2): jeu.ajouter_bot()
+    jeu.demarrer(1)
+    for j in jeu.joueurs[1:]: jeu.valider_pv(j)
+    assert jeu.etat == "ATTRIBUTION_PV"
+    jeu.retirer_joueur(humain)  # Le dernier à valider part : la partie commence sans lui
+    verifier_index(jeu)
+    assert jeu.etat != "ATTRIBUTION_PV" and humain.sid not in jeu.par_sid
+
@@ -0,0 +1,40 @@
+"""Dés à graine par salon : parties rejouables, reprise depuis un snapshot sur le même flux de dés"""
+import json
+import random
+
+import pytest
+
+import moteur
+from aides import jouer, normaliser, partie_de_bots
+
+
+@pytest.mark.parametrize('graine', [1, 2, 12345, 2 ** 63])
+def test_meme_graine_meme_partie(graine):
+    a, _ = moteur.simuler_partie(4, graine=graine, niveaux=['facile', 'moyen', 'expert', 'moyen'])
+    b, _ = moteur.simuler_partie(4, graine=graine, niveaux=['facile', 'moyen', 'expert', 'moyen'])
+    assert a.etat == "FIN"
+    assert normaliser(a.to_snapshot()) == normaliser(b.to_snapshot())
+
+
+def test_graines_differentes():
+    fins = {json.dumps(normaliser(moteur.simuler_partie(4, graine=g)[0].to_snapshot()), sort_keys=True) for g in range(20)}
+    assert len(fins) == 20
+
+
+def test_des_uniformes():
+    des = moteur.Des(7)
+    compte = [0] * 7
+    for _ in range(60000): compte[des.randint(1, 6)] += 1
+    assert compte[0] == 0 and all(9400 < n < 10600 for n in compte[1:])
+    assert des.tires == 60000
+
+
+@pytest.mark.parametrize('graine', range(10))
+def test_reprise_depuis_snapshot(graine):
+    """Un salon rechargé en cours de partie continue exactement le même flux de dés"""
+    jeu = partie_de_bots(4, graine)
+    for _ in range(random.Random(graine).randrange(5, 60)): moteur.bot_jouer(jeu)
+    copie = moteur.Partie("T", "Test")
+    copie.charger_snapshot(json.loads(json.dumps(jeu.to_snapshot())))
+    assert normaliser(jouer(copie).to_snapshot()) == normaliser(jouer(jeu).to_snapshot())
+
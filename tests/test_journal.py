@@ -0,0 +1,87 @@
+"""Journal des parties : actions rejouées à l'identique, relecture du journal sur disque au redémarrage"""
+import json
+import random
+
+import pytest
+
+import journal as journaux
+import moteur
+from aides import jouer, normaliser, partie_de_bots
+
+
+class Enregistreur(moteur.Evenements):
+    """Garde chaque action journalisée, comme le serveur l'écrit dans le journal"""
+    journal = True
+
+    def __init__(self): self.actions = []
+
+    def action(self, partie, nom, args, kwargs, des, variations):
+        self.actions.append(json.loads(json.dumps({'a': nom, 'p': args, 'k': kwargs, 'd': des, 'v': variations})))
+
+
+@pytest.mark.parametrize('graine', [None, 3, 4])
+def test_rejouer_les_actions(graine):
+    """Snapshot du début + actions journalisées = l'état final (sans graine, les dés enregistrés suffisent)"""
+    evenements = Enregistreur()
+    jeu = moteur.Partie("T", "Test", evenements, random.Random(5))
+    debut = json.loads(json.dumps(jeu.to_snapshot()))
+    for i in range(4): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, 'expert')
+    jeu.demarrer(graine)
+    for j in jeu.joueurs: jeu.valider_pv(j)
+    jouer(jeu)
+
+    rejoue = moteur.Partie("T", "Test")
+    rejoue.charger_snapshot(debut)
+    for a in evenements.actions: assert rejoue.rejouer(a['a'], a['p'], a['k'], a['d'], a['v']), a['a']
+    assert normaliser(rejoue.to_snapshot()) == normaliser(jeu.to_snapshot())
+
+
+def test_rejouer_detecte_une_divergence():
+    evenements = Enregistreur()
+    jeu = partie_de_bots(3, None, evenements)
+    debut = json.loads(json.dumps(jeu.to_snapshot()))
+    jouer(jeu, 30)
+    rejoue = moteur.Partie("T", "Test")
+    rejoue.charger_snapshot(debut)
+    actions = evenements.actions
+    n = next(i for i, a in enumerate(actions) if a['v'])
+    for a in actions[:n]: assert rejoue.rejouer(a['a'], a['p'], a['k'], a['d'], a['v'])
+    a = actions[n]
+    a['v'][0][1] += 1  # Une variation de PV que les dés ne redonnent pas
+    assert not rejoue.rejouer(a['a'], a['p'], a['k'], a['d'], a['v'])
+
+
+def test_journal_sur_disque(tmp_path):
+    """Ecriture par lots, relecture et reconstruction des salons, comme au redémarrage du serveur"""
+    journal = journaux.Journal(str(tmp_path), lambda fn: None, taille_segment=20000)
+
+    class EvenementsJournal(moteur.Evenements):
+        journal = True
+
+        def action(self, partie, nom, args, kwargs, des, variations):
+            journal.action(partie.id, nom, args, kwargs, des, variations)
+            if len(journal.a_ecrire) % 25 == 0: journal.snapshot(partie.id, partie.to_snapshot())
+
+    evenements, salons = EvenementsJournal(), []
+    for num in range(6):
+        jeu = moteur.Partie(f"S{num}", f"Salon {num}", evenements, random.Random(num))
+        journal.snapshot(jeu.id, jeu.to_snapshot())
+        for i in range(3): jeu.ajouter_bot('expert')
+        jeu.demarrer(num if num % 2 else None)
+        for j in jeu.joueurs: jeu.valider_pv(j)
+        jouer(jeu, 40 * (num + 1))
+        salons.append(jeu)
+        journal.vider()
+        if journal.a_compacter(): journal.compacter((s.id, s.to_snapshot()) for s in salons); journal.vider()
+    journal.suppression(salons[0].id)
+    journal.vider()
+
+    relus = journaux.Journal(str(tmp_path), None).relire()
+    assert sorted(relus) == [s.id for s in salons[1:]]
+    for jeu in salons[1:]:
+        snap, actions = relus[jeu.id]
+        repris = moteur.Partie(jeu.id, snap['nom_salon'])
+        repris.charger_snapshot(snap)
+        for a in actions: assert repris.rejouer(a['a'], a['p'], a.get('k', {}), a['d'], a['v'])
+        assert normaliser(repris.to_snapshot()) == normaliser(jeu.to_snapshot())
+
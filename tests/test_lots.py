@@ -0,0 +1,98 @@
+"""Envoi groupé par action ('lot') : ce que reçoivent les clients du serveur et le faux joueur de charge.py"""
+import importlib.util
+import json
+import time
+
+import pytest
+
+from aides import creer_salon
+
+
+def deplier(recus):
+    """Messages reçus, les 'lot' dépliés dans l'ordre"""
+    for m in recus:
+        if m['name'] == 'lot': yield from ({'name': e, 'args': [d]} for e, d in m['args'][0])
+        else: yield m
+
+
+class EtatClient:
+    """Copie de l'état tenue comme le navigateur : état complet, puis patchs dans l'ordre des seq"""
+
+    def __init__(self, c):
+        self.c, self.etat, self.lots = c, None, 0
+
+    def lire(self):
+        recus = self.c.get_received()
+        self.lots += sum(m['name'] == 'lot' for m in recus)
+        for m in deplier(recus): self.appliquer(m['name'], m['args'][0] if m['args'] else None)
+
+    def appliquer(self, evt, data):
+        if evt.endswith('_mp'):
+            import compact
+            data = compact.etendre(compact.decoder(data), self.etat)
+            evt = evt[:-3]
+        if evt == 'update_jeu': self.etat = data
+        elif evt == 'patch_jeu':
+            assert data['seq'] == self.etat['seq'] + 1
+            for i, j in data.pop('joueurs_maj', []): self.etat['joueurs'][i] = j
+            self.etat.update(data)
+
+
+def jouer_humain(jeu, c):
+    e = jeu.etat
+    if e == 'TRANSITION_TOUR': c.emit('valider_debut_tour')
+    elif e == 'TOUR_CHOIX': c.emit('action_garder', list(range(len(jeu.des_sur_table))))
+    elif e == 'TOUR_REGEN': c.emit('action_lancer_regen')
+    elif e == 'RESULTAT_REGEN': c.emit('action_fin_regen')
+    elif e == 'ATTENTE_LANCER': c.emit('action_lancer_attaque')
+    elif e == 'TOUR_ATTAQUE': c.emit('action_garder_attaque', [i for i, v in enumerate(jeu.des_sur_table) if v == jeu.valeur_killer])
+    elif e in ('FIN_ATTAQUE', 'ATTAQUE_RATEE'): c.emit('action_terminer_attaque')
+    elif e == 'RESULTAT_ATTAQUE': c.emit('action_suivant')
+
+
+def test_partie_complete_par_lots(serveur, client):
+    formats = [{}] + ([{'format': 'mp'}] if importlib.util.find_spec('msgpack') else [])
+    clients = [client() for _ in formats]
+    rid = creer_salon(clients[0], 'H0', **formats[0])
+    for n, (c, f) in enumerate(zip(clients[1:], formats[1:]), 1): c.emit('rejoindre', dict(room_id=rid, nom=f'H{n}', **f))
+    clients[0].emit('ajouter_bot', {'niveau': 'expert'})
+    clients[0].emit('demarrer_partie')
+    for c in clients: c.emit('valider_pv')
+    jeu = serveur.games[rid]
+    vues = [EtatClient(c) for c in clients]
+    par_nom = {f'H{n}': c for n, c in enumerate(clients)}
+
+    fin = time.monotonic() + 60
+    while jeu.etat != "FIN" and time.monotonic() < fin:
+        time.sleep(0.005)
+        for v in vues: v.lire()
+        cur = jeu.get_joueur_actuel()
+        if cur and not cur.is_bot: jouer_humain(jeu, par_nom[cur.nom])
+    time.sleep(0.05)
+    for v in vues: v.lire()
+
+    assert jeu.etat == "FIN"
+    final = json.loads(json.dumps(dict(jeu.dernier_etat, seq=jeu.seq)))
+    for v in vues:
+        assert json.loads(json.dumps(v.etat)) == final
+        assert v.lots > 0  # Les actions à plusieurs messages arrivent regroupées
+    clients[0].emit('fermer_salon')
+
+
+def test_charge_lit_les_lots():
+    """Le faux joueur de charge.py applique aussi les patchs arrivés dans un 'lot'"""
+    pytest.importorskip('socketio')
+    import charge
+    import moteur
+    jeu = moteur.Partie("T", "Test")
+    for i in range(3): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, 'facile')
+    avant = dict(jeu.etat_public(), seq=1)
+    jeu.demarrer(1)
+    apres = dict(jeu.etat_public(), seq=2)
+    patch = dict(moteur.diff_etat(avant, apres), seq=2)
+
+    joueur = charge.JoueurSimule(0, None, 3600, {'joueurs': 3})  # Réflexion d'une heure : il n'agit pas
+    joueur.recevoir('update_jeu', json.loads(json.dumps(avant)))
+    joueur.recevoir('lot', json.loads(json.dumps([['notification', {'msg': "Ordre"}], ['patch_jeu', patch]])))
+    assert joueur.etat == json.loads(json.dumps(apres))
+    charge.actions.annuler(0)
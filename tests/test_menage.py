@@ -0,0 +1,28 @@
+"""Ménage des salons abandonnés : parcours de l'index LRU depuis le plus ancien"""
+import time
+
+import stockage
+
+
+def test_menage_s_arrete_au_premier_salon_recent(serveur):
+    vieux = [serveur.creer_partie("Test") for _ in range(2)]
+    recent, hors_ordre = serveur.creer_partie("Test"), serveur.creer_partie("Test")
+    passe = time.monotonic() - serveur.SALON_VIDE_DELAI - 1
+    with serveur.registre:
+        for jeu in [hors_ordre, recent] + vieux[::-1]: serveur.activite.move_to_end(jeu.id, last=False)
+        for jeu in vieux + [hors_ordre]: jeu.derniere_activite = serveur.activite[jeu.id] = passe
+
+    assert serveur.nettoyer_salons() == 2
+    assert all(j.id not in serveur.games and j.id not in serveur.activite for j in vieux)
+    # Placé après un salon récent (ce que toucher n'écrit jamais) : le parcours ne va pas jusqu'à lui
+    assert hors_ordre.id in serveur.games and recent.id in serveur.games
+    for jeu in (recent, hors_ordre): serveur.supprimer_salon(jeu.id)
+
+
+def test_salon_recharge_entre_dans_l_index(serveur, monkeypatch, tmp_path):
+    monkeypatch.setattr(serveur, 'stockage', stockage.StockageFichier(str(tmp_path)))
+    rid = serveur.creer_partie("Test").id
+    with serveur.registre: serveur.games.pop(rid); serveur.activite.pop(rid)  # Salon connu d'un autre worker seulement
+    with serveur.stockage.verrou(rid): assert serveur.salon_a_jour(rid) is serveur.games[rid]
+    assert rid in serveur.activite
+    serveur.supprimer_salon(rid)
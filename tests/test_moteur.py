@@ -0,0 +1,90 @@
+"""Moteur sans serveur : démarrage, règles de score, attaque Killer, fin de partie"""
+import pytest
+
+import moteur
+
+
+def partie_truquee(*lancers):
+    """A (30 PV) contre B (25 PV, joue en premier) ; `lancers` : les dés suivants, dans l'ordre"""
+    jeu = moteur.Partie("T", "Test", rng=moteur.DesRejoues([6] * 5 + [5] * 5 + list(lancers)))
+    a, b = jeu.ajouter_joueur("A", "A"), jeu.ajouter_joueur("B", "B")
+    jeu.demarrer()
+    for j in (a, b): jeu.valider_pv(j)
+    return jeu, a, b
+
+
+def test_demarrage():
+    jeu = moteur.Partie("T", "Test", rng=moteur.DesRejoues([6] * 5 + [5] * 5))
+    a = jeu.ajouter_joueur("A", "A")
+    assert not jeu.demarrer()  # Seul : pas de partie
+    b = jeu.ajouter_joueur("B", "B")
+    assert jeu.demarrer() and not jeu.demarrer()
+    assert (a.pv, b.pv) == (30, 25) and a.des_pv == (6,) * 5
+    assert jeu.valider_pv(a) and not jeu.valider_pv(a)
+    assert jeu.etat == "ATTRIBUTION_PV"  # La partie attend que chacun ait validé ses PV
+    jeu.valider_pv(b)
+    assert jeu.etat == "TRANSITION_TOUR" and jeu.joueurs == [b, a] and jeu.get_joueur_actuel() is b
+
+
+@pytest.mark.parametrize('lancer, etat, pv', [
+    ([3, 3, 3, 3, 3], "TRANSITION_TOUR", 21),  # 15 : -4
+    ([4, 4, 4, 4, 4], "TRANSITION_TOUR", 21),  # 20 : -4
+    ([2, 2, 2, 3, 3], "TRANSITION_TOUR", 24),  # 12 : -1
+    ([1, 1, 1, 2, 6], "TOUR_REGEN", 25),  # 11
+    ([6, 6, 6, 3, 3], "TOUR_REGEN", 25),  # 24
+    ([1, 1, 1, 1, 1], "ATTENTE_LANCER", 25),  # 5 : Killer 6
+    ([6, 6, 6, 6, 6], "ATTENTE_LANCER", 25),  # 30 : Killer 6
+])
+def test_score_des_cinq_des(lancer, etat, pv):
+    jeu, a, b = partie_truquee(*lancer)
+    jeu.valider_debut_tour()
+    assert jeu.garder([0, 1, 2, 3, 4])
+    assert jeu.etat == etat and b.pv == pv
+    if etat == "TRANSITION_TOUR": assert jeu.get_joueur_actuel() is a
+    if etat == "ATTENTE_LANCER": assert jeu.valeur_killer == 6 and jeu.joueurs[jeu.victime_actuelle_idx] is a
+
+
+def test_garder_puis_relancer():
+    jeu, a, b = partie_truquee(3, 3, 3, 1, 2, 3, 3)
+    jeu.valider_debut_tour()
+    assert jeu.garder([0, 1, 2])
+    assert jeu.des_gardes == [3, 3, 3] and jeu.des_sur_table == [3, 3]
+    assert jeu.garder([0, 1]) and b.pv == 21
+
+
+def test_regeneration():
+    jeu, a, b = partie_truquee(1, 1, 1, 2, 6, 4)
+    jeu.valider_debut_tour()
+    jeu.garder([0, 1, 2, 3, 4])
+    assert jeu.lancer_regen() and b.pv == 29 and jeu.etat == "RESULTAT_REGEN"
+    assert jeu.fin_regen() and jeu.get_joueur_actuel() is a
+
+
+def test_attaque_killer():
+    jeu, a, b = partie_truquee(1, 1, 1, 1, 1, 6, 6, 1, 2, 3, 2, 3, 4)
+    jeu.valider_debut_tour()
+    jeu.garder([0, 1, 2, 3, 4])
+    assert jeu.lancer_attaque() and jeu.etat == "TOUR_ATTAQUE"
+    assert not jeu.garder_attaque([2])  # Un 1 n'est pas un dé Killer
+    assert jeu.garder_attaque([0, 1]) and jeu.etat == "FIN_ATTAQUE"  # Relance : 2, 3, 4, plus de 6
+    assert jeu.terminer_attaque()
+    assert a.pv == 18 and jeu.etat == "TRANSITION_TOUR" and jeu.get_joueur_actuel() is a
+
+
+def test_actions_refusees():
+    jeu, a, b = partie_truquee(3, 3, 3, 1, 2)
+    assert not jeu.garder([0]) and not jeu.lancer_attaque() and not jeu.lancer_regen()  # Hors de leur état
+    jeu.valider_debut_tour()
+    for indices in ([], [0, 0], [5], [-1], ['0']): assert not jeu.garder(indices)
+    assert jeu.etat == "TOUR_CHOIX" and jeu.des_gardes == []
+
+
+@pytest.mark.parametrize('nb_joueurs', [2, 3, 6])
+@pytest.mark.parametrize('attaque_groupee', [False, True])
+def test_partie_de_bots_jusqu_a_la_fin(nb_joueurs, attaque_groupee):
+    for graine in range(10):
+        jeu, etapes = moteur.simuler_partie(nb_joueurs, graine=graine, niveaux='expert', attaque_groupee=attaque_groupee)
+        assert jeu.etat == "FIN" and etapes < 100000
+        assert len(jeu.vivants) <= 1 and jeu.vainqueur_sid in jeu.par_sid
+        if jeu.vivants: assert jeu.vivants == {jeu.vainqueur_sid}
+        assert jeu.vainqueur == jeu.par_sid[jeu.vainqueur_sid].nom
@@ -0,0 +1,31 @@
+"""Ordonnanceur : actions différées par clé, chacune dans sa propre tâche"""
+import threading
+
+from ordonnanceur import Ordonnanceur
+
+
+def lancer_thread(fn, *args):
+    threading.Thread(target=fn, args=args, daemon=True).start()
+
+
+def test_action_lente_ne_retarde_pas_les_autres():
+    """Une action qui attend (verrou d'un salon tenu ailleurs) ne bloque pas celles des autres clés"""
+    ordo = Ordonnanceur(lancer_thread)
+    libere, faite = threading.Event(), threading.Event()
+    ordo.planifier('lent', 0, libere.wait, 5)
+    ordo.planifier('rapide', 0.01, faite.set)
+    assert faite.wait(2)
+    libere.set()
+
+
+def test_une_action_par_cle():
+    ordo = Ordonnanceur(lancer_thread)
+    faites, fin = [], threading.Event()
+    noter = faites.append  # Même action d'un appel à l'autre
+    assert ordo.planifier('a', 0.05, noter, 1)
+    assert not ordo.planifier('a', 0.05, noter, 1)  # Déjà en attente : gardée
+    assert ordo.planifier('a', 0.05, noter, 2)  # Autres arguments : remplacée
+    ordo.planifier('b', 0.01, lambda: 1 / 0)  # Journalisée, la boucle continue
+    ordo.planifier('c', 0.1, fin.set)
+    assert fin.wait(2)
+    assert faites == [2] and ordo.stats()['profondeur'] == 0 and ordo.stats()['executees'] == 3
@@ -0,0 +1,53 @@
+"""Patchs d'état : appliqués dans l'ordre, ils redonnent l'état complet du serveur"""
+import json
+
+import pytest
+
+import moteur
+from aides import jouer, partie_de_bots
+
+
+class Client(moteur.Evenements):
+    """Applique chaque patch à sa copie de l'état (comme le navigateur) et la compare à l'état du serveur"""
+
+    def __init__(self):
+        self.serveur = None
+        self.client = None
+        self.patchs = 0
+
+    def etat(self, partie):
+        etat = partie.etat_public()
+        patch = json.loads(json.dumps(moteur.diff_etat(self.serveur, etat)))
+        if self.client is None: self.client = patch
+        else:
+            for i, j in patch.pop('joueurs_maj', []): self.client['joueurs'][i] = j
+            self.client.update(patch)
+            self.patchs += 1
+        assert self.client == json.loads(json.dumps(etat))
+        self.serveur = etat
+
+
+@pytest.mark.parametrize('graine', range(5))
+def test_patchs_redonnent_l_etat(graine):
+    client = Client()
+    jeu = moteur.Partie("T", "Test", client)
+    for i in range(4): jeu.ajouter_joueur(f"BOT_{i}", f"Bot {i + 1}", True, 'expert')
+    jeu.demarrer(graine)
+    for j in jeu.joueurs: jeu.valider_pv(j)
+    jouer(jeu, 80)
+    jeu.retirer_joueur(jeu.joueurs[1], "parti")  # Composition changée : liste complète
+    jeu.changer_sid(jeu.joueurs[0], "NOUVEAU")
+    jeu.publier()
+    jouer(jeu)
+    assert client.patchs > 20
+
+
+def test_patch_joueurs_maj_seulement_si_meme_composition():
+    jeu = partie_de_bots(3, 1)
+    avant = jeu.etat_public()
+    jeu.changer_pv(jeu.joueurs[1], -3)
+    patch = moteur.diff_etat(avant, jeu.etat_public())
+    assert 'joueurs' not in patch and [i for i, _ in patch['joueurs_maj']] == [1]
+    jeu.retirer_joueur(jeu.joueurs[2])
+    patch = moteur.diff_etat(avant, jeu.etat_public())
+    assert 'joueurs_maj' not in patch and len(patch['joueurs']) == 2
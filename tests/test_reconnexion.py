@@ -0,0 +1,24 @@
+"""Reconnexion : la place d'un joueur déconnecté est gardée, puis libérée à l'échéance"""
+import time
+
+from aides import creer_salon
+
+
+def test_place_gardee_puis_liberee(serveur, client):
+    c1, c2 = client(), client()
+    rid = creer_salon(c1)
+    c2.emit('rejoindre', {'room_id': rid, 'nom': 'b'})
+    jeton = next(m for m in c2.get_received() if m['name'] == 'jeton')['args'][0]
+    jeu = serveur.games[rid]
+    c2.disconnect()
+    time.sleep(0.05)
+    b = jeu.joueur_par_jeton(jeton['jeton'])
+    assert b.deconnecte and b.deconnecte_jusqua and jeu.to_snapshot()['departs'][1] == b.deconnecte_jusqua
+
+    c3 = client()
+    assert c3.emit('reprendre', jeton, callback=True)
+    assert not b.deconnecte and b.deconnecte_jusqua is None
+    c3.disconnect()
+    time.sleep(0.5)
+    assert [j.nom for j in jeu.joueurs] == ['a']
+    c1.emit('fermer_salon')
@@ -0,0 +1,8 @@
+"""Simulateur vectorisé : mêmes décisions que les bots du moteur"""
+import pytest
+
+
+def test_simulateur_meme_heuristique_que_le_moteur():
+    pytest.importorskip('numpy')
+    import simulateur
+    simulateur.verifier()  # sys.exit à la première différence
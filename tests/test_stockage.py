@@ -0,0 +1,27 @@
+"""Stockage partagé entre processus : verrou de salon par fichier"""
+import threading
+import time
+
+import stockage
+
+
+def test_verrou_fichier_malgre_la_suppression(tmp_path):
+    """Salon supprimé pendant que d'autres attendent son verrou : jamais deux détenteurs à la fois"""
+    stock = stockage.StockageFichier(str(tmp_path))
+    dedans, doubles, tours = [0], [0], [0]
+
+    def travailleur():
+        for i in range(60):
+            with stock.verrou('R'):
+                dedans[0] += 1
+                if dedans[0] > 1: doubles[0] += 1
+                time.sleep(0.0005)
+                tours[0] += 1
+                dedans[0] -= 1
+                if i % 3 == 0: stock.supprimer('R')
+
+    threads = [threading.Thread(target=travailleur, daemon=True) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join(20)
+    assert not any(t.is_alive() for t in threads), "verrou jamais rendu"
+    assert doubles[0] == 0 and tours[0] == 360
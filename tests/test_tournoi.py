@@ -0,0 +1,64 @@
+"""File d'attente, tables formées par le serveur et tournois"""
+import moteur
+import tournoi
+
+
+def test_classement_par_identite():
+    """Deux joueurs du même nom (ou un humain nommé comme le bot gagnant) : seul le vrai vainqueur est premier"""
+    for graine in range(30):
+        jeu = moteur.Partie("T", "Test")
+        for sid in ("A", "B", "C"): jeu.ajouter_joueur(sid, "Bot 1", True, 'facile')
+        jeu.demarrer(graine)
+        for j in jeu.joueurs: jeu.valider_pv(j)
+        while jeu.etat != "FIN": moteur.bot_jouer(jeu)
+        ordre = tournoi.classement_table(jeu)
+        assert ordre[0].sid == jeu.vainqueur_sid
+        assert [j.pv for j in ordre[1:]] == sorted((j.pv for j in ordre[1:]), reverse=True)
+
+
+def test_file_attente():
+    maintenant = [0.0]
+    file = tournoi.FileAttente(taille_table=3, delai_bots=10, horloge=lambda: maintenant[0])
+    for i in range(7): assert file.rejoindre(f"c{i}", f"J{i}")
+    assert not file.rejoindre("c0", "J0")
+    assert file.quitter("c1") and not file.quitter("c1")
+    tables = file.former_tables()
+    assert [[c for c, _ in t] for t in tables] == [["c0", "c2", "c3"], ["c4", "c5", "c6"]]
+    file.rejoindre("c7", "J7")
+    assert file.former_tables() == [] and file.echeance() == 10
+    maintenant[0] = 10
+    assert file.former_tables() == [[("c7", "J7")]] and not file
+
+
+def test_tournoi_suisse():
+    t, parties = tournoi.simuler_tournoi(13, 4, 3, graine=2)
+    assert t.etat == "TERMINE" and t.ronde == 3 and parties == 3 * 4
+    classement = t.classement()
+    assert all(p['parties'] == 3 for p in classement)
+    assert [p['rang'] for p in classement] == list(range(1, 14))
+    # Chaque table distribue 3 + 2 + 1 + 0 points, dont une partie à des bots
+    assert sum(p['points'] for p in classement) <= parties * 6
+    assert not t.inscrire("nouveau", "Trop tard") and t.nouvelle_ronde() is None
+
+
+def test_cle_de_file_secrete(serveur, client):
+    joueurs = [client() for _ in range(serveur.TABLE_TAILLE)]
+    sids = [serveur.socketio.server.manager.sid_from_eio_sid(c.eio_sid, '/') for c in joueurs]
+    for n, c in enumerate(joueurs): assert c.emit('file_rejoindre', {'nom': f'Q{n}'}, callback=True)
+    tables = [next(m for m in c.get_received() if m['name'] == 'table')['args'][0] for c in joueurs]
+    assert not {t['cle'] for t in tables} & set(sids)
+    rid = tables[0]['room_id']
+    voleur = client()
+    voleur.emit('rejoindre', {'room_id': rid, 'nom': 'voleur', 'cle': sids[1]})
+    assert all(j.nom != 'voleur' for j in serveur.games[rid].joueurs)
+    joueurs[1].emit('rejoindre', {'room_id': rid, 'nom': tables[1]['nom'], 'cle': tables[1]['cle']})
+    assert [j.nom for j in serveur.games[rid].joueurs] == ['Q1']
+    for c in joueurs: c.disconnect()
+
+
+def test_file_hors_de_l_ordonnanceur_des_bots(serveur, client):
+    """L'échéance de la file (tables complétées par des bots) ne passe pas par l'ordonnanceur des bots"""
+    c = client()
+    assert c.emit('file_rejoindre', {'nom': 'Seul'}, callback=True)
+    assert 'file_attente' in serveur.orchestration.en_attente and 'file_attente' not in serveur.bots.en_attente
+    c.disconnect()
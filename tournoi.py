@@ -0,0 +1,205 @@
+"""File d'attente et tournois : tables formées automatiquement, complétées par des bots, rondes suisses.
+
+Sans Socket.IO, comme le moteur : app.py crée les salons (des Partie ordinaires), y envoie les joueurs
+et rapporte le classement de chaque table à la fin de la partie.
+
+File d'attente (partie rapide depuis le hall) : premiers arrivés, premiers servis. Une table part dès que
+`taille_table` joueurs attendent, ou avec des bots quand le plus ancien attend depuis `delai_bots`
+secondes. Rejoindre et quitter la file sont en O(1) ; `former_tables` ne coûte que les joueurs placés,
+quelle que soit la longueur de la file.
+
+Tournoi : inscriptions, puis `nb_rondes` rondes (système suisse). A chaque ronde les joueurs sont classés
+(points, victoires, PV) et placés dans cet ordre par tables de `taille_table`, la dernière complétée par
+des bots : chacun joue contre des joueurs de son niveau. Sur une table de n places, le premier marque
+n - 1 points, le dernier 0 ; un joueur absent de sa table marque 0.
+
+    python tournoi.py --joueurs 64 --rondes 3       # tournoi de bots joué avec le moteur, classement final
+    python tournoi.py --file 1000 100000            # coût de la file par joueur, selon l'afflux
+"""
+import argparse
+import collections
+import random
+import time
+
+
+def classement_table(partie):
+    """Joueurs d'une partie terminée, du premier au dernier (vainqueur, puis par PV décroissants)"""
+    return sorted(partie.joueurs, key=lambda j: (j.sid != partie.vainqueur_sid, -j.pv))
+
+
+class FileAttente:
+
+    def __init__(self, taille_table=4, delai_bots=20.0, horloge=time.monotonic):
+        self.taille_table = taille_table
+        self.delai_bots = delai_bots
+        self.horloge = horloge
+        self.attente = collections.OrderedDict()  # cle -> (nom, arrivée), dans l'ordre d'arrivée
+
+    def __len__(self): return len(self.attente)
+
+    def rejoindre(self, cle, nom):
+        if cle in self.attente: return False
+        self.attente[cle] = (nom, self.horloge())
+        return True
+
+    def quitter(self, cle): return self.attente.pop(cle, None) is not None
+
+    def echeance(self):
+        """Moment où le plus ancien aura assez attendu pour partir avec des bots (None : file vide)"""
+        if not self.attente: return None
+        return next(iter(self.attente.values()))[1] + self.delai_bots
+
+    def sortir(self):
+        cle, (nom, _) = self.attente.popitem(last=False)
+        return cle, nom
+
+    def former_tables(self):
+        """[[(cle, nom), ...], ...] retirés de la file : les tables complètes, puis les joueurs restants
+        (table à compléter de bots) si le plus ancien a trop attendu"""
+        tables = []
+        while len(self.attente) >= self.taille_table:
+            tables.append([self.sortir() for _ in range(self.taille_table)])
+        if self.attente and self.horloge() >= self.echeance():
+            tables.append([self.sortir() for _ in range(len(self.attente))])
+        return tables
+
+
+class Tournoi:
+
+    def __init__(self, id, nom, taille_table=4, nb_rondes=3, rng=random):
+        self.id, self.nom = id, nom
+        self.taille_table = taille_table
+        self.nb_rondes = nb_rondes
+        self.rng = rng
+        self.etat = "INSCRIPTIONS"  # -> RONDE -> TERMINE
+        self.ronde = 0
+        self.participants = {}  # cle -> {'nom', 'points', 'victoires', 'pv', 'parties'}
+        self.tables = {}  # table (id du salon) -> [cles] de la ronde en cours
+        self.en_cours = set()  # tables de la ronde sans résultat
+
+    def inscrire(self, cle, nom):
+        if self.etat != "INSCRIPTIONS" or cle in self.participants: return False
+        self.participants[cle] = {'nom': nom, 'points': 0, 'victoires': 0, 'pv': 0, 'parties': 0}
+        return True
+
+    def desinscrire(self, cle):
+        if self.etat != "INSCRIPTIONS": return False
+        return self.participants.pop(cle, None) is not None
+
+    def cle_classement(self, cle):
+        p = self.participants[cle]
+        return -p['points'], -p['victoires'], -p['pv']
+
+    def nouvelle_ronde(self):
+        """Répartition de la ronde suivante : [[cles], ...], une liste par table (None : tournoi fini)"""
+        if self.etat == "TERMINE" or self.en_cours or len(self.participants) < 2: return None
+        if self.ronde >= self.nb_rondes:
+            self.etat = "TERMINE"
+            return None
+        self.ronde += 1
+        self.etat = "RONDE"
+        cles = list(self.participants)
+        self.rng.shuffle(cles)  # Départage des ex-aequo (toute la première ronde)
+        cles.sort(key=self.cle_classement)
+        self.tables = {}
+        return [cles[i:i + self.taille_table] for i in range(0, len(cles), self.taille_table)]
+
+    def ouvrir_table(self, table, cles):
+        self.tables[table] = list(cles)
+        self.en_cours.add(table)
+
+    def resultat(self, table, classement, pv=None):
+        """`classement` : cles (None pour un bot) du premier au dernier, sur les `taille_table` places ;
+        `pv` : PV de fin de chacun. True quand c'était la dernière table de la ronde."""
+        if table not in self.en_cours: return False
+        self.en_cours.discard(table)
+        places = max(len(classement), self.taille_table)
+        for rang, cle in enumerate(classement):
+            p = self.participants.get(cle)
+            if p is None or cle not in self.tables[table]: continue
+            p['points'] += places - 1 - rang
+            p['victoires'] += rang == 0
+            if pv: p['pv'] += pv[rang]
+        for cle in self.tables[table]: self.participants[cle]['parties'] += 1
+        if self.en_cours: return False
+        if self.ronde >= self.nb_rondes: self.etat = "TERMINE"
+        return True
+
+    def classement(self):
+        cles = sorted(self.participants, key=self.cle_classement)
+        return [dict(self.participants[c], rang=i + 1) for i, c in enumerate(cles)]
+
+    def to_dict(self, top=10):
+        return {'id': self.id, 'nom': self.nom, 'etat': self.etat, 'ronde': self.ronde, 'nb_rondes': self.nb_rondes,
+                'taille_table': self.taille_table, 'inscrits': len(self.participants),
+                'tables_en_cours': len(self.en_cours), 'classement': self.classement()[:top]}
+
+
+# --- OUTILS ---
+def simuler_tournoi(nb_joueurs, taille_table, nb_rondes, graine=1):
+    """Tournoi de bots (niveaux tirés au hasard) joué avec le moteur, sans serveur"""
+    import moteur
+    import politique
+
+    rng = random.Random(graine)
+    tournoi = Tournoi("SIM", "Simulation", taille_table, nb_rondes, rng)
+    niveaux = {}
+    for i in range(nb_joueurs):
+        niveaux[f"J{i}"] = rng.choice(politique.NIVEAUX)
+        tournoi.inscrire(f"J{i}", f"Joueur {i + 1} ({niveaux[f'J{i}']})")
+    parties = 0
+    while True:
+        tables = tournoi.nouvelle_ronde()
+        if tables is None: break
+        for num, cles in enumerate(tables):
+            jeu = moteur.Partie(f"R{tournoi.ronde}T{num}", "Table", rng=rng)
+            tournoi.ouvrir_table(jeu.id, cles)
+            for cle in cles: jeu.ajouter_joueur(cle, tournoi.participants[cle]['nom'], True, niveaux[cle])
+            while len(jeu.joueurs) < taille_table: jeu.ajouter_bot('moyen')
+            jeu.demarrer()
+            for j in jeu.joueurs: jeu.valider_pv(j)
+            while jeu.etat != "FIN": moteur.bot_jouer(jeu)
+            ordre = classement_table(jeu)
+            tournoi.resultat(jeu.id, [None if j.sid.startswith("BOT_") else j.sid for j in ordre], [j.pv for j in ordre])
+            parties += 1
+    return tournoi, parties
+
+
+def mesurer_file(longueur, taille_table=4):
+    """µs par joueur pour entrer dans la file puis être placé, lors d'un afflux de `longueur` joueurs"""
+    file = FileAttente(taille_table, delai_bots=0.0)
+    debut = time.perf_counter()
+    for i in range(longueur): file.rejoindre(f"J{i}", "Joueur")
+    arrivees = time.perf_counter() - debut
+    debut = time.perf_counter()
+    tables = file.former_tables()
+    placement = time.perf_counter() - debut
+    assert sum(map(len, tables)) == longueur and not file
+    return 1e6 * arrivees / longueur, 1e6 * placement / longueur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournoi de bots et coût de la file d'attente")
+    parser.add_argument('--joueurs', type=int, default=64)
+    parser.add_argument('--taille', type=int, default=4, help="places par table")
+    parser.add_argument('--rondes', type=int, default=3)
+    parser.add_argument('--file', type=int, nargs='*', help="longueurs de file à mesurer (au lieu du tournoi)")
+    args = parser.parse_args()
+
+    if args.file:
+        print("  longueur   µs par arrivée   µs par joueur placé")
+        for n in args.file:
+            a, p = mesurer_file(n, taille_table=args.taille)
+            print(f"{n:10d} {a:16.2f} {p:21.2f}")
+        return
+
+    debut = time.perf_counter()
+    tournoi, parties = simuler_tournoi(args.joueurs, args.taille, args.rondes)
+    print(f"{args.joueurs} joueurs, {tournoi.ronde} rondes, {parties} parties en {time.perf_counter() - debut:.1f} s")
+    print(" rang  joueur                  points  victoires     PV")
+    for p in tournoi.classement()[:15]:
+        print(f"{p['rang']:5d}  {p['nom']:22s} {p['points']:7d} {p['victoires']:10d} {p['pv']:6d}")
+
+
+if __name__ == '__main__':
+    main()